@@ -5,41 +5,52 @@ Improves performance and reduces API calls
 
 import json
 import hashlib
-from datetime import datetime, timedelta
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Dict, Optional, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Entries SQLiteCache looks at per query when evicting over the byte budget
+EVICTION_BATCH = 32
 
-class InMemoryCache:
-    """Simple in-memory cache with TTL support"""
+
+class CacheBackend(ABC):
+    """Interface shared by all analysis cache backends"""
     
-    def __init__(self):
-        self.cache: Dict[str, tuple] = {}  # (value, expiry_time)
+    # Whether calls do disk I/O, so async callers should make them on a worker thread
+    blocking = False
     
+    @abstractmethod
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache if not expired"""
-        if key in self.cache:
-            value, expiry = self.cache[key]
-            if datetime.now() < expiry:
-                logger.debug(f"Cache hit for {key}")
-                return value
-            else:
-                del self.cache[key]
-                logger.debug(f"Cache expired for {key}")
-        return None
     
+    @abstractmethod
     def set(self, key: str, value: Any, ttl_seconds: int = 300):
         """Set value in cache with TTL"""
-        expiry = datetime.now() + timedelta(seconds=ttl_seconds)
-        self.cache[key] = (value, expiry)
-        logger.debug(f"Cached {key} with TTL {ttl_seconds}s")
     
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a single entry if present"""
+    
+    @abstractmethod
     def clear(self):
         """Clear all cache"""
-        self.cache.clear()
-        logger.info("Cache cleared")
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters and current usage"""
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of entries currently stored"""
     
     def generate_key(self, repo_url: str, issue_number: int) -> str:
         """Generate cache key for issue"""
@@ -47,10 +58,428 @@ class InMemoryCache:
         return hashlib.md5(key_str.encode()).hexdigest()
 
 
-# Global cache instance
-_cache = InMemoryCache()
+class InMemoryCache(CacheBackend):
+    """
+    Bounded in-memory LRU cache with TTL support.
+    
+    Entries are evicted least-recently-used first once either the entry
+    count or the approximate byte budget is exceeded. Expired entries are
+    swept proactively every ``sweep_interval`` seconds rather than only
+    when their key is read again.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 50 * 1024 * 1024,
+        sweep_interval: float = 60.0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()  # (value, expiry_time, size)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache if not expired"""
+        with self._lock:
+            self._maybe_sweep()
+            entry = self.cache.get(key)
+            if entry is not None:
+                value, expiry, _ = entry
+                if time.monotonic() < expiry:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    logger.debug(f"Cache hit for {key}")
+                    return value
+                self._remove(key)
+                self.expirations += 1
+                logger.debug(f"Cache expired for {key}")
+            self.misses += 1
+            return None
+    
+    def set(self, key: str, value: Any, ttl_seconds: int = 300):
+        """Set value in cache with TTL, evicting LRU entries if over budget"""
+        size = self._estimate_size(value)
+        with self._lock:
+            self._maybe_sweep()
+            if key in self.cache:
+                self._remove(key)
+            if size > self.max_bytes:
+                logger.warning(f"Not caching {key}: {size} bytes exceeds cache budget")
+                return
+            expiry = time.monotonic() + ttl_seconds
+            self.cache[key] = (value, expiry, size)
+            self.total_bytes += size
+            while len(self.cache) > self.max_entries or self.total_bytes > self.max_bytes:
+                evicted_key = next(iter(self.cache))
+                self._remove(evicted_key)
+                self.evictions += 1
+                logger.debug(f"Evicted {evicted_key}")
+        logger.debug(f"Cached {key} with TTL {ttl_seconds}s")
+    
+    def delete(self, key: str):
+        """Remove a single entry if present"""
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+    
+    def clear(self):
+        """Clear all cache"""
+        with self._lock:
+            self.cache.clear()
+            self.total_bytes = 0
+        logger.info("Cache cleared")
+    
+    def sweep(self) -> int:
+        """
+        Remove all expired entries.
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            now = time.monotonic()
+            expired = [key for key, (_, expiry, _) in self.cache.items() if expiry <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            self._last_sweep = now
+        return len(expired)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters and current usage"""
+        with self._lock:
+            return {
+                "items": len(self.cache),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+    
+    def _remove(self, key: str):
+        _, _, size = self.cache.pop(key)
+        self.total_bytes -= size
+    
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+    
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Approximate memory footprint of a cached value in bytes"""
+        try:
+            return len(json.dumps(value, default=str).encode())
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
 
 
-def get_cache() -> InMemoryCache:
+class SQLiteCache(CacheBackend):
+    """
+    Persistent cache stored in a SQLite database file.
+    
+    Survives restarts and can be shared by several worker processes on the
+    same host (the database runs in WAL mode). Values are stored as
+    zlib-compressed compact JSON. Entry count and byte budget are enforced
+    by evicting the least recently read entries. Triggers keep a running
+    count and byte total in the cache_usage table, so a write only looks
+    for entries to evict when it takes the cache over budget.
+    
+    A hit does not write its access time: the time is kept in memory and
+    stored with this process's next set(), so a hit neither waits for the
+    database write lock nor holds it. The only write a read makes is
+    deleting an expired entry it comes across.
+    """
+    
+    blocking = True
+    
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        max_bytes: int = 200 * 1024 * 1024,
+        sweep_interval: float = 60.0,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+        # key -> time of its latest hit, not yet stored
+        self._touched: Dict[str, float] = {}
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        self._create_usage_table()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._usage()[0]
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache if not expired"""
+        with self._lock:
+            self._maybe_sweep()
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                blob, expires_at = row
+                if now < expires_at:
+                    self._touched[key] = now
+                    self.hits += 1
+                    logger.debug(f"Cache hit for {key}")
+                    return self._decode(blob)
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._touched.pop(key, None)
+                self.expirations += 1
+                logger.debug(f"Cache expired for {key}")
+            self.misses += 1
+            return None
+    
+    def set(self, key: str, value: Any, ttl_seconds: int = 300):
+        """Set value in cache with TTL, evicting LRU entries if over budget"""
+        blob = self._encode(value)
+        size = len(blob)
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key}: {size} bytes exceeds cache budget")
+            return
+        with self._lock:
+            self._maybe_sweep()
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._store_touches()
+                # An upsert rather than INSERT OR REPLACE, whose implicit delete fires no trigger
+                self._conn.execute(
+                    "INSERT INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (key, blob, size, now + ttl_seconds, now),
+                )
+                self._evict_over_budget()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.debug(f"Cached {key} with TTL {ttl_seconds}s")
+    
+    def delete(self, key: str):
+        """Remove a single entry if present"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._touched.pop(key, None)
+    
+    def clear(self):
+        """Clear all cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._touched.clear()
+        logger.info("Cache cleared")
+    
+    def sweep(self) -> int:
+        """
+        Remove all expired entries.
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM cache WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+            self.expirations += removed
+            self._last_sweep = time.monotonic()
+        return removed
+    
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters and current usage"""
+        with self._lock:
+            items, total_bytes = self._usage()
+            return {
+                "items": items,
+                "bytes": total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    def _store_touches(self):
+        """Store the read times of entries hit since the last write"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched.clear()
+    
+    def _create_usage_table(self):
+        """Create the running totals and the triggers that maintain them, once per file"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_usage ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), items INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+            )
+            # Files written before the table existed are counted once
+            self._conn.execute(
+                "INSERT OR IGNORE INTO cache_usage (id, items, bytes) "
+                "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS cache_usage_insert AFTER INSERT ON cache BEGIN "
+                "UPDATE cache_usage SET items = items + 1, bytes = bytes + NEW.size WHERE id = 0; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS cache_usage_delete AFTER DELETE ON cache BEGIN "
+                "UPDATE cache_usage SET items = items - 1, bytes = bytes - OLD.size WHERE id = 0; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS cache_usage_update AFTER UPDATE OF size ON cache BEGIN "
+                "UPDATE cache_usage SET bytes = bytes - OLD.size + NEW.size WHERE id = 0; END"
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+    
+    def _usage(self) -> tuple:
+        """Entry count and total stored bytes"""
+        return self._conn.execute("SELECT items, bytes FROM cache_usage WHERE id = 0").fetchone()
+    
+    def _evict_over_budget(self):
+        items, total_bytes = self._usage()
+        evicted = 0
+        while items > self.max_entries or total_bytes > self.max_bytes:
+            # The least recently read entries, enough to get under the entry limit at least
+            rows = self._conn.execute(
+                "SELECT key, size FROM cache ORDER BY accessed_at LIMIT ?",
+                (max(items - self.max_entries, EVICTION_BATCH),),
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if items <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                items -= 1
+                total_bytes -= size
+                evicted += 1
+        if evicted:
+            self.evictions += evicted
+            logger.debug(f"Evicted {evicted} entries")
+    
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+    
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode())
+    
+    @staticmethod
+    def _decode(blob: bytes) -> Any:
+        return json.loads(zlib.decompress(blob))
+
+
+def create_cache(prefix: str = "CACHE", filename: str = "analysis_cache.sqlite3") -> CacheBackend:
+    """
+    Create a cache backend from environment configuration.
+    
+    CACHE_BACKEND selects ``memory`` (default) or ``sqlite``. Each cache
+    reads its own settings under ``prefix``: the SQLite file is
+    {prefix}_SQLITE_PATH (default .cache/``filename``), and
+    {prefix}_MAX_ENTRIES and {prefix}_MAX_BYTES bound either backend.
+    
+    Args:
+        prefix: Environment variable prefix of this cache's settings
+        filename: Default SQLite file name under .cache/
+    
+    Raises:
+        ValueError: If CACHE_BACKEND is not a known backend
+    """
+    backend = os.getenv("CACHE_BACKEND", "memory").lower()
+    limits = {}
+    if os.getenv(f"{prefix}_MAX_ENTRIES"):
+        limits["max_entries"] = int(os.getenv(f"{prefix}_MAX_ENTRIES"))
+    if os.getenv(f"{prefix}_MAX_BYTES"):
+        limits["max_bytes"] = int(os.getenv(f"{prefix}_MAX_BYTES"))
+    
+    if backend == "memory":
+        return InMemoryCache(**limits)
+    if backend == "sqlite":
+        path = os.getenv(f"{prefix}_SQLITE_PATH", os.path.join(".cache", filename))
+        logger.info(f"Using SQLite cache at {path}")
+        return SQLiteCache(path, **limits)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+
+# Global cache instances
+_cache: Optional[CacheBackend] = None
+_response_cache: Optional[CacheBackend] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CacheBackend:
     """Get global cache instance"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
     return _cache
+
+
+def get_response_cache() -> CacheBackend:
+    """
+    Get the global cache of raw GitHub responses.
+    
+    Stored responses are only kept for revalidation, so they have their
+    own budget (GITHUB_CACHE_MAX_ENTRIES, GITHUB_CACHE_MAX_BYTES) and can
+    never evict an analysis.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _cache_lock:
+            if _response_cache is None:
+                _response_cache = create_cache("GITHUB_CACHE", "github_cache.sqlite3")
+    return _response_cache
@@ -0,0 +1,512 @@
+"""
+Local issue classification
+Label and title rules plus a hashed n-gram linear model, answering obvious
+issues on the CPU so only uncertain ones reach the LLM
+
+Train and evaluate offline on exported issues (a JSON array or JSON lines
+of GitHub REST issue objects, e.g. from ``gh api --paginate``):
+    
+    python -m backend.classifier train issues.json --out model.json
+    python -m backend.classifier eval model.json more_issues.json
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+TYPES = ("bug", "feature_request", "documentation", "question", "other")
+
+# Labels that settle an issue's type on their own (compared lowercased)
+TYPE_LABELS = {
+    "bug": "bug",
+    "type: bug": "bug",
+    "kind/bug": "bug",
+    "defect": "bug",
+    "regression": "bug",
+    "crash": "bug",
+    "enhancement": "feature_request",
+    "feature": "feature_request",
+    "feature request": "feature_request",
+    "type: feature": "feature_request",
+    "kind/feature": "feature_request",
+    "documentation": "documentation",
+    "docs": "documentation",
+    "type: docs": "documentation",
+    "kind/documentation": "documentation",
+    "question": "question",
+    "support": "question",
+    "type: question": "question",
+    "kind/question": "question",
+}
+
+# The label suggested for each type
+LABEL_FOR_TYPE = {
+    "bug": "bug",
+    "feature_request": "enhancement",
+    "documentation": "documentation",
+    "question": "question",
+}
+
+_DOCS_WORDS = r"(?:readme|docs?|documentation|guide|tutorial|docstring|comment|changelog|example)"
+
+# (title pattern, type, confidence); the first match wins
+TITLE_RULES = [
+    (re.compile(r"^\W*(?:bug|crash)\b\W", re.I), "bug", 0.95),
+    (re.compile(r"^\W*(?:feat(?:ure)?(?: request)?|rfc|proposal)\b\W", re.I), "feature_request", 0.95),
+    (re.compile(r"^\W*(?:docs?|documentation)\b\W", re.I), "documentation", 0.95),
+    (re.compile(r"^\W*question\b\W", re.I), "question", 0.95),
+    (re.compile(rf"\b(?:typos?|misspell\w*|spelling|broken links?)\b.*\b{_DOCS_WORDS}\b", re.I), "documentation", 0.95),
+    (re.compile(rf"\b{_DOCS_WORDS}\b.*\b(?:typos?|misspell\w*|spelling|broken links?)\b", re.I), "documentation", 0.95),
+    (re.compile(r"\b(?:typos?|misspell\w*)\b", re.I), "documentation", 0.85),
+    (re.compile(r"^\s*(?:how (?:do|can|to|should)|is it possible|what is|why does)\b", re.I), "question", 0.85),
+]
+
+# Confidence of a rule built on existing labels; conflicting labels fall to
+# CONFLICT_CONFIDENCE so the LLM decides
+LABEL_CONFIDENCE = 0.97
+CONFLICT_CONFIDENCE = 0.5
+
+# Characters of the body used as features; titles are always used whole
+BODY_FEATURE_CHARS = 2000
+DEFAULT_DIMENSIONS = 2 ** 18
+MODEL_FORMAT = 1
+
+_WORD = re.compile(r"[a-z0-9_]+")
+
+
+def label_names(labels: Iterable[Any]) -> List[str]:
+    """Label names from REST label objects or plain strings"""
+    return [label.get("name", "") if isinstance(label, dict) else str(label) for label in labels or []]
+
+
+def hashed_features(title: str, body: str, dimensions: int = DEFAULT_DIMENSIONS) -> Dict[int, float]:
+    """
+    Hash title and body words and word bigrams into a sparse feature vector.
+    
+    Title and body features are kept apart, each feature's sign comes from
+    its hash so collisions tend to cancel out, and the vector has unit
+    length. Only the first BODY_FEATURE_CHARS of the body are read.
+    """
+    features: Dict[int, float] = {}
+    for prefix, text in (("t", title or ""), ("b", (body or "")[:BODY_FEATURE_CHARS])):
+        words = _WORD.findall(text.lower())
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for gram in grams:
+            digest = zlib.crc32(f"{prefix}:{gram}".encode())
+            index = digest % dimensions
+            features[index] = features.get(index, 0.0) + (1.0 if digest & 0x80000000 else -1.0)
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+    return {index: value / norm for index, value in features.items() if value}
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+def _sigmoid(score: float) -> float:
+    if score < -30:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-score))
+
+
+class LinearClassifier:
+    """
+    Logistic regression over hashed n-gram features.
+    
+    One multinomial model picks the issue type; one-vs-rest models score
+    each label seen often enough in training. Weights are stored sparsely,
+    only for features that occurred in training.
+    """
+    
+    def __init__(self, labels: Sequence[str] = (), dimensions: int = DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+        self.types = list(TYPES)
+        self.labels = list(labels)
+        self.type_bias = [0.0] * len(self.types)
+        self.type_weights: Dict[int, List[float]] = {}
+        self.label_bias = [0.0] * len(self.labels)
+        self.label_weights: Dict[int, List[float]] = {}
+    
+    def predict(self, title: str, body: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Score an issue.
+        
+        Returns:
+            Tuple of (probability per type, probability per label)
+        """
+        features = hashed_features(title, body, self.dimensions)
+        type_probs = _softmax(self._scores(features, self.type_weights, self.type_bias))
+        label_scores = self._scores(features, self.label_weights, self.label_bias)
+        return (
+            dict(zip(self.types, type_probs)),
+            {label: _sigmoid(score) for label, score in zip(self.labels, label_scores)},
+        )
+    
+    def fit(
+        self,
+        examples: Sequence[Dict[str, Any]],
+        epochs: int = 10,
+        learning_rate: float = 0.5,
+        seed: int = 0,
+    ) -> "LinearClassifier":
+        """
+        Train with stochastic gradient descent on log loss.
+        
+        Args:
+            examples: Dicts with title, body, type and labels (see load_issues())
+            epochs: Passes over the examples
+            learning_rate: Initial step size, decayed each epoch
+            seed: Seed for the shuffling order
+        
+        Returns:
+            The classifier itself
+        """
+        data = [
+            (
+                hashed_features(example["title"], example["body"], self.dimensions),
+                self.types.index(example["type"]),
+                {label.lower() for label in example.get("labels", [])},
+            )
+            for example in examples
+        ]
+        order = list(range(len(data)))
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + epoch)
+            for i in order:
+                features, target, labels = data[i]
+                probs = _softmax(self._scores(features, self.type_weights, self.type_bias))
+                gradients = [p - (k == target) for k, p in enumerate(probs)]
+                self._step(features, self.type_weights, self.type_bias, gradients, rate)
+                
+                if self.labels:
+                    scores = self._scores(features, self.label_weights, self.label_bias)
+                    gradients = [
+                        _sigmoid(score) - (label.lower() in labels) for label, score in zip(self.labels, scores)
+                    ]
+                    self._step(features, self.label_weights, self.label_bias, gradients, rate)
+        return self
+    
+    def save(self, path: str):
+        """Write the model as JSON"""
+        rounded = lambda weights: {str(index): [round(w, 6) for w in row] for index, row in weights.items()}
+        with open(path, "w") as f:
+            json.dump({
+                "format": MODEL_FORMAT,
+                "dimensions": self.dimensions,
+                "types": self.types,
+                "labels": self.labels,
+                "type_bias": self.type_bias,
+                "type_weights": rounded(self.type_weights),
+                "label_bias": self.label_bias,
+                "label_weights": rounded(self.label_weights),
+            }, f)
+    
+    @classmethod
+    def load(cls, path: str) -> "LinearClassifier":
+        """
+        Read a model written by save().
+        
+        Raises:
+            ValueError: If the file is not a model of a supported format
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"Cannot read classifier model {path}: {e}")
+        if not isinstance(data, dict) or data.get("format") != MODEL_FORMAT or data.get("types") != list(TYPES):
+            raise ValueError(f"Unsupported classifier model: {path}")
+        
+        model = cls(labels=data["labels"], dimensions=data["dimensions"])
+        model.type_bias = data["type_bias"]
+        model.type_weights = {int(index): row for index, row in data["type_weights"].items()}
+        model.label_bias = data["label_bias"]
+        model.label_weights = {int(index): row for index, row in data["label_weights"].items()}
+        return model
+    
+    @staticmethod
+    def _scores(features: Dict[int, float], weights: Dict[int, List[float]], bias: List[float]) -> List[float]:
+        scores = list(bias)
+        for index, value in features.items():
+            row = weights.get(index)
+            if row is not None:
+                for k, w in enumerate(row):
+                    scores[k] += w * value
+        return scores
+    
+    @staticmethod
+    def _step(
+        features: Dict[int, float],
+        weights: Dict[int, List[float]],
+        bias: List[float],
+        gradients: List[float],
+        rate: float,
+    ):
+        for k, gradient in enumerate(gradients):
+            bias[k] -= rate * gradient
+        for index, value in features.items():
+            row = weights.get(index)
+            if row is None:
+                row = weights[index] = [0.0] * len(gradients)
+            for k, gradient in enumerate(gradients):
+                row[k] -= rate * gradient * value
+
+
+# Priority and impact given to locally classified issues of each type
+_TYPE_DEFAULTS = {
+    "bug": (3, "Users hitting this code path may see incorrect behavior until it is fixed."),
+    "feature_request": (2, "No existing behavior is affected; users would gain new functionality."),
+    "documentation": (1, "Readers of the documentation may be confused; the software itself is unaffected."),
+    "question": (1, "Affects the asker; an answer may also help other users."),
+    "other": (2, "Impact is unclear from the issue."),
+}
+
+
+class IssueClassifier:
+    """
+    Rules first, then the trained model, if any.
+    
+    classify() always answers; analysis() answers only when the confidence
+    reaches min_confidence, and the caller sends everything else to the
+    LLM.
+    """
+    
+    def __init__(self, model: Optional[LinearClassifier] = None, min_confidence: float = 0.9):
+        self.model = model
+        self.min_confidence = min_confidence
+        self.local = 0
+        self.escalated = 0
+    
+    def classify(self, issue_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Classify issue data (as built by IssueAnalyzer).
+        
+        Returns:
+            Dict with type, confidence, suggested_labels and the reason
+            for the decision
+        """
+        title = issue_data.get("title") or ""
+        body = issue_data.get("body") or ""
+        labels = label_names(issue_data.get("labels", []))
+        label_probs: Dict[str, float] = {}
+        
+        label_types = {TYPE_LABELS[label.lower().strip()] for label in labels if label.lower().strip() in TYPE_LABELS}
+        rule = next(((kind, confidence) for pattern, kind, confidence in TITLE_RULES if pattern.search(title)), None)
+        if len(label_types) == 1:
+            issue_type, confidence = label_types.pop(), LABEL_CONFIDENCE
+            reason = "its existing labels"
+        elif label_types:
+            issue_type, confidence = sorted(label_types)[0], CONFLICT_CONFIDENCE
+            reason = "conflicting existing labels"
+        elif rule:
+            issue_type, confidence = rule
+            reason = "its title"
+        else:
+            issue_type, confidence = "other", 0.0
+            reason = "no matching rule"
+        
+        # Labels outrank the text; the model can stand in for a weaker rule
+        if self.model is not None:
+            type_probs, label_probs = self.model.predict(title, body)
+            predicted = max(type_probs, key=type_probs.get)
+            if not label_types and type_probs[predicted] > confidence:
+                issue_type, confidence, reason = predicted, type_probs[predicted], "the text model"
+        
+        suggested: Dict[str, str] = {}
+        candidates = [LABEL_FOR_TYPE[issue_type]] if issue_type in LABEL_FOR_TYPE else []
+        candidates += labels
+        candidates += sorted((label for label, p in label_probs.items() if p >= 0.5), key=label_probs.get, reverse=True)
+        for label in candidates:
+            suggested.setdefault(label.lower(), label)
+        return {
+            "type": issue_type,
+            "confidence": confidence,
+            "suggested_labels": list(suggested.values())[:3],
+            "reason": reason,
+        }
+    
+    def analysis(self, issue_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Build a full analysis locally, or None to escalate to the LLM.
+        
+        Type and labels come from classify(). The summary is the title and
+        the priority is the usual one for the type; the reasoning says the
+        analysis was made locally.
+        """
+        result = self.classify(issue_data)
+        if result["confidence"] < self.min_confidence:
+            self.escalated += 1
+            return None
+        self.local += 1
+        
+        issue_type = result["type"]
+        priority, impact = _TYPE_DEFAULTS[issue_type]
+        return {
+            "summary": (issue_data.get("title") or "").strip(),
+            "type": issue_type,
+            "priority_score": f"{priority}/5: Typical priority for {issue_type.replace('_', ' ')} issues",
+            "suggested_labels": result["suggested_labels"],
+            "potential_impact": impact,
+            "reasoning": (
+                f"Classified locally as {issue_type} from {result['reason']} "
+                f"(confidence {result['confidence']:.2f}). Priority and impact are the defaults for this type."
+            ),
+        }
+    
+    def stats(self) -> Dict[str, int]:
+        """Get fast-path counters"""
+        return {"local": self.local, "escalated": self.escalated}
+
+
+def load_issues(path: str) -> List[Dict[str, Any]]:
+    """
+    Read exported issues as training examples.
+    
+    Accepts a JSON array or JSON lines of GitHub REST issue objects. An
+    explicit "type" field is used as the target; otherwise the type comes
+    from TYPE_LABELS. Pull requests, and issues without a single type,
+    are skipped.
+    
+    Returns:
+        Dicts with title, body, type and labels
+    """
+    with open(path) as f:
+        text = f.read()
+    stripped = text.lstrip()
+    records = json.loads(text) if stripped.startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+    
+    examples = []
+    for record in records:
+        if "pull_request" in record:
+            continue
+        labels = label_names(record.get("labels", []))
+        issue_type = record.get("type")
+        if issue_type not in TYPES:
+            types = {TYPE_LABELS[label.lower().strip()] for label in labels if label.lower().strip() in TYPE_LABELS}
+            if len(types) != 1:
+                continue
+            issue_type = types.pop()
+        examples.append({
+            "title": record.get("title") or "",
+            "body": record.get("body") or "",
+            "type": issue_type,
+            "labels": labels,
+        })
+    return examples
+
+
+def label_vocabulary(examples: Sequence[Dict[str, Any]], min_count: int = 3) -> List[str]:
+    """Labels used by at least min_count examples, most used first"""
+    counts: Dict[str, int] = {}
+    for example in examples:
+        for label in {label.lower() for label in example["labels"]}:
+            counts[label] = counts.get(label, 0) + 1
+    return sorted((label for label, count in counts.items() if count >= min_count), key=lambda label: (-counts[label], label))
+
+
+def train(
+    examples: Sequence[Dict[str, Any]], epochs: int = 10, min_label_count: int = 3, seed: int = 0
+) -> LinearClassifier:
+    """Train a model on examples from load_issues()"""
+    model = LinearClassifier(labels=label_vocabulary(examples, min_label_count))
+    return model.fit(examples, epochs=epochs, seed=seed)
+
+
+def evaluate(classifier: IssueClassifier, examples: Sequence[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Measure how much traffic the classifier answers, and how well.
+    
+    Existing labels are withheld, since they are where the target types of
+    load_issues() come from; the rules and model see only the text, as for
+    a newly opened issue.
+    
+    Returns:
+        Dict with examples, accuracy (every issue), coverage (share at or
+        above min_confidence), covered_accuracy (on those), label_recall
+        (share of an issue's labels suggested, averaged over covered issues
+        that have labels) and mean_ms per classification
+    """
+    correct = covered = covered_correct = 0
+    recalls: List[float] = []
+    start = time.perf_counter()
+    for example in examples:
+        result = classifier.classify({"title": example["title"], "body": example["body"], "labels": []})
+        hit = result["type"] == example["type"]
+        correct += hit
+        if result["confidence"] >= classifier.min_confidence:
+            covered += 1
+            covered_correct += hit
+            wanted = {label.lower() for label in example["labels"]}
+            if wanted:
+                recalls.append(len(wanted & {label.lower() for label in result["suggested_labels"]}) / len(wanted))
+    elapsed = time.perf_counter() - start
+    
+    count = len(examples) or 1
+    return {
+        "examples": len(examples),
+        "accuracy": correct / count,
+        "coverage": covered / count,
+        "covered_accuracy": covered_correct / covered if covered else 0.0,
+        "label_recall": sum(recalls) / len(recalls) if recalls else 0.0,
+        "mean_ms": elapsed * 1000 / count,
+    }
+
+
+def split(examples: Sequence[Dict[str, Any]], holdout: float, seed: int = 0) -> Tuple[List, List]:
+    """Shuffle and split examples into (training, held-out) lists"""
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    cut = len(shuffled) - int(len(shuffled) * holdout)
+    return shuffled[:cut], shuffled[cut:]
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """Command-line training and evaluation"""
+    parser = argparse.ArgumentParser(prog="python -m backend.classifier", description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    train_command = commands.add_parser("train", help="train a model and report held-out metrics")
+    train_command.add_argument("issues", help="exported issues (JSON array or JSON lines)")
+    train_command.add_argument("--out", required=True, help="model file to write")
+    train_command.add_argument("--epochs", type=int, default=10)
+    train_command.add_argument("--holdout", type=float, default=0.2, help="share of issues kept for evaluation")
+    train_command.add_argument("--min-label-count", type=int, default=3)
+    train_command.add_argument("--min-confidence", type=float, default=0.9)
+    train_command.add_argument("--seed", type=int, default=0)
+    
+    eval_command = commands.add_parser("eval", help="evaluate a model on exported issues")
+    eval_command.add_argument("model", help="model file written by train")
+    eval_command.add_argument("issues", help="exported issues (JSON array or JSON lines)")
+    eval_command.add_argument("--min-confidence", type=float, default=0.9)
+    
+    args = parser.parse_args(argv)
+    examples = load_issues(args.issues)
+    if args.command == "train":
+        training, held_out = split(examples, args.holdout, args.seed)
+        model = train(training, epochs=args.epochs, min_label_count=args.min_label_count, seed=args.seed)
+        model.save(args.out)
+        print(f"Trained on {len(training)} issues ({len(model.labels)} labels), wrote {args.out}")
+        examples = held_out
+    else:
+        model = LinearClassifier.load(args.model)
+    
+    metrics = evaluate(IssueClassifier(model, args.min_confidence), examples)
+    print(json.dumps(metrics, indent=2))
+    return metrics
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+"""
+Near-duplicate issue detection
+Hashed TF-IDF vectors in a per-repository approximate nearest-neighbor
+index, persisted to disk and updated as issues are analyzed
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from .file_locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIMENSIONS = 256
+# Document frequencies are counted in far more buckets than the vectors
+# have, so rare terms keep their weight even when their vector bucket is shared
+DF_BUCKETS = 2 ** 20
+# Title terms count this many times as much as body terms
+TITLE_WEIGHT = 2
+# Characters of the body that are embedded
+BODY_EMBED_CHARS = 4000
+
+# Vectors an index holds before it is partitioned; smaller ones are scanned whole
+TRAIN_THRESHOLD = 1024
+# Partitions are retrained whenever the index has grown this many times over
+RETRAIN_GROWTH = 4
+# Vectors sampled, and iterations run, to train partition centroids
+KMEANS_SAMPLE = 20000
+KMEANS_ITERATIONS = 8
+# Partitions scanned per query
+DEFAULT_PROBES = 8
+INITIAL_CAPACITY = 1024
+
+_WORD = re.compile(r"[a-z0-9_]+")
+
+
+def term_hashes(title: str, body: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash the words and word bigrams of an issue.
+    
+    Returns:
+        Tuple of (term hashes, term frequencies), one entry per distinct term
+    """
+    counts: Dict[str, int] = {}
+    for text, weight in ((title or "", TITLE_WEIGHT), ((body or "")[:BODY_EMBED_CHARS], 1)):
+        words = _WORD.findall(text.lower())
+        for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            counts[term] = counts.get(term, 0) + weight
+    hashes = np.fromiter((zlib.crc32(term.encode()) for term in counts), dtype=np.uint32, count=len(counts))
+    return hashes, np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+
+def _open_array(path: Optional[str], shape: Tuple[int, ...], dtype) -> np.ndarray:
+    """A zeroed array, memory-mapped to a new .npy file when a path is given"""
+    if path is None:
+        return np.zeros(shape, dtype=dtype)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+
+class TermStatistics:
+    """
+    Hashed document frequencies, for the IDF half of TF-IDF.
+    
+    Vectors are weighted with the statistics at the time they are added
+    and are not reweighted later; on a growing repository the frequencies
+    settle quickly, so old and new vectors stay comparable.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        # The last slot holds the number of documents counted
+        if path and os.path.exists(path):
+            self._counts = np.lib.format.open_memmap(path, mode="r+")
+        else:
+            self._counts = _open_array(path, (DF_BUCKETS + 1,), np.uint32)
+    
+    @property
+    def documents(self) -> int:
+        return int(self._counts[-1])
+    
+    def observe(self, hashes: np.ndarray):
+        """Count one document's distinct terms"""
+        self._counts[np.unique(hashes % DF_BUCKETS)] += 1
+        self._counts[-1] += 1
+    
+    def embed(self, hashes: np.ndarray, frequencies: np.ndarray, dimensions: int) -> np.ndarray:
+        """Build a unit TF-IDF vector with signed feature hashing"""
+        vector = np.zeros(dimensions, dtype=np.float32)
+        if not len(hashes):
+            return vector
+        df = self._counts[hashes % DF_BUCKETS].astype(np.float32)
+        weights = (1 + np.log(frequencies)) * (np.log((1 + self.documents) / (1 + df)) + 1)
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+        np.add.at(vector, hashes % dimensions, signs * weights)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def flush(self):
+        if isinstance(self._counts, np.memmap):
+            self._counts.flush()
+
+
+class VectorIndex:
+    """
+    Approximate nearest-neighbor index over unit vectors, keyed by issue number.
+    
+    Up to TRAIN_THRESHOLD vectors, queries scan them all. Beyond that the
+    vectors are partitioned around sqrt(n) spherical k-means centroids
+    (an inverted file), and a query scans only the partitions of its
+    ``probes`` nearest centroids: about probes * sqrt(n) vectors, a few
+    thousand for 100k issues. Partitions are retrained whenever the index
+    has grown RETRAIN_GROWTH-fold, so inserts stay O(1) amortized.
+    
+    With a directory, vectors and numbers live in memory-mapped .npy files
+    that double in size as needed, so an insert writes only its own row
+    and reopening an index does not read it all into memory. Processes
+    sharing a directory must serialize their writes (DuplicateDetector
+    holds a file lock) and call refresh() to see each other's.
+    """
+    
+    def __init__(
+        self,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        directory: Optional[str] = None,
+        probes: int = DEFAULT_PROBES,
+    ):
+        self.dimensions = dimensions
+        self.directory = directory
+        self.probes = probes
+        self.count = 0
+        self.trained_count = 0
+        self.rows: Dict[int, int] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        
+        if directory and os.path.exists(self._path("meta.json")):
+            self._load()
+            return
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._vectors = _open_array(self._path("vectors.npy"), (INITIAL_CAPACITY, dimensions), np.float32)
+        self._numbers = _open_array(self._path("numbers.npy"), (INITIAL_CAPACITY,), np.int64)
+        self._assignments = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self._save_meta()
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def add(self, number: int, vector: np.ndarray):
+        """Insert or replace the vector of an issue"""
+        self._add(number, vector)
+        self._maybe_train()
+        self._save_meta()
+    
+    def add_many(self, numbers: Sequence[int], vectors: np.ndarray):
+        """Insert or replace many vectors, training partitions once at the end"""
+        for number, vector in zip(numbers, vectors):
+            self._add(number, vector)
+        self._maybe_train()
+        self._save_meta()
+    
+    def search(
+        self, vector: np.ndarray, k: int = 1, exclude: Optional[int] = None, before: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the issues whose vectors are most similar to ``vector``.
+        
+        Args:
+            vector: Query vector (need not be unit length)
+            k: Matches to return
+            exclude: Issue number to leave out, usually the query's own
+            before: Only match issues numbered below this one
+        
+        Returns:
+            (issue number, cosine similarity) pairs, most similar first
+        """
+        norm = np.linalg.norm(vector)
+        if not self.count or not norm:
+            return []
+        query = (vector / norm).astype(np.float32)
+        
+        if self.centroids is None:
+            rows = np.arange(self.count)
+            scores = self._vectors[:self.count] @ query
+        else:
+            closeness = self.centroids @ query
+            probes = min(self.probes, len(closeness))
+            nearest = np.argpartition(-closeness, probes - 1)[:probes]
+            rows = np.concatenate([self._list_array(int(c)) for c in nearest])
+            scores = self._vectors[rows] @ query
+        
+        if exclude is not None and exclude in self.rows:
+            scores = np.where(rows == self.rows[exclude], -np.inf, scores)
+        if before is not None:
+            scores = np.where(self._numbers[rows] >= before, -np.inf, scores)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self._numbers[rows[i]]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+    
+    def refresh(self):
+        """
+        Pick up what other processes sharing the directory have written.
+        
+        Rows they appended join this index's partitions. After they grew
+        the files or retrained the partitions, the index is reopened. A
+        vector they replaced is read from the shared file but stays in its
+        old partition here until the next retrain.
+        """
+        if not self.directory:
+            return
+        with open(self._path("meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("capacity", len(self._numbers)) != len(self._numbers) or meta["trained_count"] != self.trained_count:
+            self._load()
+            return
+        for row in range(self.count, meta["count"]):
+            self.rows[int(self._numbers[row])] = row
+            if self.centroids is not None:
+                self._assign(row)
+        self.count = meta["count"]
+    
+    def flush(self):
+        """Write memory-mapped rows and metadata to disk"""
+        for array in (self._vectors, self._numbers):
+            if isinstance(array, np.memmap):
+                array.flush()
+        self._save_meta()
+    
+    def _add(self, number: int, vector: np.ndarray):
+        number = int(number)
+        norm = np.linalg.norm(vector)
+        row = self.rows.get(number)
+        if row is None:
+            if self.count == len(self._numbers):
+                self._grow()
+            row = self.count
+            self.count += 1
+            self.rows[number] = row
+            self._numbers[row] = number
+        elif self.centroids is not None:
+            self._lists[self._assignments[row]].remove(row)
+            self._list_arrays.pop(int(self._assignments[row]), None)
+        self._vectors[row] = vector / norm if norm else vector
+        if self.centroids is not None:
+            self._assign(row)
+    
+    def _assign(self, row: int):
+        partition = int(np.argmax(self.centroids @ self._vectors[row]))
+        self._assignments[row] = partition
+        self._lists[partition].append(row)
+        self._list_arrays.pop(partition, None)
+    
+    def _list_array(self, partition: int) -> np.ndarray:
+        array = self._list_arrays.get(partition)
+        if array is None:
+            array = self._list_arrays[partition] = np.array(self._lists[partition], dtype=np.int64)
+        return array
+    
+    def _maybe_train(self):
+        if self.count >= max(TRAIN_THRESHOLD, RETRAIN_GROWTH * self.trained_count):
+            self._train()
+    
+    def _train(self):
+        """Fit sqrt(n) centroids on a sample, then partition every vector"""
+        n = self.count
+        partitions = max(1, int(math.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = np.asarray(self._vectors[rng.choice(n, min(n, KMEANS_SAMPLE), replace=False)])
+        centroids = sample[rng.choice(len(sample), partitions, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            members = np.zeros((partitions, len(sample)), dtype=np.float32)
+            members[labels, np.arange(len(sample))] = 1
+            sums = members @ sample
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # A centroid that lost all its members keeps its place
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.trained_count = n
+        self._partition()
+        if self.directory:
+            np.save(self._path("centroids.npy"), self.centroids)
+        logger.info(f"Partitioned {n} vectors around {partitions} centroids")
+    
+    def _partition(self):
+        """Assign every vector to its nearest centroid"""
+        n = self.count
+        for start in range(0, n, 65536):
+            chunk = self._vectors[start:min(n, start + 65536)]
+            self._assignments[start:start + len(chunk)] = np.argmax(chunk @ self.centroids.T, axis=1)
+        order = np.argsort(self._assignments[:n], kind="stable")
+        bounds = np.cumsum(np.bincount(self._assignments[:n], minlength=len(self.centroids)))
+        self._lists = [part.tolist() for part in np.split(order, bounds[:-1])]
+        self._list_arrays = {}
+    
+    def _grow(self):
+        capacity = 2 * len(self._numbers)
+        for name, shape, dtype in (
+            ("vectors", (capacity, self.dimensions), np.float32),
+            ("numbers", (capacity,), np.int64),
+        ):
+            old = getattr(self, f"_{name}")
+            if self.directory:
+                temporary = self._path(f"{name}.tmp.npy")
+                new = _open_array(temporary, shape, dtype)
+                new[:len(old)] = old
+                new.flush()
+                del new
+                os.replace(temporary, self._path(f"{name}.npy"))
+                new = np.lib.format.open_memmap(self._path(f"{name}.npy"), mode="r+")
+            else:
+                new = np.zeros(shape, dtype=dtype)
+                new[:len(old)] = old
+            setattr(self, f"_{name}", new)
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:len(self._assignments)] = self._assignments
+        self._assignments = assignments
+    
+    def _load(self):
+        with open(self._path("meta.json")) as f:
+            meta = json.load(f)
+        if meta["dimensions"] != self.dimensions:
+            raise ValueError(
+                f"Index at {self.directory} has {meta['dimensions']} dimensions, not {self.dimensions}"
+            )
+        self._vectors = np.lib.format.open_memmap(self._path("vectors.npy"), mode="r+")
+        self._numbers = np.lib.format.open_memmap(self._path("numbers.npy"), mode="r+")
+        self._assignments = np.zeros(len(self._numbers), dtype=np.int32)
+        self.count = meta["count"]
+        self.trained_count = meta["trained_count"]
+        self.rows = {int(number): row for row, number in enumerate(self._numbers[:self.count])}
+        self.centroids = None
+        self._lists = []
+        self._list_arrays = {}
+        if os.path.exists(self._path("centroids.npy")):
+            self.centroids = np.load(self._path("centroids.npy"))
+            self._partition()
+    
+    def _save_meta(self):
+        if not self.directory:
+            return
+        temporary = self._path("meta.json.tmp")
+        with open(temporary, "w") as f:
+            json.dump({
+                "dimensions": self.dimensions,
+                "count": self.count,
+                "trained_count": self.trained_count,
+                "capacity": len(self._numbers),
+            }, f)
+        os.replace(temporary, self._path("meta.json"))
+    
+    def _path(self, name: str) -> Optional[str]:
+        return os.path.join(self.directory, name) if self.directory else None
+
+
+class _RepoIndex:
+    """
+    The vectors and term statistics of one repository.
+    
+    On disk, the index is shared by every worker process: writers hold an
+    exclusive lock on ``directory/lock`` and readers a shared one, and
+    both first refresh the index with what other processes have written.
+    """
+    
+    def __init__(self, directory: Optional[str], dimensions: int, probes: int):
+        self.lock = threading.Lock()
+        self._lock_path = os.path.join(directory, "lock") if directory else None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Creating the files must not race another process creating them
+        with file_lock(self._lock_path):
+            self.vectors = VectorIndex(dimensions, directory, probes)
+            self.terms = TermStatistics(os.path.join(directory, "df.npy") if directory else None)
+    
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        with self.lock, file_lock(self._lock_path, exclusive=False):
+            self.vectors.refresh()
+            yield
+    
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        with self.lock, file_lock(self._lock_path):
+            self.vectors.refresh()
+            yield
+
+
+class DuplicateDetector:
+    """
+    Finds already-analyzed issues that are near-duplicates of another.
+    
+    Each repository has its own index, stored under
+    ``directory/<owner>__<repo>/`` (in memory without a directory). Issues
+    are embedded from their title and body; comments are left out, as
+    they describe the discussion rather than the problem.
+    """
+    
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        threshold: float = 0.85,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        probes: int = DEFAULT_PROBES,
+    ):
+        self.directory = directory
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._repos: Dict[str, _RepoIndex] = {}
+        self.found = 0
+    
+    def find(self, owner: str, repo: str, issue_number: int, issue_data: Dict[str, Any]) -> Optional[Tuple[int, float]]:
+        """
+        Find the most similar earlier issue, if it is at least ``threshold`` similar.
+        
+        Only issues numbered below ``issue_number`` are matched, so an
+        original is never reported as a duplicate of its later copies.
+        
+        Returns:
+            Tuple of (issue number, cosine similarity), or None
+        """
+        index = self._index(owner, repo)
+        hashes, frequencies = term_hashes(issue_data.get("title"), issue_data.get("body"))
+        with index.reading():
+            vector = index.terms.embed(hashes, frequencies, self.dimensions)
+            matches = index.vectors.search(vector, k=1, before=issue_number)
+        if not matches or matches[0][1] < self.threshold:
+            return None
+        self.found += 1
+        return matches[0]
+    
+    def add(self, owner: str, repo: str, issue_number: int, issue_data: Dict[str, Any]):
+        """Index an issue, replacing its previous vector if it was indexed before"""
+        index = self._index(owner, repo)
+        hashes, frequencies = term_hashes(issue_data.get("title"), issue_data.get("body"))
+        with index.writing():
+            vector = index.terms.embed(hashes, frequencies, self.dimensions)
+            if issue_number not in index.vectors.rows:
+                index.terms.observe(hashes)
+            index.vectors.add(issue_number, vector)
+    
+    def close(self):
+        """Flush every open index to disk"""
+        with self._lock:
+            for index in self._repos.values():
+                with index.writing():
+                    index.vectors.flush()
+                    index.terms.flush()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get index sizes and the number of duplicates found"""
+        with self._lock:
+            return {
+                "repositories": len(self._repos),
+                "issues": sum(len(index.vectors) for index in self._repos.values()),
+                "found": self.found,
+            }
+    
+    def _index(self, owner: str, repo: str) -> _RepoIndex:
+        name = re.sub(r"[^\w.-]", "_", f"{owner}__{repo}".lower())
+        with self._lock:
+            index = self._repos.get(name)
+            if index is None:
+                directory = os.path.join(self.directory, name) if self.directory else None
+                index = self._repos[name] = _RepoIndex(directory, self.dimensions, self.probes)
+            return index
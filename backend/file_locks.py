@@ -0,0 +1,32 @@
+"""
+Advisory file locks
+Serialize writers across the worker processes sharing an on-disk store
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock across processes
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Optional[str], exclusive: bool = True) -> Iterator[None]:
+    """
+    Hold an advisory lock on ``path`` (created if missing) for the block.
+    
+    Exclusive locks are for writers; shared locks let readers in together
+    while keeping writers out. Without a path, or on platforms without
+    fcntl, this does nothing.
+    """
+    if not path or fcntl is None:
+        yield
+        return
+    with open(path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,116 @@
+"""
+GitHub GraphQL queries for issue data
+Fetches just the fields an analysis needs, for many issues per request
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+# One aliased issue(number:) field per issue; $first and $last bound the
+# comment windows taken from each end of every thread
+ISSUES_QUERY = """query($owner: String!, $name: String!, $first: Int!, $last: Int!) {
+  repository(owner: $owner, name: $name) {
+%s
+  }
+}
+
+fragment IssueFields on Issue {
+  number
+  title
+  body
+  state
+  createdAt
+  updatedAt
+  labels(first: 100) { nodes { name } }
+  firstComments: comments(first: $first) { totalCount nodes { ...CommentFields } }
+  lastComments: comments(last: $last) { nodes { ...CommentFields } }
+}
+
+fragment CommentFields on IssueComment {
+  body
+  createdAt
+  authorAssociation
+  author { __typename }
+  reactions { totalCount }
+}
+"""
+
+
+def issue_alias(number: int) -> str:
+    """Alias of an issue's field in a batched query"""
+    return f"issue_{number}"
+
+
+def build_issues_query(numbers: Sequence[int]) -> str:
+    """Build a query fetching the given issues of one repository"""
+    fields = "\n".join(
+        f"    {issue_alias(number)}: issue(number: {int(number)}) {{ ...IssueFields }}" for number in numbers
+    )
+    return ISSUES_QUERY % fields
+
+
+def issue_from_node(node: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Convert an issue node to REST-shaped issue and comment payloads.
+    
+    The comment windows from both ends of the thread are joined oldest
+    first without repeating comments they share.
+    
+    Returns:
+        Tuple of (issue payload, comment payloads)
+    """
+    issue = {
+        "number": node.get("number"),
+        "title": node.get("title", ""),
+        "body": node.get("body", ""),
+        "state": (node.get("state") or "OPEN").lower(),
+        "created_at": node.get("createdAt", ""),
+        "updated_at": node.get("updatedAt", ""),
+        "labels": [{"name": label["name"]} for label in (node.get("labels") or {}).get("nodes", [])],
+    }
+    
+    first = node.get("firstComments") or {}
+    head = first.get("nodes", [])
+    tail = (node.get("lastComments") or {}).get("nodes", [])
+    overlap = max(0, len(head) + len(tail) - first.get("totalCount", 0))
+    comments = [_comment_from_node(comment) for comment in head + tail[overlap:]]
+    return issue, comments
+
+
+def _comment_from_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    author = node.get("author") or {}
+    return {
+        "body": node.get("body", ""),
+        "created_at": node.get("createdAt", ""),
+        "author_association": node.get("authorAssociation", "NONE"),
+        "user": {"type": "Bot" if author.get("__typename") == "Bot" else "User"},
+        "reactions": {"total_count": (node.get("reactions") or {}).get("totalCount", 0)},
+    }
+
+
+def issues_from_response(
+    payload: Dict[str, Any], numbers: Sequence[int]
+) -> Dict[int, Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Extract the issues of a build_issues_query() response.
+    
+    Issues GitHub could not find (or a repository it could not find) are
+    left out of the result.
+    
+    Returns:
+        Tuple of (issue payload, comment payloads) keyed by issue number
+    
+    Raises:
+        ValueError: If the query failed as a whole
+    """
+    errors = payload.get("errors") or []
+    repository = (payload.get("data") or {}).get("repository")
+    if repository is None:
+        if errors and all(error.get("type") == "NOT_FOUND" for error in errors):
+            return {}
+        message = errors[0].get("message", "unknown error") if errors else "empty response"
+        raise ValueError(f"GitHub GraphQL error: {message}")
+    return {
+        number: issue_from_node(repository[issue_alias(number)])
+        for number in numbers
+        if repository.get(issue_alias(number))
+    }
@@ -0,0 +1,211 @@
+"""
+Repository label catalogs
+Maps the labels an analysis suggests onto labels the repository actually has
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Minimum trigram similarity for a suggestion to map onto a label
+DEFAULT_THRESHOLD = 0.7
+# Label sets whose match index is kept in memory
+INDEX_CACHE_SIZE = 256
+# Leading words that only group labels ("type: bug", "area/api", "kind-feature")
+GROUP_PREFIXES = frozenset((
+    "area", "category", "component", "kind", "priority", "scope", "status", "topic", "type",
+))
+# Common names for the same label, keyed and valued by their normalized form
+ALIASES = {
+    "defect": "bug",
+    "doc": "documentation",
+    "feature": "enhancement",
+    "feature request": "enhancement",
+    "improvement": "enhancement",
+    "perf": "performance",
+    "won t fix": "wontfix",
+}
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def _singular(word: str) -> str:
+    """Strip a plural ending, so "docs" and "doc" normalize alike"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_label(name: str) -> str:
+    """
+    Normalize a label for comparison.
+    
+    Case, emoji, punctuation and separators are dropped and words are
+    made singular, so "Type: Bugs 🐛" normalizes to "type bug".
+    """
+    return " ".join(_singular(word) for word in _SEPARATORS.split(name.casefold()) if word)
+
+
+def canonical_label(name: str) -> str:
+    """The normalized label without its group prefix, with aliases resolved"""
+    words = normalize_label(name).split(" ")
+    if len(words) > 1 and words[0] in GROUP_PREFIXES:
+        words = words[1:]
+    core = " ".join(words)
+    return ALIASES.get(core, core)
+
+
+def _trigrams(key: str) -> frozenset:
+    padded = f" {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class LabelIndex:
+    """
+    Match index over one repository's labels.
+    
+    A suggestion maps onto a label when their normalized forms are equal,
+    then when their canonical forms are (so "enhancement" finds
+    "type: feature"), and failing both onto the label whose canonical form
+    shares the most character trigrams with it, if their Dice similarity
+    reaches ``threshold``. Candidates come from an inverted trigram index,
+    so a lookup touches only labels with at least one trigram in common.
+    """
+    
+    def __init__(self, names: Sequence[str], threshold: float = DEFAULT_THRESHOLD):
+        self.names = tuple(names)
+        self.threshold = threshold
+        self._exact: Dict[str, str] = {}
+        for name in self.names:
+            self._exact.setdefault(normalize_label(name), name)
+        self._canonical: Dict[str, str] = {}
+        self._grams: List[frozenset] = []
+        self._postings: Dict[str, List[int]] = {}
+        for name in self.names:
+            key = canonical_label(name)
+            if key in self._canonical:
+                continue
+            self._canonical[key] = name
+            grams = _trigrams(key)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(len(self._grams))
+            self._grams.append(grams)
+        self._fuzzy_names = list(self._canonical.values())
+    
+    def match(self, label: str) -> Optional[str]:
+        """The repository label a suggestion stands for, or None"""
+        exact = self._exact.get(normalize_label(label))
+        if exact is not None:
+            return exact
+        key = canonical_label(label)
+        canonical = self._canonical.get(key)
+        if canonical is not None:
+            return canonical
+        
+        grams = _trigrams(key)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        best, best_score = None, self.threshold
+        for position, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._grams[position]))
+            if score >= best_score and (best is None or score > best_score or position < best):
+                best, best_score = position, score
+        return self._fuzzy_names[best] if best is not None else None
+
+
+class LabelCatalogs:
+    """
+    Label names of each repository, and the matching of suggestions onto them.
+    
+    Catalogs are fetched by the caller; this class remembers them with the
+    time they were last confirmed, so a catalog is served from memory for
+    ``ttl`` seconds before the caller revalidates it. Match indexes are
+    built once per distinct label set.
+    """
+    
+    def __init__(self, ttl: float = 300, threshold: float = DEFAULT_THRESHOLD):
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._repos: Dict[str, Tuple[float, Tuple[str, ...]]] = {}
+        self._indexes: "OrderedDict[Tuple[str, ...], LabelIndex]" = OrderedDict()
+        self.kept = 0
+        self.mapped = 0
+        self.dropped = 0
+    
+    def fresh(self, owner: str, repo: str) -> Optional[Tuple[str, ...]]:
+        """A repository's label names if confirmed within ``ttl`` seconds"""
+        with self._lock:
+            entry = self._repos.get(f"{owner}/{repo}".lower())
+        if entry is None or time.time() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+    
+    def known(self, owner: str, repo: str) -> Optional[Tuple[str, ...]]:
+        """A repository's last known label names, however old"""
+        with self._lock:
+            entry = self._repos.get(f"{owner}/{repo}".lower())
+        return entry[1] if entry else None
+    
+    def store(self, owner: str, repo: str, names: Sequence[str]) -> Tuple[str, ...]:
+        """Record a repository's label names as confirmed now"""
+        names = tuple(names)
+        with self._lock:
+            self._repos[f"{owner}/{repo}".lower()] = (time.time(), names)
+        return names
+    
+    def match(self, names: Sequence[str], suggested: Sequence[str]) -> List[str]:
+        """
+        Map suggested labels onto the given label names.
+        
+        Suggestions without a match are dropped, and two suggestions
+        mapping onto the same label keep it once, in first-seen order.
+        """
+        index = self._index(tuple(names))
+        matched: Dict[str, None] = {}
+        for label in suggested:
+            name = index.match(str(label))
+            with self._lock:
+                if name is None:
+                    self.dropped += 1
+                elif name == label:
+                    self.kept += 1
+                else:
+                    self.mapped += 1
+            if name is None:
+                logger.debug(f"Dropping suggested label without a match: {label}")
+            else:
+                matched[name] = None
+        return list(matched)
+    
+    def stats(self) -> Dict[str, int]:
+        """Repositories with a catalog, and suggestions kept, mapped and dropped"""
+        with self._lock:
+            return {
+                "repositories": len(self._repos),
+                "kept": self.kept,
+                "mapped": self.mapped,
+                "dropped": self.dropped,
+            }
+    
+    def _index(self, names: Tuple[str, ...]) -> LabelIndex:
+        with self._lock:
+            index = self._indexes.get(names)
+            if index is not None:
+                self._indexes.move_to_end(names)
+                return index
+        index = LabelIndex(names, self.threshold)
+        with self._lock:
+            self._indexes[names] = index
+            if len(self._indexes) > INDEX_CACHE_SIZE:
+                self._indexes.popitem(last=False)
+        return index
@@ -3,15 +3,25 @@ FastAPI Backend for AI-Powered GitHub Issue Assistant
 Main entry point for the application
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+import json
 import logging
+import math
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 from .issue_analyzer import IssueAnalyzer
-from .cache import get_cache
+from .cache import get_cache, get_response_cache
+from .singleflight import get_singleflight
+from .rate_limiter import RateLimitedError
+from .response_parser import IssueAnalysis
+from .webhooks import PrecomputeQueue, QueueFullError, issue_from_event, verify_signature
 
 # Load environment variables from .env file (in project root)
 env_path = Path(__file__).parent.parent / '.env'
@@ -21,13 +31,62 @@ load_dotenv(env_path)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared analyzer on startup and close its pools on shutdown"""
+    try:
+        get_analyzer()
+    except ValueError as e:
+        logger.warning(f"Analyzer not initialized at startup: {e}")
+    yield
+    webhook_queue = getattr(app.state, "webhook_queue", None)
+    if webhook_queue is not None:
+        await webhook_queue.close()
+        app.state.webhook_queue = None
+    analyzer = getattr(app.state, "analyzer", None)
+    if analyzer is not None:
+        await analyzer.aclose()
+        app.state.analyzer = None
+        logger.info("Closed analyzer connection pools")
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="GitHub Issue Assistant",
     description="AI-powered GitHub issue analysis API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+
+def get_analyzer() -> IssueAnalyzer:
+    """
+    Get the application-wide analyzer, creating it on first use.
+    
+    Raises:
+        ValueError: If the analyzer cannot be configured
+    """
+    analyzer = getattr(app.state, "analyzer", None)
+    if analyzer is None:
+        analyzer = IssueAnalyzer()
+        app.state.analyzer = analyzer
+    return analyzer
+
+
+def get_webhook_queue() -> PrecomputeQueue:
+    """Get the application-wide webhook precompute queue, creating it on first use"""
+    webhook_queue = getattr(app.state, "webhook_queue", None)
+    if webhook_queue is None:
+        webhook_queue = PrecomputeQueue(
+            lambda job: get_analyzer().analyze_issue_event_async(*job),
+            max_depth=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+            workers=int(os.getenv("WEBHOOK_WORKERS", "2")),
+        )
+        app.state.webhook_queue = webhook_queue
+    return webhook_queue
+
+
 # Configure CORS for frontend communication
 app.add_middleware(
     CORSMiddleware,
@@ -37,23 +96,93 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Largest batch accepted by /analyze/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
 # Pydantic models for request/response
 class IssueRequest(BaseModel):
     repo_url: str
     issue_number: int
 
 
-class IssueAnalysis(BaseModel):
-    summary: str
-    type: str
-    priority_score: str
-    suggested_labels: list
-    potential_impact: str
-    reasoning: str
+class BatchRequest(BaseModel):
+    """Either explicit items, or repo_url with an inclusive start..end range"""
+    items: List[IssueRequest] = []
+    repo_url: Optional[str] = None
+    start: Optional[int] = None
+    end: Optional[int] = None
+    
+    def issue_refs(self) -> List[Tuple[str, int]]:
+        """
+        Expand the request into (repo_url, issue_number) pairs.
+        
+        Raises:
+            ValueError: If the request is empty, mixes modes or is too large
+        """
+        if self.items and self.repo_url:
+            raise ValueError("Provide either items or repo_url with a range, not both")
+        if self.repo_url:
+            if self.start is None or self.end is None or self.start > self.end:
+                raise ValueError("A repo_url batch needs start <= end")
+            count = self.end - self.start + 1
+            if count > BATCH_MAX_ITEMS:
+                raise ValueError(f"Batch too large: {count} issues (max {BATCH_MAX_ITEMS})")
+            return [(self.repo_url, n) for n in range(self.start, self.end + 1)]
+        if not self.items:
+            raise ValueError("Batch is empty")
+        if len(self.items) > BATCH_MAX_ITEMS:
+            raise ValueError(f"Batch too large: {len(self.items)} issues (max {BATCH_MAX_ITEMS})")
+        return [(item.repo_url, item.issue_number) for item in self.items]
+
+
+class RepoRequest(BaseModel):
+    repo_url: str
+    state: Literal["open", "closed", "all"] = "open"
+    # Only analyze issues updated since the last completed incremental run
+    incremental: bool = False
+
+
+class BatchItemResult(BaseModel):
+    repo_url: str
+    issue_number: int
+    analysis: Optional[IssueAnalysis] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+
+class WebhookResponse(BaseModel):
+    # queued, coalesced (replaced a queued event for the same issue), ignored or pong
+    status: str
 
 
 class StatsResponse(BaseModel):
     cached_items: int
+    cache_bytes: int
+    cache_hits: int
+    cache_misses: int
+    cache_evictions: int
+    cache_expirations: int
+    analyses_in_flight: int
+    analyses_coalesced: int
+    upstream_retries: int = 0
+    # Token bucket state per "upstream:credential id"
+    rate_limits: Dict[str, Dict[str, Any]] = {}
+    # Webhook precompute queue depth and job counters
+    webhooks: Dict[str, int] = {}
+    # Analyses answered by the local classifier vs escalated to the LLM
+    local_classifier: Dict[str, int] = {}
+    # Indexed issues and near-duplicates found
+    duplicates: Dict[str, int] = {}
+    # Repositories with a label catalog, and suggested labels kept, mapped or dropped
+    labels: Dict[str, int] = {}
+    # Stored GitHub responses kept for revalidation (separate from analyses)
+    github_cache: Dict[str, int] = {}
     version: str
     status: str
 
@@ -82,11 +211,13 @@ async def analyze_issue(request: IssueRequest):
     try:
         logger.info(f"Analyzing issue #{request.issue_number} from {request.repo_url}")
         
-        analyzer = IssueAnalyzer()
-        result = analyzer.analyze(request.repo_url, request.issue_number)
+        analyzer = get_analyzer()
+        result = await analyzer.analyze_async(request.repo_url, request.issue_number)
         
         return IssueAnalysis(**result)
     
+    except RateLimitedError as e:
+        raise _too_many_requests(e)
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -95,6 +226,299 @@ async def analyze_issue(request: IssueRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _too_many_requests(e: RateLimitedError) -> HTTPException:
+    """A 429 for a rate limit that outlasted the retries, with its Retry-After if known"""
+    logger.warning(f"Rate limited: {str(e)}")
+    headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+    return HTTPException(status_code=429, detail=str(e), headers=headers)
+
+
+@app.post("/analyze/stream")
+async def analyze_issue_stream(
+    request: IssueRequest,
+    format: Literal["ndjson", "sse"] = Query("ndjson"),
+):
+    """
+    Analyze a GitHub issue, streaming analysis fields as they are generated.
+    
+    Emits a ``field`` record (``name``, ``value``) as each field of the
+    analysis arrives from the LLM, summary and type first, then a final
+    ``analysis`` record holding the validated IssueAnalysis, or an
+    ``error`` record if the analysis failed. Cached analyses produce only
+    the final record.
+    
+    Args:
+        format: ``ndjson`` (one JSON object per line) or ``sse``
+            (Server-Sent Events)
+    
+    Returns:
+        StreamingResponse: application/x-ndjson or text/event-stream
+    """
+    try:
+        analyzer = get_analyzer()
+        analyzer.parse_repo_url(request.repo_url)
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Streaming analysis of issue #{request.issue_number} from {request.repo_url}")
+    encode = _encode_sse if format == "sse" else _encode_ndjson
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        (encode(record) async for record in _analysis_records(analyzer, request)),
+        media_type=media_type,
+    )
+
+
+async def _analysis_records(analyzer: IssueAnalyzer, request: IssueRequest) -> AsyncIterator[Dict]:
+    """Yield field and analysis records, turning failures into an error record"""
+    try:
+        async for record in analyzer.analyze_stream_async(request.repo_url, request.issue_number):
+            if record["event"] == "analysis":
+                record["analysis"] = IssueAnalysis(**record["analysis"]).model_dump()
+            yield record
+    except Exception as e:
+        logger.error(f"Streamed analysis failed: {str(e)}")
+        yield {"event": "error", "error": str(e)}
+
+
+@app.post("/analyze/batch", response_model=BatchResponse)
+async def analyze_batch(request: BatchRequest):
+    """
+    Analyze many GitHub issues in one request.
+    
+    Issues are analyzed with a bounded number in flight and results are
+    returned in input order; a failed item carries an error instead of
+    failing the whole batch.
+    
+    Returns:
+        BatchResponse: One result per requested issue
+    """
+    try:
+        refs = request.issue_refs()
+        logger.info(f"Analyzing batch of {len(refs)} issues")
+        
+        analyzer = get_analyzer()
+        results = await analyzer.analyze_batch_async(refs)
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    failed = sum(1 for result in results if result["error"])
+    return BatchResponse(
+        results=[BatchItemResult(**result) for result in results],
+        succeeded=len(results) - failed,
+        failed=failed,
+    )
+
+
+@app.post("/analyze/batch/stream")
+async def analyze_batch_stream(
+    request: BatchRequest,
+    format: Literal["ndjson", "sse"] = Query("ndjson"),
+):
+    """
+    Analyze many GitHub issues, streaming each result as soon as it is ready.
+    
+    Emits ``result`` records in completion order (with the item's input
+    ``index``), a ``progress`` record after each result and a final
+    ``summary`` record. Results are not held server-side, so memory use
+    is flat regardless of batch size.
+    
+    Args:
+        format: ``ndjson`` (one JSON object per line) or ``sse``
+            (Server-Sent Events)
+    
+    Returns:
+        StreamingResponse: application/x-ndjson or text/event-stream
+    """
+    try:
+        refs = request.issue_refs()
+        analyzer = get_analyzer()
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Streaming batch of {len(refs)} issues as {format}")
+    return _stream_records(analyzer.iter_batch_async(refs), len(refs), format)
+
+
+@app.post("/analyze/repo/stream")
+async def analyze_repo_stream(
+    request: RepoRequest,
+    format: Literal["ndjson", "sse"] = Query("ndjson"),
+):
+    """
+    Analyze every issue in a repository, streaming results as they finish.
+    
+    Issues and comments are ingested through GitHub's paginated list
+    endpoints (a few requests per 100 issues), and each page of issues is
+    analyzed as soon as it is listed. Records have the same shape as
+    /analyze/batch/stream, except that progress records carry a null
+    ``total`` while the repository is still being listed.
+    
+    Args:
+        format: ``ndjson`` (one JSON object per line) or ``sse``
+            (Server-Sent Events)
+    
+    Returns:
+        StreamingResponse: application/x-ndjson or text/event-stream
+    """
+    try:
+        analyzer = get_analyzer()
+        owner, repo = analyzer.parse_repo_url(request.repo_url)
+        cursor = None
+        if request.incremental:
+            cursor = await analyzer.get_sync_cursor_async(owner, repo, request.state)
+        if cursor:
+            pages = analyzer.iter_repo_issues_async(
+                owner, repo, request.state, since=cursor["since"], seen=cursor["seen"]
+            )
+        else:
+            pages = analyzer.iter_repo_issues_async(owner, repo, request.state)
+        # List the first page up front, so an unreadable repository is a 400
+        first_page = await anext(pages)
+    except RateLimitedError as e:
+        raise _too_many_requests(e)
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # updated_at of every listed issue, all the sync cursor needs of a run
+    listed: Dict[int, str] = {}
+    
+    async def listed_pages():
+        page = first_page
+        while page is not None:
+            listed.update((number, issue_data["updated_at"]) for number, issue_data in page.items())
+            yield page
+            page = await anext(pages, None)
+    
+    on_complete = None
+    if request.incremental:
+        def on_complete():
+            return analyzer.save_sync_cursor_async(owner, repo, request.state, listed, cursor)
+    
+    logger.info(f"Streaming analysis of {owner}/{repo} as {format}")
+    return _stream_records(
+        analyzer.iter_issue_pages_async(owner, repo, listed_pages()), None, format, on_complete
+    )
+
+
+def _stream_records(
+    results: AsyncIterator[Tuple[int, Dict]],
+    total: Optional[int],
+    format: str,
+    on_complete: Optional[Callable[[], Awaitable[None]]] = None,
+) -> StreamingResponse:
+    """Stream (index, result) pairs as NDJSON or SSE records"""
+    encode = _encode_sse if format == "sse" else _encode_ndjson
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        (encode(record) async for record in _result_records(results, total, on_complete)),
+        media_type=media_type,
+    )
+
+
+async def _result_records(
+    results: AsyncIterator[Tuple[int, Dict]],
+    total: Optional[int],
+    on_complete: Optional[Callable[[], Awaitable[None]]] = None,
+) -> AsyncIterator[Dict]:
+    """
+    Yield result, progress and summary records for streamed results.
+    
+    A ``total`` of None means the number of results is not known until
+    they run out; the summary then reports how many there were. If the
+    results themselves fail (e.g. a later page of a repository listing),
+    an ``error`` record precedes the summary.
+    
+    ``on_complete`` runs only once every result has been produced without
+    errors, so an interrupted or partly failed run can simply be retried.
+    """
+    started = time.monotonic()
+    completed = failed = 0
+    error = None
+    try:
+        async for index, result in results:
+            completed += 1
+            failed += 1 if result["error"] else 0
+            yield {"event": "result", "index": index, **BatchItemResult(**result).model_dump()}
+            yield {"event": "progress", "completed": completed, "total": total}
+    except Exception as e:
+        logger.error(f"Streamed results failed: {str(e)}")
+        error = str(e)
+        yield {"event": "error", "error": error}
+    if on_complete is not None and failed == 0 and error is None:
+        await on_complete()
+    yield {
+        "event": "summary",
+        "total": completed if total is None else total,
+        "succeeded": completed - failed,
+        "failed": failed,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+
+
+def _encode_ndjson(record: Dict) -> str:
+    return json.dumps(record) + "\n"
+
+
+def _encode_sse(record: Dict) -> str:
+    return f"event: {record['event']}\ndata: {json.dumps(record)}\n\n"
+
+
+@app.post("/webhooks/github", response_model=WebhookResponse, status_code=202)
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(""),
+    x_hub_signature_256: Optional[str] = Header(None),
+):
+    """
+    Receive GitHub issues and issue_comment events.
+    
+    Deliveries must be signed with GITHUB_WEBHOOK_SECRET. The changed
+    issue is analyzed in the background from the event payload, so a
+    later /analyze of it is served from the cache. Other events are
+    acknowledged and ignored.
+    
+    Returns:
+        WebhookResponse: What was done with the event
+    """
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET")
+    if not secret:
+        raise HTTPException(status_code=503, detail="GITHUB_WEBHOOK_SECRET is not configured")
+    body = await request.body()
+    if not verify_signature(secret, body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    if x_github_event == "ping":
+        return WebhookResponse(status="pong")
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook payload is not valid JSON")
+    job = issue_from_event(x_github_event, payload) if isinstance(payload, dict) else None
+    if job is None:
+        return WebhookResponse(status="ignored")
+    
+    owner, repo, issue = job
+    try:
+        analyzer = get_analyzer()
+        issue_key = analyzer.issue_cache_key(owner, repo, issue["number"])
+        queued = get_webhook_queue().submit(issue_key, job)
+        # Until the new analysis is in, /analyze asks GitHub again
+        await analyzer.expire_issue_async(owner, repo, issue["number"])
+    except QueueFullError as e:
+        logger.warning(f"Dropped webhook for {owner}/{repo}#{issue['number']}: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    logger.info(f"Queued {x_github_event} event for {owner}/{repo}#{issue['number']}")
+    return WebhookResponse(status="queued" if queued else "coalesced")
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check endpoint"""
@@ -108,9 +532,26 @@ async def health_check():
 @app.get("/stats", response_model=StatsResponse)
 async def get_stats():
     """Get API statistics and cache status"""
-    cache = get_cache()
+    cache_stats = get_cache().stats()
+    flight_stats = get_singleflight().stats()
+    analyzer = getattr(app.state, "analyzer", None)
+    webhook_queue = getattr(app.state, "webhook_queue", None)
     return StatsResponse(
-        cached_items=len(cache.cache),
+        cached_items=cache_stats["items"],
+        cache_bytes=cache_stats["bytes"],
+        cache_hits=cache_stats["hits"],
+        cache_misses=cache_stats["misses"],
+        cache_evictions=cache_stats["evictions"],
+        cache_expirations=cache_stats["expirations"],
+        analyses_in_flight=flight_stats["in_flight"],
+        analyses_coalesced=flight_stats["coalesced"],
+        upstream_retries=analyzer.rate_limits.retries if analyzer else 0,
+        rate_limits=analyzer.rate_limits.stats() if analyzer else {},
+        webhooks=webhook_queue.stats() if webhook_queue else {},
+        local_classifier=analyzer.classifier.stats() if analyzer and analyzer.classifier else {},
+        duplicates=analyzer.duplicates.stats() if analyzer and analyzer.duplicates else {},
+        labels=analyzer.labels.stats() if analyzer and analyzer.labels else {},
+        github_cache=get_response_cache().stats(),
         version="1.0.0",
         status="operational"
     )
@@ -118,9 +559,9 @@ async def get_stats():
 
 @app.post("/cache/clear")
 async def clear_cache():
-    """Clear the analysis cache"""
-    cache = get_cache()
-    cache.clear()
+    """Clear the analysis cache and the stored GitHub responses"""
+    get_cache().clear()
+    get_response_cache().clear()
     return {"message": "Cache cleared successfully"}
 
 
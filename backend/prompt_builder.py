@@ -0,0 +1,201 @@
+"""
+Token-budgeted prompt assembly
+Fits issue bodies and comments into a fixed number of prompt tokens
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+# Word pieces of up to 6 characters plus single punctuation marks follow
+# BPE token counts closely enough to budget English prose and code
+_TOKEN_PIECE = re.compile(r"\w{1,6}|[^\w\s]")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+# JavaScript/Java "at ...", Python 'File "...", line N', gdb "#N 0x..." and Go "file.go:N +0x.."
+_STACK_FRAME = re.compile(
+    r'^\s*(?:at\s+\S|File\s+"[^"]*",\s+line\s+\d+|#\d+\s+0x[0-9a-fA-F]+|\S+\.go:\d+\s+\+0x)'
+)
+
+# Lines kept at each end of an oversized code or log block
+BLOCK_KEEP_LINES = 15
+# Blocks longer than this many lines are trimmed to their head and tail
+BLOCK_MAX_LINES = 2 * BLOCK_KEEP_LINES + 10
+# Default token cap for a single comment
+COMMENT_MAX_TOKENS = 300
+
+
+class TokenCounter:
+    """
+    Fast token-count estimates with an LRU cache.
+    
+    Entries are keyed by length and hash rather than by the text itself,
+    so the cache never keeps large issue bodies alive. Python caches a
+    string's hash, so counting the same string again is O(1); a hash
+    collision could only skew an estimate.
+    """
+    
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def count(self, text: str) -> int:
+        """Estimate the number of LLM tokens in text"""
+        key = (len(text), hash(text))
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return count
+            self.misses += 1
+        
+        count = sum(1 for _ in _TOKEN_PIECE.finditer(text))
+        with self._lock:
+            self._counts[key] = count
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+
+_counter = TokenCounter()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in text (cached)"""
+    return _counter.count(text)
+
+
+def compact_text(text: str) -> str:
+    """
+    Shrink pasted logs and traces without touching ordinary prose.
+    
+    Stack frames already seen earlier in the text are dropped, then every
+    code block (fenced, or a run of BLOCK_MAX_LINES lines without a blank
+    line) longer than BLOCK_MAX_LINES is cut to its first and last
+    BLOCK_KEEP_LINES lines. Runs in O(n) of the text length.
+    """
+    out: List[str] = []
+    block: List[str] = []
+    fenced = False
+    
+    def flush():
+        if len(block) > BLOCK_MAX_LINES:
+            trimmed = len(block) - 2 * BLOCK_KEEP_LINES
+            out.extend(block[:BLOCK_KEEP_LINES])
+            out.append(f"... [{trimmed} lines trimmed] ...")
+            out.extend(block[-BLOCK_KEEP_LINES:])
+        else:
+            out.extend(block)
+        block.clear()
+    
+    for line in _drop_repeated_frames(text.splitlines()):
+        if _FENCE.match(line):
+            flush()
+            out.append(line)
+            fenced = not fenced
+        elif not fenced and not line.strip():
+            flush()
+            out.append(line)
+        else:
+            block.append(line)
+    flush()
+    return "\n".join(out)
+
+
+def _drop_repeated_frames(lines: List[str]) -> List[str]:
+    """Drop stack frames (and a Python frame's source line) seen before"""
+    seen = set()
+    out: List[str] = []
+    dropped = 0
+    skip_source = False
+    for line in lines:
+        is_frame = bool(_STACK_FRAME.match(line))
+        if skip_source:
+            skip_source = False
+            if not is_frame and line[:1].isspace():
+                continue
+        if is_frame:
+            frame = line.strip()
+            if frame in seen:
+                dropped += 1
+                skip_source = frame.startswith("File ")
+                continue
+            seen.add(frame)
+        if dropped:
+            out.append(f"    ... [{dropped} repeated stack frames omitted]")
+            dropped = 0
+        out.append(line)
+    if dropped:
+        out.append(f"    ... [{dropped} repeated stack frames omitted]")
+    return out
+
+
+def fit_text(text: str, max_tokens: int) -> str:
+    """
+    Cut text to about max_tokens, keeping its head and tail.
+    
+    The first two thirds of the budget go to the start of the text, where
+    the problem is usually described, and the rest to its end, where the
+    final error usually is.
+    """
+    if max_tokens <= 0:
+        return ""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    
+    marker = "\n... [trimmed to fit the prompt budget] ...\n"
+    # Token density is uneven, so shrink until the estimate fits
+    target = max_tokens - estimate_tokens(marker)
+    for _ in range(4):
+        chars = max(int(len(text) * target / tokens), 0)
+        head = chars * 2 // 3
+        tail = chars - head
+        fitted = text[:head] + marker + (text[-tail:] if tail else "")
+        fitted_tokens = estimate_tokens(fitted)
+        if fitted_tokens <= max_tokens:
+            return fitted
+        target = int(target * max_tokens / fitted_tokens) - 1
+    return fitted
+
+
+def fit_sections(
+    body: str,
+    comments: List[str],
+    max_tokens: int,
+    comment_max_tokens: int = COMMENT_MAX_TOKENS,
+) -> Tuple[str, List[str]]:
+    """
+    Fit an issue body and its comments into max_tokens.
+    
+    Comments may claim up to a quarter of the budget before the body is
+    trimmed; whatever the body leaves is then filled with comments in the
+    order given (most important first), skipping any that no longer fit.
+    
+    Args:
+        body: Issue body
+        comments: Comment bodies, most important first
+        max_tokens: Tokens available to the body and comments together
+        comment_max_tokens: Cap on any single comment
+    
+    Returns:
+        Tuple of (fitted body, fitted comments in the order given)
+    """
+    body = compact_text(body)
+    comments = [fit_text(compact_text(comment), comment_max_tokens) for comment in comments]
+    # Each comment is rendered as its own "- " bullet line
+    costs = [estimate_tokens(comment) + 2 for comment in comments]
+    
+    body = fit_text(body, max_tokens - min(sum(costs), max_tokens // 4))
+    remaining = max_tokens - estimate_tokens(body)
+    
+    kept = []
+    for comment, cost in zip(comments, costs):
+        if cost <= remaining:
+            kept.append(comment)
+            remaining -= cost
+    return body, kept
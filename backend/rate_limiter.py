@@ -0,0 +1,383 @@
+"""
+Client-side rate limiting and retry scheduling
+Queues upstream calls behind per-credential token buckets and retries
+rate-limited calls after the delay the upstream asks for
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Gateway and overload statuses worth retrying besides rate limits
+TRANSIENT_STATUSES = (502, 503, 504)
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimitedError(ValueError):
+    """An upstream rate limit could not be waited out within the retry budget"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket for one upstream credential.
+    
+    Callers reserve a token and wait until it is theirs; tokens may go
+    negative, so concurrent callers queue in arrival order instead of
+    failing. A bucket starts with a fixed refill rate (0 = unlimited).
+    Once the upstream reports its quota, the bucket follows the quota
+    window instead: the remaining quota is the available tokens, a full
+    quota is added back at each reset, and callers beyond it are queued
+    into the following windows.
+    """
+    
+    def __init__(self, rate: float = 0.0, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        # End of the reported quota window, and the longest window seen
+        self.reset_at = 0.0
+        self.window = 0.0
+        self.taken = 0
+        self.waits = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, max_wait: float = float("inf")) -> Optional[float]:
+        """
+        Take a token, returning how many seconds to wait before using it.
+        
+        Returns:
+            The wait, or None (taking no token) if it would exceed max_wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            delay = max(self.blocked_until - now, 0.0)
+            if self.tokens < 1:
+                if self.reset_at:
+                    windows = math.ceil((1 - self.tokens) / self.capacity)
+                    delay = max(delay, self.reset_at - now + (windows - 1) * self.window)
+                elif self.rate > 0:
+                    delay = max(delay, (1 - self.tokens) / self.rate)
+            if delay > max_wait:
+                return None
+            if self.rate > 0 or self.reset_at:
+                self.tokens -= 1
+            self.taken += 1
+            if delay:
+                self.waits += 1
+            return delay
+    
+    def available(self) -> float:
+        """Tokens available now, or minus the seconds until one is (for routing)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(self.blocked_until - now, 0.0)
+            if self.tokens < 1:
+                if self.reset_at:
+                    wait = max(wait, self.reset_at - now)
+                elif self.rate > 0:
+                    wait = max(wait, (1 - self.tokens) / self.rate)
+            if wait > 0:
+                return -wait
+            if not self.reset_at and self.rate <= 0:
+                # Unmetered until the upstream reports a quota
+                return float("inf")
+            return self.tokens
+    
+    def observe(self, remaining: Optional[float], reset_after: Optional[float]):
+        """Resynchronize with the quota the upstream reported"""
+        if remaining is None or reset_after is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            reset_at = now + max(reset_after, 0.001)
+            self.window = max(self.window, reset_at - now)
+            # The request just answered was part of the quota too
+            self.capacity = max(self.capacity, remaining + 1)
+            if reset_at > self.reset_at + self.window / 2:
+                # First report, or a window this bucket has not rolled into;
+                # callers already queued draw on it first
+                self.tokens = min(self.tokens, 0.0) + remaining
+            else:
+                # Other clients sharing the credential also use the quota
+                self.tokens = min(self.tokens, remaining)
+            self.reset_at = reset_at
+    
+    def block(self, seconds: float):
+        """Hold every caller back for the given number of seconds"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+    
+    def _refill(self, now: float):
+        if self.reset_at:
+            if now >= self.reset_at:
+                windows = math.floor((now - self.reset_at) / self.window) + 1
+                self.tokens = min(self.tokens + windows * self.capacity, self.capacity)
+                self.reset_at += windows * self.window
+        elif self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimitScheduler:
+    """
+    Runs upstream calls through per-(upstream, credential) token buckets.
+    
+    Rate-limited calls (429, or GitHub's 403 with an exhausted quota) and
+    transient gateway errors are retried after the upstream's Retry-After
+    or quota reset, else after a jittered exponential backoff. The whole
+    bucket waits with a retried call, so queued calls do not pile onto the
+    limit. A call is given up once it runs out of retries or would have to
+    wait longer than ``max_wait``.
+    """
+    
+    def __init__(
+        self,
+        rates: Optional[Mapping[str, float]] = None,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        max_wait: float = 60.0,
+    ):
+        self.rates = dict(rates or {})
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_wait = max_wait
+        self.retries = 0
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+    
+    def bucket(self, upstream: str, credential: Optional[str]) -> TokenBucket:
+        """Get the bucket of a credential, creating it on first use"""
+        key = (upstream, credential_id(credential))
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rates.get(upstream, 0.0))
+            return self._buckets[key]
+    
+    def run(self, upstream: str, credential: Optional[str], call: Callable[[], Any]) -> Any:
+        """
+        Call an upstream, queueing behind its bucket and retrying rate limits.
+        
+        ``call`` returns a response (requests or httpx), or an object or
+        error carrying one in ``.response`` as Groq SDK streams and errors
+        do. The final outcome is returned, or the final error re-raised,
+        for the caller to handle as before.
+        
+        Raises:
+            RateLimitedError: If the bucket would hold the call longer than max_wait
+        """
+        return self.run_pool(upstream, [credential], lambda _: call())
+    
+    async def run_async(
+        self, upstream: str, credential: Optional[str], call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Async variant of run()"""
+        return await self.run_pool_async(upstream, [credential], lambda _: call())
+    
+    def run_pool(
+        self, upstream: str, credentials: Sequence[Optional[str]], call: Callable[[Optional[str]], Any]
+    ) -> Any:
+        """
+        Like run(), but each attempt goes out with the pool credential that
+        has the most quota left, passed to ``call``.
+        
+        A credential whose quota is exhausted is parked until its reset and
+        the retry moves on to another one, so a pool of N credentials
+        sustains N quotas' worth of requests.
+        
+        Raises:
+            RateLimitedError: If every credential would hold the call longer than max_wait
+        """
+        for attempt in range(self.max_retries + 1):
+            credential = self.pick(upstream, credentials)
+            bucket = self.bucket(upstream, credential)
+            time.sleep(self._reserve(upstream, bucket))
+            try:
+                outcome = call(credential)
+            except Exception as e:
+                outcome = e
+            if not self._should_retry(upstream, bucket, attempt, outcome, len(credentials) > 1):
+                return self._result(outcome)
+    
+    async def run_pool_async(
+        self,
+        upstream: str,
+        credentials: Sequence[Optional[str]],
+        call: Callable[[Optional[str]], Awaitable[Any]],
+    ) -> Any:
+        """Async variant of run_pool()"""
+        for attempt in range(self.max_retries + 1):
+            credential = self.pick(upstream, credentials)
+            bucket = self.bucket(upstream, credential)
+            await asyncio.sleep(self._reserve(upstream, bucket))
+            try:
+                outcome = await call(credential)
+            except Exception as e:
+                outcome = e
+            if not self._should_retry(upstream, bucket, attempt, outcome, len(credentials) > 1):
+                return self._result(outcome)
+    
+    def pick(self, upstream: str, credentials: Sequence[Optional[str]]) -> Optional[str]:
+        """
+        Choose the credential with the most quota left.
+        
+        Credentials the upstream has not reported on yet come first, ties go
+        to the least used one, and if all are parked the one that resets
+        soonest is chosen.
+        """
+        if len(credentials) == 1:
+            return credentials[0]
+        buckets = [(self.bucket(upstream, credential), credential) for credential in credentials]
+        return max(buckets, key=lambda item: (item[0].available(), -item[0].taken))[1]
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-bucket state, keyed by "upstream:credential id" """
+        with self._lock:
+            buckets = dict(self._buckets)
+        now = time.monotonic()
+        return {
+            f"{upstream}:{credential}": {
+                "capacity": round(bucket.capacity, 1),
+                "tokens": round(bucket.tokens, 1),
+                "reset_seconds": round(max(bucket.reset_at - now, 0.0), 3),
+                "blocked_seconds": round(max(bucket.blocked_until - now, 0.0), 3),
+                "requests": bucket.taken,
+                "waits": bucket.waits,
+                "parked": bucket.available() < 0,
+            }
+            for (upstream, credential), bucket in buckets.items()
+        }
+    
+    def _reserve(self, upstream: str, bucket: TokenBucket) -> float:
+        """Queue for a token, failing fast if the wait would exceed max_wait"""
+        delay = bucket.reserve(self.max_wait)
+        if delay is None:
+            wait = max(bucket.blocked_until - time.monotonic(), 0.0)
+            raise RateLimitedError(f"{upstream} rate limit exhausted; retry later", retry_after=wait or None)
+        return delay
+    
+    def _should_retry(
+        self, upstream: str, bucket: TokenBucket, attempt: int, outcome: Any, pooled: bool = False
+    ) -> bool:
+        """
+        Record an attempt's rate-limit headers and decide whether to retry.
+        
+        A retry blocks the bucket for the retry delay, so the retried call
+        and everyone queued behind it wait together. In a pool, a bucket
+        with too long a delay is parked and the call retried on another.
+        """
+        # Errors and SDK streams carry the HTTP response in .response
+        response = getattr(outcome, "response", outcome)
+        if not hasattr(response, "status_code") or not hasattr(response, "headers"):
+            return False
+        headers = response.headers
+        bucket.observe(*quota(headers))
+        
+        status = response.status_code
+        if not is_rate_limited(status, headers) and status not in TRANSIENT_STATUSES:
+            return False
+        
+        delay = retry_after(headers)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if attempt >= self.max_retries or (delay > self.max_wait and not pooled):
+            logger.warning(f"Giving up on {upstream} after {attempt + 1} attempts (status {status})")
+            return False
+        
+        self.retries += 1
+        logger.warning(f"{upstream} returned {status}; retrying in {delay:.2f}s (attempt {attempt + 1})")
+        bucket.block(delay)
+        return True
+    
+    @staticmethod
+    def _result(outcome: Any) -> Any:
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def credential_id(credential: Optional[str]) -> str:
+    """Short, non-reversible identifier of a credential for bucket keys and stats"""
+    if not credential:
+        return "anonymous"
+    return hashlib.sha256(credential.encode()).hexdigest()[:8]
+
+
+def is_rate_limited(status: int, headers: Mapping[str, str]) -> bool:
+    """Whether a response is a rate limit (GitHub also uses 403 for them)"""
+    if status == 429:
+        return True
+    return status == 403 and (headers.get("x-ratelimit-remaining") == "0" or "retry-after" in headers)
+
+
+def quota(headers: Mapping[str, str]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Read the remaining request quota and the seconds until it resets.
+    
+    Understands GitHub's X-RateLimit-Remaining / X-RateLimit-Reset (epoch
+    seconds) and the x-ratelimit-remaining-requests /
+    x-ratelimit-reset-requests pair (durations like "2m59.56s") sent by
+    Groq and other OpenAI-compatible providers.
+    """
+    try:
+        if "x-ratelimit-remaining" in headers and "x-ratelimit-reset" in headers:
+            reset_after = float(headers["x-ratelimit-reset"]) - time.time()
+            return float(headers["x-ratelimit-remaining"]), reset_after
+        if "x-ratelimit-remaining-requests" in headers and "x-ratelimit-reset-requests" in headers:
+            reset_after = parse_duration(headers["x-ratelimit-reset-requests"])
+            return float(headers["x-ratelimit-remaining-requests"]), reset_after
+    except ValueError:
+        pass
+    return None, None
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds the upstream asked to wait: retry-after-ms, Retry-After or the quota reset"""
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    remaining, reset_after = quota(headers)
+    if remaining is not None and remaining < 1:
+        return max(reset_after, 0.0)
+    return None
+
+
+def parse_duration(value: str) -> float:
+    """
+    Parse a duration like "1m30.5s", "250ms" or "7" into seconds.
+    
+    Raises:
+        ValueError: If the value is not a duration
+    """
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        raise ValueError(f"Invalid duration: {value!r}")
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
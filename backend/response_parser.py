@@ -0,0 +1,389 @@
+"""
+Parsing of LLM responses
+Extracts, repairs and validates analysis JSON, including while a streamed
+completion is still arriving
+"""
+
+import re
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from pydantic import BaseModel, model_serializer
+
+from .prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_TYPES = frozenset(("bug", "feature_request", "documentation", "question", "other"))
+# Free-text fields of an analysis, coerced to strings
+TEXT_FIELDS = ("summary", "priority_score", "potential_impact", "reasoning")
+MAX_SUGGESTED_LABELS = 3
+MISSING_REASONING = "Reasoning not returned by model; defaulting to summary rationale."
+# Longest text the LLM is given room for in each field (per label for suggested_labels)
+FIELD_MAX_CHARS = {
+    "summary": 200,
+    "type": 16,
+    "priority_score": 200,
+    "suggested_labels": 40,
+    "potential_impact": 300,
+    "reasoning": 700,
+}
+# Conservative characters per token of English prose, for sizing completions
+CHARS_PER_TOKEN = 3
+
+_DECODER = json.JSONDecoder()
+# An array of objects, not a list field inside a single object
+_ARRAY_START = re.compile(r"\[\s*\{")
+# Runs of characters the repair scan copies unchanged, inside and outside strings
+_STRING_RUN = re.compile(r'[^"\\\u201c\u201d\x00-\x1f]+')
+_OUTSIDE_RUN = re.compile(r'[^"\u201c\u201d{}\[\]]+')
+_SMART_QUOTES = "\u201c\u201d"
+# Escapes JSON allows after a backslash (\u must be followed by four hex digits)
+_VALID_ESCAPE = re.compile(r'["\\/bfnrt]|u[0-9a-fA-F]{4}')
+# What may follow the quote that really closes a string
+_STRING_CLOSE = re.compile(r"\s*(?:[,:}\]]|$)")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+class IssueAnalysis(BaseModel):
+    summary: str
+    type: str
+    priority_score: str
+    suggested_labels: list
+    potential_impact: str
+    reasoning: str
+    # Set when the analysis was reused from a near-duplicate issue
+    duplicate_of: Optional[int] = None
+    duplicate_similarity: Optional[float] = None
+    
+    @model_serializer(mode="wrap")
+    def _omit_unset_duplicate(self, handler):
+        # Only analyses reused from a duplicate carry the duplicate fields
+        data = handler(self)
+        if data.get("duplicate_of") is None:
+            data.pop("duplicate_of", None)
+            data.pop("duplicate_similarity", None)
+        return data
+
+
+def analysis_json_schema() -> Dict[str, Any]:
+    """
+    JSON schema of the fields the LLM writes, derived from IssueAnalysis.
+    
+    Fields with a default are set by the server (e.g. duplicate_of) and
+    are left out. type is restricted to ANALYSIS_TYPES, suggested_labels
+    to at most MAX_SUGGESTED_LABELS strings, and no other properties are
+    allowed, as strict structured-output modes require.
+    """
+    model_schema = IssueAnalysis.model_json_schema()
+    properties = {}
+    for name in model_schema["required"]:
+        properties[name] = {
+            key: value for key, value in model_schema["properties"][name].items() if key != "title"
+        }
+    properties["type"]["enum"] = sorted(ANALYSIS_TYPES)
+    properties["suggested_labels"].update(items={"type": "string"}, maxItems=MAX_SUGGESTED_LABELS)
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(model_schema["required"]),
+        "additionalProperties": False,
+    }
+
+
+def analysis_max_tokens(schema: Dict[str, Any]) -> int:
+    """
+    Completion tokens an analysis needs at most.
+    
+    The JSON skeleton of the schema (keys, quotes and indentation) plus
+    FIELD_MAX_CHARS of text per field at CHARS_PER_TOKEN. A completion
+    cut off at this limit is still closed by repair_json().
+    """
+    skeleton = {
+        name: [""] * field.get("maxItems", 1) if field["type"] == "array" else ""
+        for name, field in schema["properties"].items()
+    }
+    chars = sum(
+        FIELD_MAX_CHARS[name] * field.get("maxItems", 1) for name, field in schema["properties"].items()
+    )
+    return estimate_tokens(json.dumps(skeleton, indent=2)) + math.ceil(chars / CHARS_PER_TOKEN)
+
+
+class IncrementalObjectParser:
+    """
+    Scans streamed text for the first top-level JSON object.
+    
+    Text before the object (e.g. a markdown fence) is ignored. feed()
+    returns the object's members as each one completes, so a caller can
+    show the summary before the reasoning has been generated, and
+    ``done`` turns True at the object's closing brace, after which the
+    rest of the stream can be dropped. Each character is scanned once.
+    """
+    
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._object: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = 0
+        self.done = False
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume the next piece of streamed text.
+        
+        Returns:
+            (name, value) pairs of the object members completed by this chunk
+        """
+        self._chunks.append(chunk)
+        members: List[Tuple[str, Any]] = []
+        for char in chunk:
+            if self.done:
+                break
+            if not self._object:
+                if char == "{":
+                    self._object.append(char)
+                    self._depth = 1
+                    self._member_start = 1
+                continue
+            
+            self._object.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._complete_member())
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                members.extend(self._complete_member())
+                self._member_start = len(self._object)
+        return members
+    
+    def result(self) -> str:
+        """The complete object's text, or everything fed so far if it never closed"""
+        if self.done:
+            return "".join(self._object)
+        return "".join(self._chunks)
+    
+    def _complete_member(self) -> List[Tuple[str, Any]]:
+        """Parse the member that ends just before the last scanned character"""
+        member = "".join(self._object[self._member_start:-1]).strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except ValueError:
+            return []
+
+
+def extract_json(text: str, array: bool = False) -> Any:
+    """
+    Decode the first JSON object (or array of objects) in an LLM response.
+    
+    Exactly one value is decoded from the first "{" (or "[" opening an
+    array of objects), so surrounding prose, a markdown fence, a stray
+    closing brace or a second object are ignored. Well-formed JSON is
+    decoded in C without any scanning in Python; only when that fails is
+    the value rescanned by repair_json() and decoded again.
+    
+    Args:
+        text: Raw response from the LLM
+        array: Extract an array of objects instead of an object
+    
+    Returns:
+        The decoded value
+    
+    Raises:
+        ValueError: If there is no JSON value or it cannot be repaired
+    """
+    if array:
+        match = _ARRAY_START.search(text)
+        start = match.start() if match else -1
+    else:
+        start = text.find("{")
+    if start < 0:
+        raise ValueError(f"Could not extract JSON {'array ' if array else ''}from LLM response")
+    
+    try:
+        return _DECODER.raw_decode(text, start)[0]
+    except json.JSONDecodeError as e:
+        error = e
+    repaired, repairs = repair_json(text, start)
+    if repairs:
+        try:
+            value = json.loads(repaired)
+            logger.info(f"Repaired LLM response JSON: {', '.join(repairs)}")
+            return value
+        except json.JSONDecodeError as e:
+            error = e
+    raise ValueError(f"Invalid JSON in LLM response: {error}")
+
+
+def repair_json(text: str, start: int = 0) -> Tuple[str, List[str]]:
+    """
+    Rewrite the JSON value starting at ``text[start]`` into valid JSON.
+    
+    One scan fixes the mistakes LLMs commonly make: trailing commas,
+    strings delimited by smart quotes, unescaped quotes (a quote only
+    closes a string when a comma, colon, closing bracket or the end of
+    the text follows), raw newlines and other control characters inside
+    strings, invalid backslash escapes, stray closing brackets, and
+    brackets or a string left open by a truncated response.
+    The scan stops where the value closes, so anything after it is
+    dropped. Runs of ordinary characters are copied by precompiled
+    regexes rather than one character at a time.
+    
+    Returns:
+        Tuple of (rewritten value, names of the repairs made)
+    """
+    out: List[str] = []
+    closers: List[str] = []
+    repairs: Dict[str, None] = {}
+    in_string = smart = False
+    position, end = start, len(text)
+    while position < end:
+        if in_string:
+            run = _STRING_RUN.match(text, position)
+            if run:
+                out.append(run.group())
+                position = run.end()
+                continue
+            char = text[position]
+            position += 1
+            if char == "\\":
+                escape = _VALID_ESCAPE.match(text, position)
+                if escape:
+                    out.append(text[position - 1:escape.end()])
+                    position = escape.end()
+                else:
+                    out.append("\\\\")
+                    repairs["invalid escapes"] = None
+            elif char == '"' and (smart or not _STRING_CLOSE.match(text, position)):
+                out.append('\\"')
+                repairs["unescaped quotes"] = None
+            elif char == '"' or (smart and char in _SMART_QUOTES):
+                out.append('"')
+                in_string = False
+            elif char in _SMART_QUOTES:
+                out.append(char)
+            else:
+                out.append(_CONTROL_ESCAPES.get(char) or f"\\u{ord(char):04x}")
+                repairs["control characters in strings"] = None
+            continue
+        
+        run = _OUTSIDE_RUN.match(text, position)
+        if run:
+            out.append(run.group())
+            position = run.end()
+            continue
+        char = text[position]
+        position += 1
+        if char == '"' or char in _SMART_QUOTES:
+            if char != '"':
+                repairs["smart quotes"] = None
+            out.append('"')
+            in_string, smart = True, char != '"'
+        elif char in "{[":
+            out.append(char)
+            closers.append("}" if char == "{" else "]")
+        elif char not in closers:
+            repairs["stray brackets"] = None
+        else:
+            if _drop_trailing_comma(out):
+                repairs["trailing commas"] = None
+            while closers[-1] != char:
+                out.append(closers.pop())
+                repairs["unclosed brackets"] = None
+            out.append(closers.pop())
+            if not closers:
+                break
+    
+    if in_string:
+        out.append('"')
+        repairs["unterminated string"] = None
+    if closers:
+        if _drop_trailing_comma(out):
+            repairs["trailing commas"] = None
+        out.extend(reversed(closers))
+        repairs["unclosed brackets"] = None
+    return "".join(out), list(repairs)
+
+
+def _drop_trailing_comma(out: List[str]) -> bool:
+    """Remove a comma that only whitespace separates from the end of out"""
+    index = len(out) - 1
+    while index >= 0 and not out[index].strip():
+        index -= 1
+    if index < 0:
+        return False
+    stripped = out[index].rstrip()
+    if not stripped.endswith(","):
+        return False
+    out[index] = stripped[:-1] + out[index][len(stripped):]
+    return True
+
+
+def validate_analysis(data: Any) -> Dict[str, Any]:
+    """
+    Validate and normalize one parsed analysis object in a single pass.
+    
+    A missing reasoning gets a placeholder, an unknown type becomes
+    "other", free-text fields are coerced to strings and suggested_labels
+    to a list of at most MAX_SUGGESTED_LABELS strings. The object is
+    normalized in place and returned.
+    
+    Raises:
+        ValueError: If data is not an object or required fields are missing
+    """
+    if not isinstance(data, dict):
+        raise ValueError("LLM analysis is not a JSON object")
+    
+    missing = []
+    for field in TEXT_FIELDS:
+        value = data.get(field)
+        if value is None:
+            if field == "reasoning":
+                data[field] = MISSING_REASONING
+            elif field not in data:
+                missing.append(field)
+            else:
+                data[field] = ""
+        elif not isinstance(value, str):
+            data[field] = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    if "type" not in data:
+        missing.append("type")
+    if "suggested_labels" not in data:
+        missing.append("suggested_labels")
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    
+    if not isinstance(data["type"], str) or data["type"] not in ANALYSIS_TYPES:
+        data["type"] = "other"
+    labels = data["suggested_labels"]
+    if not isinstance(labels, list):
+        labels = [labels]
+    data["suggested_labels"] = [str(label) for label in labels[:MAX_SUGGESTED_LABELS]]
+    return data
+
+
+def parse_analysis(text: str) -> Dict[str, Any]:
+    """
+    Extract, repair if needed, and validate the analysis in an LLM response.
+    
+    Raises:
+        ValueError: If no valid analysis can be recovered
+    """
+    return validate_analysis(extract_json(text))
@@ -0,0 +1,70 @@
+"""
+Incremental sync cursors
+Where each repository's last completed sync stopped, kept apart from the
+analysis cache so that neither eviction nor a cache clear loses it
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+import logging
+
+from .file_locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class SyncCursorStore:
+    """
+    Sync cursors keyed by repository and state, persisted to a JSON file.
+    
+    Cursors are tiny and there is one per synced repository, so they are
+    never expired or evicted. The file is reread on every access and
+    replaced atomically on every write, so worker processes sharing it
+    see each other's cursors and never a partly written file. Each write
+    holds an exclusive lock on ``{path}.lock`` from reading the file to
+    replacing it, so workers saving different repositories' cursors at
+    once do not drop each other's. Without a path, cursors live in memory
+    for the life of the process.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._cursors: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cursor stored under a key, if any"""
+        with self._lock:
+            return self._load().get(key)
+    
+    def set(self, key: str, cursor: Dict[str, Any]):
+        """Store a cursor, replacing any previous one"""
+        with self._lock, file_lock(f"{self.path}.lock" if self.path else None):
+            cursors = self._load()
+            cursors[key] = cursor
+            self._save(cursors)
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path:
+            return self._cursors
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable sync cursors at {self.path}: {e}")
+            return {}
+    
+    def _save(self, cursors: Dict[str, Dict[str, Any]]):
+        if not self.path:
+            self._cursors = cursors
+            return
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(cursors, f)
+        os.replace(temporary, self.path)
@@ -0,0 +1,161 @@
+"""
+GitHub webhook handling
+Verifies deliveries and precomputes analyses of changed issues in the background
+"""
+
+import asyncio
+import hashlib
+import hmac
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Event actions that can change what an analysis sees
+ANALYZED_ACTIONS = {
+    "issues": ("opened", "edited", "reopened", "closed", "labeled", "unlabeled"),
+    "issue_comment": ("created", "edited", "deleted"),
+}
+
+
+class QueueFullError(ValueError):
+    """Raised when the precompute queue is at its maximum depth"""
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """
+    Check an X-Hub-Signature-256 header against the raw request body.
+    
+    Args:
+        secret: Webhook secret shared with GitHub
+        body: Raw request body, exactly as delivered
+        signature: Header value, "sha256=<hex digest>"
+    
+    Returns:
+        True if the body was signed with the secret
+    """
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+def issue_from_event(event: str, payload: Dict[str, Any]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Pick the issue an event is about, if it needs a new analysis.
+    
+    Returns:
+        Tuple of (owner, repo, issue payload), or None for other events,
+        actions and pull request comments
+    """
+    if payload.get("action") not in ANALYZED_ACTIONS.get(event, ()):
+        return None
+    issue = payload.get("issue") or {}
+    # Comments on pull requests arrive as issue_comment events too
+    if "pull_request" in issue or "number" not in issue:
+        return None
+    owner, _, repo = (payload.get("repository") or {}).get("full_name", "").partition("/")
+    if not owner or not repo:
+        return None
+    return owner, repo, issue
+
+
+class PrecomputeQueue:
+    """
+    Bounded queue of background jobs, at most one per key.
+    
+    A job submitted for a key that is already waiting replaces the waiting
+    job, so a burst of events for one issue costs one analysis of its
+    latest state. A key is never worked on by two workers at once; a job
+    arriving while its key is running waits for that run to finish.
+    """
+    
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]], max_depth: int = 1000, workers: int = 2):
+        self.handler = handler
+        self.max_depth = max_depth
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[str, Any] = {}
+        self._running: Set[str] = set()
+        self._tasks = []
+        self.queued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def submit(self, key: str, job: Any) -> bool:
+        """
+        Queue a job, replacing any job still waiting for the same key.
+        
+        Must be called from the event loop the workers run on; they are
+        started on first use.
+        
+        Returns:
+            True if queued, False if it replaced a waiting job
+        
+        Raises:
+            QueueFullError: If max_depth jobs are already waiting
+        """
+        if key in self._pending:
+            self._pending[key] = job
+            self.coalesced += 1
+            logger.debug(f"Coalesced queued job for {key}")
+            return False
+        if len(self._pending) >= self.max_depth:
+            self.dropped += 1
+            raise QueueFullError(f"Precompute queue is full ({self.max_depth} jobs waiting)")
+        
+        self._pending[key] = job
+        self.queued += 1
+        # A running key is queued again when its current run finishes
+        if key not in self._running:
+            self._queue.put_nowait(key)
+        self._start()
+        return True
+    
+    async def join(self):
+        """Wait until every queued job has run"""
+        await self._queue.join()
+    
+    async def close(self):
+        """Stop the workers, abandoning waiting jobs"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pending:
+            logger.warning(f"Abandoned {len(self._pending)} queued jobs")
+    
+    def stats(self) -> Dict[str, int]:
+        """Get queue depth and job counters"""
+        return {
+            "depth": len(self._pending),
+            "running": len(self._running),
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+    
+    def _start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+    
+    async def _work(self):
+        while True:
+            key = await self._queue.get()
+            job = self._pending.pop(key)
+            self._running.add(key)
+            try:
+                await self.handler(job)
+                self.completed += 1
+            except Exception as e:
+                logger.warning(f"Background job for {key} failed: {e}")
+                self.failed += 1
+            finally:
+                self._running.discard(key)
+                if key in self._pending:
+                    self._queue.put_nowait(key)
+                self._queue.task_done()
@@ -75,13 +75,23 @@ def validate_inputs(repo_url: str, issue_number: int):
         errors.append("Issue number must be positive")
     return len(errors) == 0, errors
 
-# API call
-def call_api(api_url: str, repo_url: str, issue_number: int):
-    endpoint = f"{api_url}/analyze"
+# API call (streamed, so fields can be shown while the rest is generated)
+def call_api(api_url: str, repo_url: str, issue_number: int, on_field=None):
+    endpoint = f"{api_url}/analyze/stream"
     payload = {"repo_url": repo_url, "issue_number": issue_number}
-    response = requests.post(endpoint, json=payload, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    with requests.post(endpoint, json=payload, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record["event"] == "field" and on_field:
+                on_field(record["name"], record["value"])
+            elif record["event"] == "analysis":
+                return record["analysis"]
+            elif record["event"] == "error":
+                raise RuntimeError(record["error"])
+    raise RuntimeError("Analysis stream ended without a result")
 
 # Analyze button
 if st.button("🚀 Analyze Issue", type="primary"):
@@ -93,7 +103,17 @@ if st.button("🚀 Analyze Issue", type="primary"):
         with st.spinner("🔄 Analyzing issue..."):
             try:
                 start_time = time.time()
-                analysis = call_api(api_url, repo_url, issue_number)
+                preview = st.empty()
+                partial = {}
+                
+                def show_field(name, value):
+                    partial[name] = value
+                    if "summary" in partial:
+                        issue_type = str(partial.get("type", "…")).replace("_", " ").title()
+                        preview.info(f"**{issue_type}** · {partial['summary']}")
+                
+                analysis = call_api(api_url, repo_url, issue_number, on_field=show_field)
+                preview.empty()
                 duration = time.time() - start_time
                 
                 st.session_state.analysis_result = analysis
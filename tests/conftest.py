@@ -0,0 +1,439 @@
+"""
+Shared fixtures for backend tests.
+
+Provides a local stub upstream that speaks just enough of the GitHub REST
+API and the Groq chat completions API for the analyzer to run end to end
+without network access. Latency and failures can be injected per route,
+and rate limits per upstream.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+
+import pytest
+import pytest_asyncio
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# Make the ``backend`` package importable regardless of how pytest is invoked
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend import main
+from backend.cache import get_cache, get_response_cache
+from backend.issue_analyzer import IssueAnalyzer
+
+
+VALID_ANALYSIS = {
+    "summary": "Stubbed summary",
+    "type": "bug",
+    "priority_score": "3/5: Stubbed priority",
+    "suggested_labels": ["bug"],
+    "potential_impact": "Stubbed impact",
+    "reasoning": "Stubbed reasoning",
+}
+
+
+class LiveServer:
+    """Runs an ASGI app with uvicorn on an ephemeral local port in a thread"""
+    
+    def __init__(self, app):
+        self.app = app
+        self.url = None
+        self._server = None
+        self._thread = None
+    
+    def start(self):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Live server failed to start")
+            time.sleep(0.01)
+        self.url = f"http://127.0.0.1:{port}"
+    
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+class StubUpstream:
+    """In-process HTTP server standing in for GitHub and Groq"""
+    
+    def __init__(self):
+        self.github_latency = 0.0
+        self.llm_latency = 0.0
+        self.issues = {}
+        self.comments = {}
+        self.repo_issues = []  # served by the paginated issues listing
+        self.repo_comments = []  # served by the repo-level comments listing
+        self.repo_labels = []  # served by the paginated labels listing
+        self.missing_issues = set()  # issue numbers GraphQL reports as not found
+        self.failures = {}  # route name -> status code to return
+        self.throttle = {}  # route name -> [(status, headers)] returned, in turn, before serving
+        self.quotas = {}  # "github" or "llm" -> (requests, window seconds) per credential
+        self.llm_content = json.dumps(VALID_ANALYSIS)
+        self.batch_omit = set()  # issue numbers left out of batched responses
+        self.llm_chunk_size = 16  # characters per streamed completion chunk
+        self.llm_chunk_delay = 0.0
+        self.reset_counters()
+        self.app = self._build_app()
+        self.url = None
+        self._server = None
+    
+    def reset_counters(self):
+        """Reset call, concurrency and connection counters"""
+        routes = ("issue", "comments", "list_issues", "list_comments", "labels", "graphql", "llm")
+        self.calls = dict.fromkeys(routes, 0)
+        self.in_flight = dict.fromkeys(routes, 0)
+        self.peak = dict.fromkeys(routes, 0)
+        self.not_modified = {"issue": 0, "comments": 0}
+        self.comment_pages = []  # page numbers requested from per-issue comments
+        self.graphql_issues = []  # issue numbers requested by each GraphQL query
+        self.bytes_sent = dict.fromkeys(routes, 0)  # JSON payload bytes per route
+        self.connections = set()
+        self.llm_prompts = []  # messages of every chat completion request
+        self.llm_params = []  # every other parameter of those requests
+        self.llm_chunks_sent = 0
+        self.throttled = dict.fromkeys(routes, 0)
+        self.over_quota = {"github": 0, "llm": 0}
+        self.windows = {}  # (upstream, credential) -> (window start, requests served)
+        self.credentials = {}  # Authorization header -> requests served
+    
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+        stub = self
+        
+        def error(route: str, status: int, headers=None):
+            body = {"error": {"message": "stub failure"}} if route == "llm" else {"message": "stub failure"}
+            return JSONResponse(body, status_code=status, headers=headers)
+        
+        async def track(route: str, request: Request, latency: float):
+            """Record a call; returns the injected error response, if any"""
+            stub.calls[route] += 1
+            credential = request.headers.get("authorization", "")
+            stub.credentials[credential] = stub.credentials.get(credential, 0) + 1
+            stub.connections.add((request.client.host, request.client.port))
+            stub.in_flight[route] += 1
+            stub.peak[route] = max(stub.peak[route], stub.in_flight[route])
+            try:
+                if latency:
+                    await asyncio.sleep(latency)
+            finally:
+                stub.in_flight[route] -= 1
+            if stub.throttle.get(route):
+                stub.throttled[route] += 1
+                return error(route, *stub.throttle[route].pop(0))
+            if route in stub.failures:
+                return error(route, stub.failures[route])
+            return None
+        
+        def quota_headers(upstream: str, remaining: int, reset_at: float):
+            if upstream == "github":
+                return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": f"{reset_at:.3f}"}
+            return {
+                "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{max(reset_at - time.time(), 0):.3f}s",
+            }
+        
+        @app.middleware("http")
+        async def enforce_quota(request: Request, call_next):
+            """Fixed-window request quota per credential, reported the way each upstream does"""
+            upstream = "llm" if request.url.path.startswith("/openai") else "github"
+            if upstream not in stub.quotas:
+                return await call_next(request)
+            limit, seconds = stub.quotas[upstream]
+            key = (upstream, request.headers.get("authorization", ""))
+            now = time.time()
+            start, used = stub.windows.get(key, (now, 0))
+            if now - start >= seconds:
+                start, used = now, 0
+            if used >= limit:
+                stub.over_quota[upstream] += 1
+                # GitHub answers an exhausted primary quota with 403
+                status = 403 if upstream == "github" else 429
+                return error(upstream, status, quota_headers(upstream, 0, start + seconds))
+            stub.windows[key] = (start, used + 1)
+            response = await call_next(request)
+            response.headers.update(quota_headers(upstream, limit - used - 1, start + seconds))
+            return response
+        
+        def conditional(route: str, request: Request, data, headers=None):
+            """JSON response with an ETag, or 304 if the client's copy is current"""
+            etag = '"' + hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest() + '"'
+            headers = {**(headers or {}), "ETag": etag}
+            if request.headers.get("if-none-match") == etag:
+                stub.not_modified[route] = stub.not_modified.get(route, 0) + 1
+                return Response(status_code=304, headers=headers)
+            response = JSONResponse(data, headers=headers)
+            stub.bytes_sent[route] += len(response.body)
+            return response
+        
+        def page_of(request: Request, items):
+            """Slice one page of items and build its GitHub-style Link header"""
+            per_page = int(request.query_params.get("per_page", 30))
+            page = int(request.query_params.get("page", 1))
+            last = max(1, -(-len(items) // per_page))
+            links = []
+            if page < last:
+                links.append(f'<{request.url.include_query_params(page=page + 1)}>; rel="next"')
+                links.append(f'<{request.url.include_query_params(page=last)}>; rel="last"')
+            if page > 1:
+                links.append(f'<{request.url.include_query_params(page=page - 1)}>; rel="prev"')
+                links.append(f'<{request.url.include_query_params(page=1)}>; rel="first"')
+            headers = {"Link": ", ".join(links)} if links else {}
+            return items[(page - 1) * per_page:page * per_page], headers
+        
+        def paginate(request: Request, items):
+            """One page of items with a GitHub-style Link header"""
+            page, headers = page_of(request, items)
+            return JSONResponse(page, headers=headers)
+        
+        def issue_payload(number: int):
+            return stub.issues.get(number, {
+                "number": number,
+                "title": f"Issue {number}",
+                "body": f"Body of issue {number}",
+                "labels": [{"name": "bug"}],
+                "state": "open",
+                "created_at": "2024-01-01T00:00:00Z",
+                "updated_at": "2024-01-02T00:00:00Z",
+            })
+        
+        def comments_payload(number: int):
+            return stub.comments.get(number, [{"body": f"Comment on {number}"}])
+        
+        @app.get("/repos/{owner}/{repo}/issues/comments")
+        async def list_comments(owner: str, repo: str, request: Request):
+            rejection = await track("list_comments", request, stub.github_latency)
+            if rejection:
+                return rejection
+            since = request.query_params.get("since", "")
+            return paginate(request, [c for c in stub.repo_comments if c["updated_at"] >= since])
+        
+        @app.get("/repos/{owner}/{repo}/issues")
+        async def list_issues(owner: str, repo: str, request: Request):
+            rejection = await track("list_issues", request, stub.github_latency)
+            if rejection:
+                return rejection
+            state = request.query_params.get("state", "open")
+            since = request.query_params.get("since", "")
+            items = [
+                i for i in stub.repo_issues
+                if (state == "all" or i["state"] == state) and i["updated_at"] >= since
+            ]
+            return paginate(request, items)
+        
+        @app.get("/repos/{owner}/{repo}/issues/{number}")
+        async def issue(owner: str, repo: str, number: int, request: Request):
+            rejection = await track("issue", request, stub.github_latency)
+            if rejection:
+                return rejection
+            return conditional("issue", request, issue_payload(number))
+        
+        @app.get("/repos/{owner}/{repo}/issues/{number}/comments")
+        async def comments(owner: str, repo: str, number: int, request: Request):
+            rejection = await track("comments", request, stub.github_latency)
+            if rejection:
+                return rejection
+            stub.comment_pages.append(int(request.query_params.get("page", 1)))
+            return conditional("comments", request, *page_of(request, comments_payload(number)))
+        
+        @app.get("/repos/{owner}/{repo}/labels")
+        async def labels(owner: str, repo: str, request: Request):
+            rejection = await track("labels", request, stub.github_latency)
+            if rejection:
+                return rejection
+            return conditional("labels", request, *page_of(request, stub.repo_labels))
+        
+        def comment_node(comment):
+            return {
+                "body": comment.get("body", ""),
+                "createdAt": comment.get("created_at", ""),
+                "authorAssociation": comment.get("author_association", "NONE"),
+                "author": {"__typename": "Bot" if (comment.get("user") or {}).get("type") == "Bot" else "User"},
+                "reactions": {"totalCount": (comment.get("reactions") or {}).get("total_count", 0)},
+            }
+        
+        def issue_node(number: int, first: int, last: int):
+            issue = issue_payload(number)
+            comments = comments_payload(number)
+            return {
+                "number": number,
+                "title": issue["title"],
+                "body": issue["body"],
+                "state": issue["state"].upper(),
+                "createdAt": issue["created_at"],
+                "updatedAt": issue["updated_at"],
+                "labels": {"nodes": [{"name": label["name"]} for label in issue["labels"]]},
+                "firstComments": {
+                    "totalCount": len(comments),
+                    "nodes": [comment_node(c) for c in comments[:first]],
+                },
+                "lastComments": {"nodes": [comment_node(c) for c in comments[-last:]]},
+            }
+        
+        @app.post("/graphql")
+        async def graphql(request: Request):
+            """Answers the analyzer's aliased issues query; numbers in stub.missing_issues are not found"""
+            rejection = await track("graphql", request, stub.github_latency)
+            if rejection:
+                return rejection
+            body = await request.json()
+            variables = body["variables"]
+            aliases = re.findall(r"(\w+): issue\(number: (\d+)\)", body["query"])
+            stub.graphql_issues.append([int(number) for _, number in aliases])
+            repository, errors = {}, []
+            for alias, number in aliases:
+                if int(number) in stub.missing_issues:
+                    repository[alias] = None
+                    errors.append({"type": "NOT_FOUND", "path": ["repository", alias], "message": "Not found"})
+                else:
+                    repository[alias] = issue_node(int(number), variables["first"], variables["last"])
+            payload = {"data": {"repository": repository}}
+            if errors:
+                payload["errors"] = errors
+            response = JSONResponse(payload)
+            stub.bytes_sent["graphql"] += len(response.body)
+            return response
+        
+        async def stream_chunks(body, content):
+            """Server-Sent Events in the chat.completion.chunk format"""
+            size = stub.llm_chunk_size
+            for start in range(0, len(content), size):
+                if start and stub.llm_chunk_delay:
+                    await asyncio.sleep(stub.llm_chunk_delay)
+                stub.llm_chunks_sent += 1
+                chunk = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": content[start:start + size]},
+                        "finish_reason": None,
+                    }],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        @app.post("/openai/v1/chat/completions")
+        async def chat_completions(request: Request):
+            rejection = await track("llm", request, stub.llm_latency)
+            if rejection:
+                return rejection
+            body = await request.json()
+            stub.llm_prompts.append(body["messages"])
+            stub.llm_params.append({key: value for key, value in body.items() if key != "messages"})
+            content = stub.llm_content
+            # Batched prompts get one analysis per issue section
+            numbers = [int(n) for n in re.findall(r"^=== ISSUE #(\d+) ===$", body["messages"][-1]["content"], re.M)]
+            if numbers:
+                content = json.dumps([
+                    {"issue_number": n, **VALID_ANALYSIS} for n in numbers if n not in stub.batch_omit
+                ])
+            if body.get("stream"):
+                return StreamingResponse(stream_chunks(body, content), media_type="text/event-stream")
+            return JSONResponse({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            })
+        
+        return app
+    
+    def start(self):
+        self._server = LiveServer(self.app)
+        self._server.start()
+        self.url = self._server.url
+    
+    def stop(self):
+        self._server.stop()
+
+
+@pytest.fixture(scope="session")
+def stub_upstream_server():
+    """Session-wide stub upstream server"""
+    stub = StubUpstream()
+    stub.start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def stub_upstream(stub_upstream_server):
+    """Stub upstream with per-test state reset"""
+    stub = stub_upstream_server
+    stub.github_latency = 0.0
+    stub.llm_latency = 0.0
+    stub.issues = {}
+    stub.comments = {}
+    stub.repo_issues = []
+    stub.repo_comments = []
+    stub.repo_labels = []
+    stub.missing_issues = set()
+    stub.failures = {}
+    stub.throttle = {}
+    stub.quotas = {}
+    stub.llm_content = json.dumps(VALID_ANALYSIS)
+    stub.batch_omit = set()
+    stub.llm_chunk_size = 16
+    stub.llm_chunk_delay = 0.0
+    stub.reset_counters()
+    get_cache().clear()
+    get_response_cache().clear()
+    yield stub
+    get_cache().clear()
+    get_response_cache().clear()
+
+
+@pytest_asyncio.fixture
+async def analyzer(stub_upstream, monkeypatch, tmp_path):
+    """Analyzer wired to the stub GitHub and Groq servers"""
+    monkeypatch.setenv("SYNC_CURSOR_PATH", str(tmp_path / "sync_cursors.json"))
+    monkeypatch.setenv("GROQ_API_KEY", "test_key")
+    monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+    monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.delenv("GITHUB_TOKENS", raising=False)
+    monkeypatch.delenv("GITHUB_FETCH_BACKEND", raising=False)
+    monkeypatch.setenv("RATE_LIMIT_BACKOFF", "0.01")
+    analyzer = IssueAnalyzer()
+    yield analyzer
+    await analyzer.aclose()
+
+
+@pytest.fixture
+def live_app(stub_upstream, monkeypatch):
+    """The real app served over HTTP, so streamed chunks arrive as sent"""
+    monkeypatch.setenv("GROQ_API_KEY", "test_key")
+    monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+    monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+    monkeypatch.setenv("BATCH_CONCURRENCY", "2")
+    monkeypatch.setenv("RATE_LIMIT_BACKOFF", "0.01")
+    server = LiveServer(main.app)
+    server.start()
+    yield server
+    server.stop()
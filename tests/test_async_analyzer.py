@@ -0,0 +1,108 @@
+"""
+Load tests for the async analysis pipeline against stubbed upstreams
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+
+
+class TestAsyncPipeline:
+    """Concurrency behaviour of IssueAnalyzer.analyze_async"""
+    
+    @pytest.mark.asyncio
+    async def test_analyze_async_returns_parsed_analysis(self, analyzer, stub_upstream):
+        result = await analyzer.analyze_async("https://github.com/owner/repo", 1)
+        
+        assert result["summary"] == "Stubbed summary"
+        assert (stub_upstream.calls["issue"], stub_upstream.calls["comments"], stub_upstream.calls["llm"]) == (1, 1, 1)
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("in_flight", [1, 8, 48])
+    async def test_concurrency_grows_with_in_flight_requests(self, analyzer, stub_upstream, in_flight):
+        stub_upstream.llm_latency = 0.3
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            analyzer.analyze_async("https://github.com/owner/repo", n)
+            for n in range(1, in_flight + 1)
+        ])
+        elapsed = time.perf_counter() - start
+        
+        assert len(results) == in_flight
+        # Upstream concurrency tracks in-flight analyses instead of staying at 1
+        assert stub_upstream.peak["llm"] >= max(1, in_flight * 3 // 4)
+        if in_flight > 1:
+            # Serialized calls would take in_flight * latency
+            assert elapsed < 0.3 * in_flight
+    
+    @pytest.mark.asyncio
+    async def test_health_not_blocked_by_slow_analysis(self, analyzer, stub_upstream):
+        stub_upstream.llm_latency = 1.0
+        
+        main.app.state.analyzer = analyzer
+        try:
+            async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+                analysis = asyncio.create_task(client.post(
+                    "/analyze",
+                    json={"repo_url": "https://github.com/owner/repo", "issue_number": 7},
+                ))
+                while stub_upstream.in_flight["llm"] == 0:
+                    await asyncio.sleep(0.01)
+                
+                start = time.perf_counter()
+                health = await client.get("/health")
+                health_latency = time.perf_counter() - start
+                
+                assert health.status_code == 200
+                assert health_latency < 0.5
+                assert not analysis.done()
+                
+                response = await analysis
+                assert response.status_code == 200
+                assert response.json()["type"] == "bug"
+        finally:
+            main.app.state.analyzer = None
+
+
+class TestConnectionPooling:
+    """Lifecycle and connection reuse of the shared analyzer"""
+    
+    @pytest.mark.asyncio
+    async def test_connections_reused_across_analyses(self, analyzer, stub_upstream):
+        for n in range(1, 11):
+            await analyzer.analyze_async("https://github.com/owner/repo", n)
+        
+        assert stub_upstream.calls["llm"] == 10
+        # Two keep-alive connections for GitHub (issue + comments) and one for Groq
+        assert len(stub_upstream.connections) == 3
+    
+    def test_sync_path_reuses_connections(self, analyzer, stub_upstream):
+        for n in range(1, 6):
+            analyzer.analyze("https://github.com/owner/repo", n)
+        
+        assert stub_upstream.calls["issue"] == 5
+        assert len(stub_upstream.connections) == 3
+    
+    def test_lifespan_owns_single_analyzer(self, stub_upstream, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "test_key")
+        monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+        monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+        
+        with TestClient(main.app) as client:
+            analyzer = main.app.state.analyzer
+            for n in (1, 2):
+                response = client.post(
+                    "/analyze",
+                    json={"repo_url": "https://github.com/owner/repo", "issue_number": n},
+                )
+                assert response.status_code == 200
+                assert main.app.state.analyzer is analyzer
+        
+        assert main.app.state.analyzer is None
+        assert analyzer.async_http.is_closed
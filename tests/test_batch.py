@@ -0,0 +1,79 @@
+"""
+Tests for batch analysis
+"""
+
+import httpx
+import pytest
+
+from backend import main
+
+
+REPO = "https://github.com/owner/repo"
+
+
+@pytest.fixture
+def app_client(analyzer):
+    """ASGI client for the app using the stub-wired analyzer"""
+    main.app.state.analyzer = analyzer
+    yield httpx.AsyncClient(app=main.app, base_url="http://test")
+    main.app.state.analyzer = None
+
+
+class TestBatchAnalysis:
+    """Bounded, ordered batch analysis"""
+    
+    @pytest.mark.asyncio
+    async def test_results_in_input_order(self, analyzer, stub_upstream):
+        stub_upstream.llm_latency = 0.05
+        items = [(REPO, n) for n in (5, 1, 4, 2, 3)]
+        
+        results = await analyzer.analyze_batch_async(items)
+        
+        assert [r["issue_number"] for r in results] == [5, 1, 4, 2, 3]
+        assert all(r["error"] is None for r in results)
+    
+    @pytest.mark.asyncio
+    async def test_in_flight_bounded_by_concurrency(self, analyzer, stub_upstream):
+        stub_upstream.llm_latency = 0.05
+        
+        await analyzer.analyze_batch_async([(REPO, n) for n in range(1, 21)], concurrency=3)
+        
+        assert stub_upstream.calls["llm"] == 20
+        assert stub_upstream.peak["llm"] <= 3
+    
+    @pytest.mark.asyncio
+    async def test_failed_item_reports_error(self, analyzer, stub_upstream):
+        results = await analyzer.analyze_batch_async([(REPO, 1), ("https://gitlab.com/a/b", 2)])
+        
+        assert results[0]["analysis"]["summary"] == "Stubbed summary"
+        assert results[1]["analysis"] is None
+        assert "Invalid GitHub URL" in results[1]["error"]
+    
+    @pytest.mark.asyncio
+    async def test_endpoint_range_reuses_cache(self, app_client, stub_upstream):
+        async with app_client as client:
+            await client.post("/analyze", json={"repo_url": REPO, "issue_number": 2})
+            response = await client.post(
+                "/analyze/batch", json={"repo_url": REPO, "start": 1, "end": 3}
+            )
+        
+        body = response.json()
+        assert response.status_code == 200
+        assert [r["issue_number"] for r in body["results"]] == [1, 2, 3]
+        assert body["succeeded"] == 3 and body["failed"] == 0
+        assert stub_upstream.calls["llm"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_endpoint_rejects_invalid_batches(self, app_client):
+        async with app_client as client:
+            empty = await client.post("/analyze/batch", json={})
+            reversed_range = await client.post(
+                "/analyze/batch", json={"repo_url": REPO, "start": 5, "end": 1}
+            )
+            too_large = await client.post(
+                "/analyze/batch", json={"repo_url": REPO, "start": 1, "end": 100000}
+            )
+        
+        assert empty.status_code == 400
+        assert reversed_range.status_code == 400
+        assert too_large.status_code == 400
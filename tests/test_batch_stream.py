@@ -0,0 +1,72 @@
+"""
+Tests for streamed batch analysis
+"""
+
+import json
+import time
+
+import httpx
+import pytest
+
+
+REPO = "https://github.com/owner/repo"
+
+
+class TestBatchStream:
+    """NDJSON and SSE streaming of batch results"""
+    
+    def test_ndjson_stream_records(self, live_app, stub_upstream):
+        response = httpx.post(
+            f"{live_app.url}/analyze/batch/stream",
+            json={"repo_url": REPO, "start": 1, "end": 4},
+            timeout=30,
+        )
+        
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        results = [r for r in records if r["event"] == "result"]
+        progress = [r for r in records if r["event"] == "progress"]
+        assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+        assert all(r["analysis"]["summary"] == "Stubbed summary" for r in results)
+        assert [p["completed"] for p in progress] == [1, 2, 3, 4]
+        assert records[-1]["event"] == "summary"
+        assert records[-1]["succeeded"] == 4
+    
+    def test_first_result_arrives_before_batch_finishes(self, live_app, stub_upstream):
+        stub_upstream.llm_latency = 0.3
+        
+        start = time.perf_counter()
+        with httpx.stream(
+            "POST",
+            f"{live_app.url}/analyze/batch/stream",
+            json={"repo_url": REPO, "start": 1, "end": 6},
+            timeout=30,
+        ) as response:
+            lines = response.iter_lines()
+            first = json.loads(next(lines))
+            first_latency = time.perf_counter() - start
+            remaining = [json.loads(line) for line in lines]
+        total = time.perf_counter() - start
+        
+        assert first["event"] == "result"
+        # Six issues two at a time take three LLM round-trips
+        assert first_latency < total / 2
+        assert remaining[-1]["total"] == 6
+    
+    def test_sse_stream_format(self, live_app, stub_upstream):
+        response = httpx.post(
+            f"{live_app.url}/analyze/batch/stream?format=sse",
+            json={"items": [{"repo_url": REPO, "issue_number": 1}, {"repo_url": "bad", "issue_number": 2}]},
+            timeout=30,
+        )
+        
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block for block in response.text.split("\n\n") if block]
+        assert events[-1].startswith("event: summary\ndata: ")
+        summary = json.loads(events[-1].split("data: ", 1)[1])
+        assert summary["succeeded"] == 1 and summary["failed"] == 1
+    
+    def test_invalid_batch_rejected_before_streaming(self, live_app):
+        response = httpx.post(f"{live_app.url}/analyze/batch/stream", json={}, timeout=30)
+        
+        assert response.status_code == 400
@@ -0,0 +1,219 @@
+"""
+Unit tests for the bounded analysis cache
+"""
+
+import multiprocessing
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import cache as cache_module
+from backend import main
+from backend.cache import InMemoryCache, SQLiteCache, create_cache, get_cache
+
+
+def _write_from_other_process(path, key, value):
+    SQLiteCache(path).set(key, value, ttl_seconds=60)
+
+
+class TestInMemoryCache:
+    """Test suite for InMemoryCache"""
+    
+    def test_get_set_roundtrip(self):
+        cache = InMemoryCache()
+        key = cache.generate_key("https://github.com/a/b", 1)
+        
+        cache.set(key, {"summary": "x"})
+        
+        assert cache.get(key) == {"summary": "x"}
+        assert cache.get("missing") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_evicts_least_recently_used_over_entry_limit(self):
+        cache = InMemoryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+    
+    def test_evicts_over_byte_budget(self):
+        cache = InMemoryCache(max_bytes=100)
+        cache.set("a", "x" * 40)
+        cache.set("b", "y" * 40)
+        cache.set("c", "z" * 40)
+        
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] <= 100
+        assert len(cache) == 2
+    
+    def test_oversized_value_not_cached(self):
+        cache = InMemoryCache(max_bytes=10)
+        cache.set("a", "x" * 100)
+        
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] == 0
+    
+    def test_overwrite_keeps_byte_accounting(self):
+        cache = InMemoryCache()
+        cache.set("a", "x" * 10)
+        cache.set("a", "x" * 20)
+        
+        assert len(cache) == 1
+        assert cache.stats()["bytes"] == len('"' + "x" * 20 + '"')
+    
+    def test_sweep_removes_expired_entries_without_reads(self):
+        cache = InMemoryCache(sweep_interval=0)
+        for i in range(5):
+            cache.set(f"old{i}", i, ttl_seconds=0)
+        time.sleep(0.01)
+        cache.set("fresh", "value", ttl_seconds=60)
+        
+        assert len(cache) == 1
+        assert cache.stats()["expirations"] == 5
+    
+    def test_stats_endpoint_reports_counters(self):
+        cache = get_cache()
+        cache.clear()
+        cache.set("k", {"a": 1})
+        cache.get("k")
+        
+        response = TestClient(main.app).get("/stats")
+        
+        body = response.json()
+        assert body["cached_items"] == 1
+        assert body["cache_hits"] >= 1
+        assert "cache_evictions" in body
+        cache.clear()
+
+
+class TestSQLiteCache:
+    """Test suite for the persistent SQLite backend"""
+    
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "cache.sqlite3")
+    
+    def test_get_set_roundtrip(self, path):
+        cache = SQLiteCache(path)
+        value = {"summary": "x", "suggested_labels": ["bug"]}
+        
+        cache.set("k", value)
+        
+        assert cache.get("k") == value
+        assert cache.get("missing") is None
+        assert cache.stats()["hits"] == 1
+    
+    def test_survives_restart(self, path):
+        SQLiteCache(path).set("k", {"summary": "warm"}, ttl_seconds=60)
+        
+        assert SQLiteCache(path).get("k") == {"summary": "warm"}
+    
+    def test_shared_between_processes(self, path):
+        SQLiteCache(path)  # create schema before the child starts
+        process = multiprocessing.get_context("spawn").Process(
+            target=_write_from_other_process, args=(path, "k", {"summary": "child"})
+        )
+        process.start()
+        process.join(timeout=30)
+        
+        assert process.exitcode == 0
+        assert SQLiteCache(path).get("k") == {"summary": "child"}
+    
+    def test_expired_entries_not_returned(self, path):
+        cache = SQLiteCache(path, sweep_interval=0)
+        cache.set("old", 1, ttl_seconds=0)
+        cache.set("fresh", 2, ttl_seconds=60)
+        
+        assert cache.get("old") is None
+        assert len(cache) == 1
+    
+    def test_evicts_least_recently_read(self, path):
+        cache = SQLiteCache(path, max_entries=2)
+        cache.set("a", 1)
+        time.sleep(0.01)
+        cache.set("b", 2)
+        time.sleep(0.01)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+    
+    def test_running_totals_match_the_table(self, path):
+        cache = SQLiteCache(path, max_entries=3, sweep_interval=0)
+        for key in "abcde":
+            cache.set(key, {"summary": key * 50})
+        cache.set("e", {"summary": "replaced"})
+        cache.set("old", 1, ttl_seconds=0)
+        cache.delete("d")
+        cache.get("old")
+        
+        assert cache._usage() == cache._conn.execute("SELECT COUNT(*), SUM(size) FROM cache").fetchone()
+        assert len(SQLiteCache(path)) == len(cache) == 1
+    
+    def test_writes_under_budget_do_not_scan(self, path):
+        cache = SQLiteCache(path, max_entries=100)
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+        
+        for n in range(50):
+            cache.set(f"k{n}", n)
+        
+        assert not [sql for sql in statements if "ORDER BY" in sql or "COUNT(" in sql]
+    
+    def test_reads_do_not_write(self, path):
+        cache = SQLiteCache(path)
+        cache.set("k", 1)
+        writes = cache._conn.total_changes
+        
+        for _ in range(10):
+            cache.get("k")
+        
+        assert cache._conn.total_changes == writes
+    
+    @pytest.mark.asyncio
+    async def test_async_analysis_stays_off_the_event_loop(self, path, analyzer, monkeypatch):
+        cache = SQLiteCache(path)
+        threads = set()
+        
+        def on_thread(call):
+            return lambda *args, **kwargs: threads.add(threading.get_ident()) or call(*args, **kwargs)
+        
+        monkeypatch.setattr(cache, "get", on_thread(cache.get))
+        monkeypatch.setattr(cache, "set", on_thread(cache.set))
+        monkeypatch.setattr(cache_module, "_cache", cache)
+        
+        first = await analyzer.analyze_async("https://github.com/owner/repo", 1)
+        
+        assert first["summary"]
+        assert threads and threading.get_ident() not in threads
+        cache.close()
+    
+    def test_compact_serialization(self, path):
+        cache = SQLiteCache(path)
+        value = {"summary": "repeated text " * 200}
+        cache.set("k", value)
+        
+        assert cache.stats()["bytes"] < len(str(value)) // 10
+    
+    def test_create_cache_selects_backend(self, path, monkeypatch):
+        monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+        monkeypatch.setenv("CACHE_SQLITE_PATH", path)
+        assert isinstance(create_cache(), SQLiteCache)
+        
+        monkeypatch.setenv("CACHE_BACKEND", "memory")
+        assert isinstance(create_cache(), InMemoryCache)
+        
+        monkeypatch.setenv("CACHE_BACKEND", "redis")
+        with pytest.raises(ValueError):
+            create_cache()
@@ -0,0 +1,225 @@
+"""
+Tests for the local fast-path classifier and its offline harness
+"""
+
+import json
+import random
+
+import pytest
+
+from backend.classifier import (
+    BODY_FEATURE_CHARS,
+    IssueClassifier,
+    LinearClassifier,
+    evaluate,
+    load_issues,
+    main,
+    split,
+    train,
+)
+from backend.issue_analyzer import IssueAnalyzer
+from conftest import VALID_ANALYSIS
+
+
+REPO = "https://github.com/owner/repo"
+
+# Words typical of each type, mixed with shared filler to make a corpus
+VOCABULARY = {
+    "bug": ("crash", "error", "exception", "broken", "fails", "segfault", "traceback", "regression", "null"),
+    "feature_request": ("support", "add", "option", "allow", "would", "nice", "proposal", "configurable", "new"),
+    "documentation": ("docs", "readme", "typo", "example", "tutorial", "outdated", "wording", "guide", "page"),
+    "question": ("how", "help", "possible", "why", "understand", "wondering", "anyone", "advice", "usage"),
+}
+FILLER = ("the", "when", "using", "with", "module", "server", "client", "version", "config", "build", "api")
+LABELS = {
+    "bug": "bug",
+    "feature_request": "enhancement",
+    "documentation": "documentation",
+    "question": "question",
+}
+
+
+def corpus(count, seed=1):
+    """Exported issues whose text leans towards the type their label names"""
+    rng = random.Random(seed)
+    issues = []
+    for number in range(1, count + 1):
+        kind = rng.choice(list(VOCABULARY))
+        words = lambda n: " ".join(
+            rng.choice(VOCABULARY[kind]) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(n)
+        )
+        labels = [{"name": LABELS[kind]}] + ([{"name": "area: api"}] if "api" in words(3) else [])
+        issues.append({"number": number, "title": words(6), "body": words(40), "labels": labels})
+    return issues
+
+
+def load_records(directory, records):
+    """Run exported records through load_issues()"""
+    path = directory / "issues.json"
+    path.write_text(json.dumps(records))
+    return load_issues(str(path))
+
+
+@pytest.fixture(scope="module")
+def model(tmp_path_factory):
+    return train(load_records(tmp_path_factory.mktemp("train"), corpus(600)), epochs=5)
+
+
+class TestRules:
+    """Labels and titles settle obvious issues"""
+    
+    def test_existing_type_label(self):
+        result = IssueClassifier().classify({"title": "Something odd", "body": "", "labels": ["Bug"]})
+        
+        assert result["type"] == "bug"
+        assert result["confidence"] >= 0.9
+        assert result["suggested_labels"] == ["bug"]
+    
+    def test_docs_typo_title(self):
+        result = IssueClassifier().classify({"title": "Typo in README", "body": "", "labels": []})
+        
+        assert result["type"] == "documentation"
+        assert result["confidence"] >= 0.9
+    
+    def test_conflicting_labels_and_unknown_titles_escalate(self):
+        classifier = IssueClassifier()
+        
+        assert classifier.analysis({"title": "Hmm", "body": "", "labels": ["bug", "question"]}) is None
+        assert classifier.analysis({"title": "Widget renders sideways", "body": "", "labels": []}) is None
+        assert classifier.stats() == {"local": 0, "escalated": 2}
+    
+    def test_local_analysis_has_every_field(self):
+        analysis = IssueClassifier().analysis({"title": "[Feature] Dark mode", "body": "", "labels": []})
+        
+        assert set(analysis) == set(VALID_ANALYSIS)
+        assert analysis["type"] == "feature_request"
+        assert analysis["priority_score"].startswith("2/5: ")
+        assert analysis["suggested_labels"] == ["enhancement"]
+
+
+class TestModel:
+    """The hashed n-gram model, trained and evaluated offline"""
+    
+    def test_held_out_accuracy(self, model, tmp_path):
+        held_out = load_records(tmp_path, corpus(200, seed=2))
+        
+        metrics = evaluate(IssueClassifier(model, min_confidence=0.9), held_out)
+        
+        print(f"\nHeld-out metrics: {metrics}")
+        assert metrics["accuracy"] > 0.9
+        assert metrics["coverage"] > 0.5
+        assert metrics["covered_accuracy"] > 0.95
+        assert metrics["mean_ms"] < 1
+    
+    def test_labels_are_learned(self, model):
+        assert set(model.labels) >= {"bug", "enhancement", "documentation", "question", "area: api"}
+        _, label_probs = model.predict("crash with exception", "traceback error broken segfault")
+        
+        assert label_probs["bug"] > 0.5
+        assert label_probs["question"] < 0.5
+    
+    def test_save_and_load(self, model, tmp_path):
+        path = str(tmp_path / "model.json")
+        model.save(path)
+        loaded = LinearClassifier.load(path)
+        
+        expected = model.predict("how do I configure the server", "wondering about usage")
+        actual = loaded.predict("how do I configure the server", "wondering about usage")
+        assert actual[0] == pytest.approx(expected[0], abs=1e-4)
+        assert actual[1] == pytest.approx(expected[1], abs=1e-4)
+    
+    def test_unreadable_model_is_rejected(self, tmp_path):
+        path = tmp_path / "model.json"
+        path.write_text('{"format": 99}')
+        
+        with pytest.raises(ValueError, match="Unsupported classifier model"):
+            LinearClassifier.load(str(path))
+    
+    def test_classification_work_is_bounded(self, model, monkeypatch):
+        classifier = IssueClassifier(model)
+        issue = corpus(1, seed=3)[0]
+        pasted_log = issue["body"] + " traceback line" * 100_000
+        predictions = []
+        predict = model.predict
+        monkeypatch.setattr(model, "predict", lambda title, body: predictions.append(body) or predict(title, body))
+        
+        full = classifier.classify({"title": issue["title"], "body": pasted_log, "labels": []})
+        head = classifier.classify({"title": issue["title"], "body": pasted_log[:BODY_FEATURE_CHARS], "labels": []})
+        
+        # One model pass per issue, over a prefix of the body however long it is
+        assert len(predictions) == 2
+        assert full == head
+
+
+class TestHarness:
+    """Exported issues in, model and metrics out"""
+    
+    def test_load_issues(self, tmp_path):
+        path = tmp_path / "issues.jsonl"
+        records = [
+            {"title": "A", "body": None, "labels": [{"name": "bug"}]},
+            {"title": "B", "body": "", "labels": [{"name": "bug"}], "pull_request": {}},
+            {"title": "C", "body": "", "labels": [{"name": "bug"}, {"name": "question"}]},
+            {"title": "D", "body": "", "labels": []},
+            {"title": "E", "body": "", "labels": [], "type": "question"},
+        ]
+        path.write_text("\n".join(json.dumps(record) for record in records))
+        
+        examples = load_issues(str(path))
+        
+        assert [(e["title"], e["type"]) for e in examples] == [("A", "bug"), ("E", "question")]
+        assert examples[0]["body"] == ""
+    
+    def test_split_is_deterministic(self):
+        examples = list(range(10))
+        
+        assert split(examples, 0.3) == split(examples, 0.3)
+        assert len(split(examples, 0.3)[1]) == 3
+    
+    def test_train_then_eval_commands(self, tmp_path, capsys):
+        issues = tmp_path / "issues.json"
+        issues.write_text(json.dumps(corpus(300)))
+        model_path = tmp_path / "model.json"
+        
+        trained = main(["train", str(issues), "--out", str(model_path), "--epochs", "3"])
+        evaluated = main(["eval", str(model_path), str(issues)])
+        
+        assert model_path.exists()
+        assert trained["examples"] == 60
+        assert evaluated["examples"] == 300
+        assert "Trained on 240 issues" in capsys.readouterr().out
+
+
+class TestAnalyzerFastPath:
+    """Confident issues skip the LLM; the rest are escalated"""
+    
+    @pytest.fixture
+    def fast_analyzer(self, analyzer, monkeypatch, model, tmp_path):
+        path = str(tmp_path / "model.json")
+        model.save(path)
+        monkeypatch.setenv("LOCAL_CLASSIFIER", "true")
+        monkeypatch.setenv("CLASSIFIER_MODEL_PATH", path)
+        return IssueAnalyzer()
+    
+    @pytest.mark.asyncio
+    async def test_labeled_issue_skips_the_llm(self, fast_analyzer, stub_upstream):
+        try:
+            result = await fast_analyzer.analyze_async(REPO, 1)
+        finally:
+            await fast_analyzer.aclose()
+        
+        assert result["type"] == "bug"
+        assert result["summary"] == "Issue 1"
+        assert stub_upstream.calls["llm"] == 0
+        assert fast_analyzer.classifier.stats() == {"local": 1, "escalated": 0}
+    
+    def test_uncertain_issue_is_escalated(self, fast_analyzer, stub_upstream):
+        stub_upstream.issues[2] = {"number": 2, "title": "Widget renders sideways", "body": "", "labels": []}
+        try:
+            result = fast_analyzer.analyze(REPO, 2)
+        finally:
+            fast_analyzer.close()
+        
+        assert result == VALID_ANALYSIS
+        assert stub_upstream.calls["llm"] == 1
+        assert fast_analyzer.classifier.stats() == {"local": 0, "escalated": 1}
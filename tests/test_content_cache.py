@@ -0,0 +1,95 @@
+"""
+Tests for the two-level, content-addressed analysis cache
+"""
+
+import pytest
+
+from backend.cache import get_cache
+from backend.rate_limiter import RateLimitedError
+
+
+REPO = "https://github.com/owner/repo"
+
+
+class TestContentAddressedCache:
+    """Level one: issue -> fingerprint, level two: fingerprint -> analysis"""
+    
+    @pytest.mark.asyncio
+    async def test_url_variants_share_one_analysis(self, analyzer, stub_upstream):
+        for url in (REPO, REPO + ".git", "git@github.com:owner/repo.git", "https://github.com/Owner/Repo/"):
+            await analyzer.analyze_async(url, 1)
+        
+        assert stub_upstream.calls["llm"] == 1
+        assert (
+            analyzer.issue_cache_key("owner", "repo", 1)
+            == analyzer.issue_cache_key("Owner", "Repo", 1)
+        )
+    
+    def test_identical_content_in_different_issues_analyzed_once(self, analyzer, stub_upstream):
+        issue = {"title": "Same", "body": "Same body", "labels": [], "state": "open"}
+        stub_upstream.issues = {1: issue, 2: issue}
+        stub_upstream.comments = {1: [], 2: []}
+        
+        analyzer.analyze(REPO, 1)
+        analyzer.analyze(REPO, 2)
+        
+        assert stub_upstream.calls["llm"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_edited_issue_never_served_stale(self, analyzer, stub_upstream):
+        await analyzer.analyze_async(REPO, 3)
+        stub_upstream.issues[3] = {"title": "Edited title", "body": "New body", "labels": []}
+        
+        await analyzer.analyze_async(REPO, 3)
+        
+        assert stub_upstream.calls["llm"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_content_key_depends_on_model(self, analyzer):
+        issue_data = {"title": "t", "body": "b", "comments": [], "labels": []}
+        key = analyzer.content_cache_key(issue_data)
+        
+        analyzer.model_name = "another-model"
+        
+        assert analyzer.content_cache_key(issue_data) != key
+    
+    @pytest.mark.asyncio
+    async def test_freshness_window_skips_github(self, analyzer, stub_upstream):
+        analyzer.issue_freshness_ttl = 60
+        
+        first = await analyzer.analyze_async(REPO, 4)
+        second = await analyzer.analyze_async(REPO, 4)
+        
+        assert second == first
+        assert stub_upstream.calls["issue"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_expired_issue_is_revalidated(self, analyzer, stub_upstream):
+        analyzer.issue_freshness_ttl = 60
+        await analyzer.analyze_async(REPO, 8)
+        stub_upstream.issues[8] = {"title": "Edited title", "body": "New body", "labels": []}
+        
+        await analyzer.expire_issue_async("owner", "repo", 8)
+        await analyzer.analyze_async(REPO, 8)
+        
+        assert stub_upstream.calls["issue"] == 2
+        assert stub_upstream.calls["llm"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_github_outage_serves_last_known_analysis(self, analyzer, stub_upstream):
+        stub_upstream.llm_content = stub_upstream.llm_content.replace("Stubbed summary", "Real analysis")
+        await analyzer.analyze_async(REPO, 5)
+        stub_upstream.failures["issue"] = 502
+        
+        result = await analyzer.analyze_async(REPO, 5)
+        
+        assert result["summary"] == "Real analysis"
+    
+    def test_exhausted_rate_limit_is_not_cached(self, analyzer, stub_upstream):
+        stub_upstream.failures["llm"] = 429
+        analyzer.rate_limits.max_retries = 1
+        
+        with pytest.raises(RateLimitedError):
+            analyzer.analyze(REPO, 6)
+        
+        assert not any(key.startswith("analysis:") for key in get_cache().cache)
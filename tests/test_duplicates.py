@@ -0,0 +1,262 @@
+"""
+Tests for near-duplicate detection and its vector index
+"""
+
+import json
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.duplicates import DuplicateDetector, TermStatistics, VectorIndex, term_hashes
+from backend.issue_analyzer import IssueAnalyzer
+from conftest import VALID_ANALYSIS
+
+
+REPO = "https://github.com/owner/repo"
+
+CRASH = {
+    "title": "App crashes on startup after upgrading to 2.0",
+    "body": "Since upgrading to version 2.0 the desktop app crashes immediately on startup "
+            "with a segmentation fault in the renderer. Downgrading to 1.9 fixes it.",
+}
+CRASH_AGAIN = {
+    "title": "Crash on startup after upgrade to 2.0",
+    "body": "After upgrading to version 2.0 the desktop app crashes immediately on startup "
+            "with a segmentation fault in the renderer process.",
+}
+DARK_MODE = {
+    "title": "Add a dark mode",
+    "body": "It would be nice to have a dark theme for the settings page and the editor.",
+}
+
+
+def _add_issues(directory, numbers, start):
+    """Index issues from another worker process"""
+    detector = DuplicateDetector(directory)
+    start.wait()
+    for number in numbers:
+        detector.add("owner", "repo", number, {"title": f"Widget {number} fails", "body": f"Steps for {number}"})
+    detector.close()
+
+
+def unit_vectors(count, dimensions, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def nearby(vector, seed, noise=0.3):
+    """A vector close to ``vector``, like a reworded duplicate"""
+    jitter = np.random.default_rng(seed).standard_normal(vector.shape).astype(np.float32)
+    return vector + noise * jitter / np.linalg.norm(jitter)
+
+
+class TestEmbedding:
+    """Hashed TF-IDF vectors"""
+    
+    def test_reworded_issue_is_closer_than_an_unrelated_one(self):
+        detector = DuplicateDetector(threshold=0.5)
+        detector.add("owner", "repo", 1, CRASH)
+        detector.add("owner", "repo", 2, DARK_MODE)
+        
+        number, similarity = detector.find("owner", "repo", 3, CRASH_AGAIN)
+        
+        assert number == 1
+        assert similarity > 0.6
+        assert detector.find("owner", "repo", 4, {"title": "Question about licensing", "body": ""}) is None
+    
+    def test_common_terms_weigh_less(self):
+        terms = TermStatistics()
+        for _ in range(50):
+            terms.observe(term_hashes("the app", "")[0])
+        hashes, frequencies = term_hashes("the renderer", "")
+        
+        vector = terms.embed(hashes, frequencies, 4096)
+        
+        bucket = lambda term: int(term_hashes(term, "")[0][0]) % 4096
+        common, rare = abs(vector[bucket("the")]), abs(vector[bucket("renderer")])
+        assert rare > 2 * common
+
+
+class TestVectorIndex:
+    """Exact below the training threshold, partitioned above it"""
+    
+    def test_small_index_is_exact(self):
+        index = VectorIndex(dimensions=16)
+        vectors = unit_vectors(50, 16)
+        index.add_many(range(1, 51), vectors)
+        
+        assert index.centroids is None
+        assert index.search(vectors[9], k=1)[0][0] == 10
+        assert index.search(vectors[9], k=1, exclude=10)[0][0] != 10
+    
+    def test_replacing_a_vector(self):
+        index = VectorIndex(dimensions=16)
+        vectors = unit_vectors(3, 16)
+        index.add(7, vectors[0])
+        index.add(7, vectors[1])
+        
+        assert len(index) == 1
+        assert index.search(vectors[1])[0] == (7, pytest.approx(1.0, abs=1e-5))
+    
+    def test_incremental_inserts_are_persisted(self, tmp_path):
+        vectors = unit_vectors(3000, 32)
+        index = VectorIndex(dimensions=32, directory=str(tmp_path))
+        for number, vector in enumerate(vectors):
+            index.add(number, vector)
+        assert index.centroids is not None
+        
+        reopened = VectorIndex(dimensions=32, directory=str(tmp_path))
+        
+        assert len(reopened) == 3000
+        hits = sum(reopened.search(nearby(vectors[n], n), k=1)[0][0] == n for n in range(0, 3000, 30))
+        assert hits >= 95
+    
+    def test_workers_adding_at_once_keep_every_vector(self, tmp_path):
+        directory = str(tmp_path)
+        context = multiprocessing.get_context("spawn")
+        start = context.Barrier(2)
+        # Together they outgrow the initial files and train partitions
+        processes = [
+            context.Process(target=_add_issues, args=(directory, range(first, 1200, 2), start)) for first in (1, 2)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=120)
+        
+        assert [process.exitcode for process in processes] == [0, 0]
+        index = DuplicateDetector(directory)._index("owner", "repo")
+        assert sorted(index.vectors.rows) == list(range(1, 1200))
+        assert np.allclose(np.linalg.norm(index.vectors._vectors[:len(index.vectors)], axis=1), 1)
+        assert index.terms.documents == 1199
+    
+    def test_dimension_mismatch_is_rejected(self, tmp_path):
+        VectorIndex(dimensions=32, directory=str(tmp_path)).add(1, unit_vectors(1, 32)[0])
+        
+        with pytest.raises(ValueError, match="32 dimensions"):
+            VectorIndex(dimensions=64, directory=str(tmp_path))
+    
+    def test_100k_issues_query_a_few_partitions(self, tmp_path, monkeypatch):
+        count = 100_000
+        vectors = unit_vectors(count, 128)
+        index = VectorIndex(dimensions=128, directory=str(tmp_path))
+        
+        start = time.perf_counter()
+        index.add_many(range(count), vectors)
+        build = time.perf_counter() - start
+        
+        scanned = []
+        list_array = index._list_array
+        
+        def counted(partition):
+            rows = list_array(partition)
+            scanned.append(len(rows))
+            return rows
+        
+        monkeypatch.setattr(index, "_list_array", counted)
+        queries = list(range(0, count, 997))
+        start = time.perf_counter()
+        results = [index.search(nearby(vectors[n], n), k=1) for n in queries]
+        per_query = (time.perf_counter() - start) / len(queries)
+        
+        recall = sum(result[0][0] == n for result, n in zip(results, queries)) / len(queries)
+        start = time.perf_counter()
+        index.add(count, unit_vectors(1, 128, seed=1)[0])
+        insert = time.perf_counter() - start
+        print(
+            f"\n100k x 128 index: built in {build:.2f}s, {per_query * 1000:.2f}ms per query, "
+            f"recall@1 {recall:.2f}, insert {insert * 1000:.2f}ms"
+        )
+        assert recall >= 0.95
+        # Each query scans its probes' partitions: a few percent of the index
+        assert len(scanned) == len(queries) * index.probes
+        assert sum(scanned) / len(queries) < count / 20
+        # An insert joins one partition without retraining
+        assert index.trained_count == count
+        assert sum(map(len, index._lists)) == count + 1
+
+
+class TestAnalyzerDuplicates:
+    """/analyze reuses the analysis of a near-duplicate"""
+    
+    @pytest.fixture
+    def duplicate_env(self, stub_upstream, monkeypatch, tmp_path):
+        monkeypatch.setenv("GROQ_API_KEY", "test_key")
+        monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+        monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+        monkeypatch.setenv("DUPLICATE_DETECTION", "true")
+        monkeypatch.setenv("DUPLICATE_INDEX_DIR", str(tmp_path))
+        monkeypatch.setenv("DUPLICATE_THRESHOLD", "0.6")
+        stub_upstream.issues[1] = {**CRASH, "number": 1, "labels": [], "state": "open"}
+        stub_upstream.issues[2] = {**CRASH_AGAIN, "number": 2, "labels": [], "state": "open"}
+        stub_upstream.issues[3] = {**DARK_MODE, "number": 3, "labels": [], "state": "open"}
+        return stub_upstream
+    
+    def test_near_duplicate_reuses_prior_analysis(self, duplicate_env):
+        with TestClient(main.app) as client:
+            first = client.post("/analyze", json={"repo_url": REPO, "issue_number": 1}).json()
+            duplicate = client.post("/analyze", json={"repo_url": REPO, "issue_number": 2}).json()
+            other = client.post("/analyze", json={"repo_url": REPO, "issue_number": 3}).json()
+            stats = client.get("/stats").json()
+        
+        assert "duplicate_of" not in first
+        assert duplicate["duplicate_of"] == 1
+        assert duplicate["duplicate_similarity"] > 0.6
+        assert duplicate["reasoning"].startswith("Possible duplicate of #1 (similarity ")
+        assert duplicate["summary"] == VALID_ANALYSIS["summary"]
+        assert "duplicate_of" not in other
+        # Issue 2 was answered without an LLM call
+        assert duplicate_env.calls["llm"] == 2
+        assert stats["duplicates"] == {"repositories": 1, "issues": 3, "found": 1}
+    
+    def test_exact_copy_is_flagged_but_not_its_original(self, duplicate_env):
+        duplicate_env.issues[4] = {**duplicate_env.issues[1], "number": 4}
+        duplicate_env.comments[1] = duplicate_env.comments[4] = [{"body": "Same here"}]
+        with TestClient(main.app) as client:
+            client.post("/analyze", json={"repo_url": REPO, "issue_number": 1})
+            copy = client.post("/analyze", json={"repo_url": REPO, "issue_number": 4}).json()
+            original = client.post("/analyze", json={"repo_url": REPO, "issue_number": 1}).json()
+        
+        assert copy["duplicate_of"] == 1
+        assert copy["duplicate_similarity"] == pytest.approx(1.0)
+        assert "duplicate_of" not in original
+        assert duplicate_env.calls["llm"] == 1
+    
+    def test_duplicate_note_stays_in_its_repository(self, duplicate_env):
+        with TestClient(main.app) as client:
+            client.post("/analyze", json={"repo_url": REPO, "issue_number": 1})
+            client.post("/analyze", json={"repo_url": REPO, "issue_number": 2})
+            # Same content as owner/repo#2, in a repository without its original
+            elsewhere = client.post(
+                "/analyze", json={"repo_url": "https://github.com/someone/else", "issue_number": 2}
+            ).json()
+        
+        assert "duplicate_of" not in elsewhere
+    
+    def test_streamed_analysis_is_flagged(self, duplicate_env):
+        with TestClient(main.app) as client:
+            client.post("/analyze", json={"repo_url": REPO, "issue_number": 1})
+            response = client.post("/analyze/stream", json={"repo_url": REPO, "issue_number": 2})
+        
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records[-1]["analysis"]["duplicate_of"] == 1
+        assert duplicate_env.calls["llm"] == 1
+    
+    def test_index_survives_a_restart(self, duplicate_env):
+        analyzer = IssueAnalyzer()
+        analyzer.analyze(REPO, 1)
+        analyzer.close()
+        
+        restarted = IssueAnalyzer()
+        try:
+            result = restarted.analyze(REPO, 2)
+        finally:
+            restarted.close()
+        
+        assert result["duplicate_of"] == 1
+        assert duplicate_env.calls["llm"] == 1
@@ -0,0 +1,202 @@
+"""
+Tests and latency benchmarks for GitHub issue fetching
+"""
+
+import time
+
+import httpx
+import pytest
+
+from backend.cache import get_cache, get_response_cache
+
+
+LATENCY = 0.3
+REPO = "https://github.com/owner/repo"
+
+
+class TestParallelFetch:
+    """Issue and comments are fetched in one round-trip of wall time"""
+    
+    @pytest.mark.asyncio
+    async def test_async_fetch_overlaps_requests(self, analyzer, stub_upstream):
+        stub_upstream.github_latency = LATENCY
+        
+        start = time.perf_counter()
+        data = await analyzer.fetch_issue_data_async("owner", "repo", 3)
+        elapsed = time.perf_counter() - start
+        
+        assert data["title"] == "Issue 3"
+        assert data["comments"] == ["Comment on 3"]
+        assert stub_upstream.peak["issue"] + stub_upstream.peak["comments"] == 2
+        # Sequential fetching would take 2 * LATENCY
+        assert elapsed < LATENCY * 1.5
+    
+    def test_sync_fetch_overlaps_requests(self, analyzer, stub_upstream):
+        stub_upstream.github_latency = LATENCY
+        
+        start = time.perf_counter()
+        data = analyzer.fetch_issue_data("owner", "repo", 3)
+        elapsed = time.perf_counter() - start
+        
+        assert data["comments"] == ["Comment on 3"]
+        assert elapsed < LATENCY * 1.5
+    
+    @pytest.mark.asyncio
+    async def test_comment_failure_still_returns_issue(self, analyzer, stub_upstream):
+        stub_upstream.failures["comments"] = 500
+        
+        data = await analyzer.fetch_issue_data_async("owner", "repo", 4)
+        
+        assert data["title"] == "Issue 4"
+        assert data["comments"] == []
+        assert analyzer.fetch_issue_data("owner", "repo", 4)["comments"] == []
+    
+    @pytest.mark.asyncio
+    async def test_missing_issue_raises(self, analyzer, stub_upstream):
+        stub_upstream.failures["issue"] = 404
+        
+        with pytest.raises(ValueError, match="not found"):
+            await analyzer.fetch_issue_data_async("owner", "repo", 5)
+        with pytest.raises(ValueError, match="not found"):
+            analyzer.fetch_issue_data("owner", "repo", 5)
+
+
+class TestConditionalRequests:
+    """ETag revalidation of GitHub responses and reuse of analyses"""
+    
+    @pytest.mark.asyncio
+    async def test_revalidated_fetch_returns_stored_payload(self, analyzer, stub_upstream):
+        first = await analyzer.fetch_issue_data_async("owner", "repo", 6)
+        second = await analyzer.fetch_issue_data_async("owner", "repo", 6)
+        
+        assert stub_upstream.not_modified == {"issue": 1, "comments": 1}
+        assert second == first
+        assert second["revision"]
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_issue_skips_llm(self, analyzer, stub_upstream):
+        first = await analyzer.analyze_async(REPO, 8)
+        
+        second = await analyzer.analyze_async(REPO, 8)
+        
+        assert second == first
+        assert stub_upstream.calls["llm"] == 1
+        assert stub_upstream.not_modified == {"issue": 1, "comments": 1}
+    
+    def test_changed_issue_is_reanalyzed(self, analyzer, stub_upstream):
+        analyzer.analyze(REPO, 9)
+        stub_upstream.comments[9] = [{"body": "A new comment"}]
+        
+        analyzer.analyze(REPO, 9)
+        
+        assert stub_upstream.calls["llm"] == 2
+        assert stub_upstream.not_modified == {"issue": 1, "comments": 0}
+    
+    @pytest.mark.asyncio
+    async def test_stored_responses_are_slim_and_kept_apart(self, analyzer, stub_upstream):
+        stub_upstream.comments[10] = [{
+            "body": "Same here",
+            "user": {"login": "someone", "type": "User", "avatar_url": "https://example.com/a.png"},
+            "author_association": "NONE",
+            "reactions": {"total_count": 2, "+1": 2},
+            "html_url": "https://github.com/owner/repo/issues/10#issuecomment-1",
+        }]
+        
+        await analyzer.analyze_async(REPO, 10)
+        
+        comments_url = f"{stub_upstream.url}/repos/owner/repo/issues/10/comments?per_page=100"
+        stored = get_response_cache().get(f"github-response:{comments_url}")
+        assert stored["body"] == [{
+            "body": "Same here",
+            "user": {"type": "User"},
+            "author_association": "NONE",
+            "reactions": {"total_count": 2},
+        }]
+        # Raw responses never compete with analyses for the analysis cache budget
+        assert not any(key.startswith("github-response:") for key in get_cache().cache)
+
+
+def make_thread(count):
+    """A comment thread of ``count`` plain user comments, oldest first"""
+    return [
+        {"body": f"comment {i}", "author_association": "NONE", "user": {"type": "User"}}
+        for i in range(count)
+    ]
+
+
+class TestCommentPagination:
+    """Long threads are fetched lazily and only as far as the prompt needs"""
+    
+    @pytest.mark.asyncio
+    async def test_long_thread_skips_middle_pages(self, analyzer, stub_upstream):
+        stub_upstream.comments[10] = make_thread(500)
+        
+        data = await analyzer.fetch_issue_data_async("owner", "repo", 10)
+        
+        # Opening page plus the newest page; pages 2-4 are never downloaded
+        assert stub_upstream.comment_pages == [1, 5]
+        assert data["comments"] == [f"comment {i}" for i in range(499, 494, -1)]
+    
+    def test_short_last_page_walks_back(self, analyzer, stub_upstream):
+        stub_upstream.comments[11] = make_thread(302)
+        
+        data = analyzer.fetch_issue_data("owner", "repo", 11)
+        
+        assert stub_upstream.comment_pages == [1, 4, 3]
+        assert data["comments"] == [f"comment {i}" for i in range(301, 296, -1)]
+    
+    @pytest.mark.asyncio
+    async def test_single_page_thread_is_one_request(self, analyzer, stub_upstream):
+        stub_upstream.comments[12] = make_thread(80)
+        
+        await analyzer.fetch_issue_data_async("owner", "repo", 12)
+        
+        assert stub_upstream.comment_pages == [1]
+    
+    @pytest.mark.asyncio
+    async def test_paged_thread_is_revalidated(self, analyzer, stub_upstream):
+        stub_upstream.comments[13] = make_thread(250)
+        
+        first = await analyzer.fetch_issue_data_async("owner", "repo", 13)
+        second = await analyzer.fetch_issue_data_async("owner", "repo", 13)
+        
+        assert second == first
+        assert stub_upstream.not_modified["comments"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_failed_later_page_keeps_first_page(self, analyzer, stub_upstream, monkeypatch):
+        stub_upstream.comments[14] = make_thread(150)
+        original = analyzer._conditional_get_async
+        
+        async def fail_later_pages(url, headers, slim):
+            if "page=2" in url:
+                raise httpx.ConnectError("boom")
+            return await original(url, headers, slim)
+        monkeypatch.setattr(analyzer, "_conditional_get_async", fail_later_pages)
+        
+        data = await analyzer.fetch_issue_data_async("owner", "repo", 14)
+        
+        assert data["comments"] == [f"comment {i}" for i in range(99, 94, -1)]
+        assert data["revision"] == ""
+
+
+class TestCommentSelection:
+    """Comments are ranked by recency, maintainer authorship and reactions"""
+    
+    def test_picks_recent_maintainer_and_reacted(self, analyzer):
+        thread = make_thread(40)
+        thread[3]["author_association"] = "MEMBER"
+        thread[7]["reactions"] = {"total_count": 25}
+        thread[39]["user"] = {"type": "Bot"}
+        thread[38]["body"] = ""
+        
+        picked = analyzer._select_comments(thread)
+        
+        assert [c["body"] for c in picked] == [
+            "comment 37", "comment 3", "comment 7", "comment 36", "comment 35",
+        ]
+    
+    def test_short_thread_is_kept_whole(self, analyzer):
+        thread = make_thread(3)
+        
+        assert analyzer._select_comments(thread) == thread
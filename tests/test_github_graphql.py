@@ -0,0 +1,151 @@
+"""
+Tests for the GraphQL issue fetcher, against the stub GraphQL endpoint
+"""
+
+import pytest
+
+from backend.github_graphql import build_issues_query, issue_from_node
+from backend.issue_analyzer import IssueAnalyzer
+from conftest import VALID_ANALYSIS
+
+
+REPO = "https://github.com/owner/repo"
+
+
+def graphql_analyzer(monkeypatch):
+    monkeypatch.setenv("GITHUB_FETCH_BACKEND", "graphql")
+    return IssueAnalyzer()
+
+
+def rest_comment(i):
+    """A comment as the REST API returns it, most of which an analysis never reads"""
+    api = "https://api.github.com"
+    return {
+        "url": f"{api}/repos/owner/repo/issues/comments/{1000 + i}",
+        "html_url": f"https://github.com/owner/repo/issues/7#issuecomment-{1000 + i}",
+        "issue_url": f"{api}/repos/owner/repo/issues/7",
+        "id": 1000 + i,
+        "node_id": f"IC_kwDOAJy2Ks5{1000 + i}",
+        "user": {
+            "login": f"user{i}",
+            "id": 500 + i,
+            "avatar_url": f"https://avatars.githubusercontent.com/u/{500 + i}?v=4",
+            "url": f"{api}/users/user{i}",
+            "html_url": f"https://github.com/user{i}",
+            "type": "User",
+            "site_admin": False,
+        },
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "author_association": "NONE",
+        "body": f"comment {i}",
+        "performed_via_github_app": None,
+    }
+
+
+def busy_thread(count):
+    """A thread with bots, a maintainer and a well-liked comment near both ends"""
+    comments = [rest_comment(i) for i in range(count)]
+    comments[3]["author_association"] = "MEMBER"
+    comments[5]["reactions"] = {"total_count": 12}
+    comments[-1]["user"]["type"] = "Bot"
+    comments[-2]["body"] = ""
+    return comments
+
+
+class TestQuery:
+    """Queries alias one issue field per issue"""
+    
+    def test_query_aliases_each_issue(self):
+        query = build_issues_query([3, 14])
+        
+        assert "issue_3: issue(number: 3) { ...IssueFields }" in query
+        assert "issue_14: issue(number: 14) { ...IssueFields }" in query
+    
+    def test_overlapping_comment_windows_are_joined_once(self):
+        comment = lambda i: {"body": f"c{i}", "author": {"__typename": "User"}}
+        node = {
+            "state": "CLOSED",
+            "firstComments": {"totalCount": 3, "nodes": [comment(0), comment(1), comment(2)]},
+            "lastComments": {"nodes": [comment(1), comment(2)]},
+        }
+        
+        issue, comments = issue_from_node(node)
+        
+        assert issue["state"] == "closed"
+        assert [c["body"] for c in comments] == ["c0", "c1", "c2"]
+
+
+class TestGraphQLFetch:
+    """One query returns the same issue data as the REST endpoints"""
+    
+    @pytest.mark.asyncio
+    async def test_same_issue_data_as_rest(self, analyzer, stub_upstream, monkeypatch):
+        stub_upstream.comments[7] = busy_thread(250)
+        rest = await analyzer.fetch_issue_data_async("owner", "repo", 7)
+        rest_bytes = stub_upstream.bytes_sent["issue"] + stub_upstream.bytes_sent["comments"]
+        rest_calls = stub_upstream.calls["issue"] + stub_upstream.calls["comments"]
+        
+        graphql = graphql_analyzer(monkeypatch)
+        try:
+            data = await graphql.fetch_issue_data_async("owner", "repo", 7)
+        finally:
+            await graphql.aclose()
+        
+        print(
+            f"\nREST: {rest_calls} requests, {rest_bytes} bytes; "
+            f"GraphQL: 1 request, {stub_upstream.bytes_sent['graphql']} bytes"
+        )
+        assert {**data, "revision": ""} == {**rest, "revision": ""}
+        assert "comment 3" in data["comments"] and "comment 5" in data["comments"]
+        assert stub_upstream.calls["graphql"] == 1
+        assert stub_upstream.bytes_sent["graphql"] < rest_bytes
+    
+    def test_sync_fetch_is_one_round_trip(self, stub_upstream, monkeypatch, analyzer):
+        graphql = graphql_analyzer(monkeypatch)
+        try:
+            result = graphql.analyze(REPO, 4)
+        finally:
+            graphql.close()
+        
+        assert result == VALID_ANALYSIS
+        assert stub_upstream.calls["graphql"] == 1
+        assert stub_upstream.calls["issue"] == stub_upstream.calls["comments"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_missing_issue_raises(self, analyzer, stub_upstream, monkeypatch):
+        stub_upstream.missing_issues = {9}
+        graphql = graphql_analyzer(monkeypatch)
+        try:
+            with pytest.raises(ValueError, match="Issue #9 not found in owner/repo"):
+                await graphql.fetch_issue_data_async("owner", "repo", 9)
+        finally:
+            await graphql.aclose()
+    
+    def test_unknown_backend_is_rejected(self, analyzer, monkeypatch):
+        monkeypatch.setenv("GITHUB_FETCH_BACKEND", "soap")
+        with pytest.raises(ValueError, match="GITHUB_FETCH_BACKEND"):
+            IssueAnalyzer()
+
+
+class TestGraphQLBatch:
+    """Batches fetch GRAPHQL_BATCH_SIZE issues per query"""
+    
+    @pytest.mark.asyncio
+    async def test_batch_is_fetched_fifty_issues_per_query(self, analyzer, stub_upstream, monkeypatch):
+        stub_upstream.missing_issues = {60}
+        graphql = graphql_analyzer(monkeypatch)
+        items = [(REPO, n) for n in range(1, 121)] + [(REPO, 5), ("not a url", 1)]
+        try:
+            results = await graphql.analyze_batch_async(items)
+        finally:
+            await graphql.aclose()
+        
+        assert [len(numbers) for numbers in stub_upstream.graphql_issues] == [50, 50, 20]
+        assert stub_upstream.calls["issue"] == 0
+        assert [result["issue_number"] for result in results] == [n for _, n in items]
+        assert all(result["analysis"] == VALID_ANALYSIS for i, result in enumerate(results) if i not in (59, 121))
+        # A missing issue gets the same placeholder as on the REST path
+        assert results[59]["analysis"]["summary"].startswith("Unable to fetch issue details")
+        assert results[121]["error"]
+        assert results[120]["analysis"] == results[4]["analysis"]
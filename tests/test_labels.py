@@ -0,0 +1,146 @@
+"""
+Tests for repository label catalogs and label matching
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.issue_analyzer import IssueAnalyzer
+from backend.labels import LabelCatalogs, LabelIndex, canonical_label, normalize_label
+from conftest import VALID_ANALYSIS
+
+
+REPO = "https://github.com/owner/repo"
+
+REPO_LABELS = [
+    "type: bug",
+    "kind/enhancement",
+    "📝 Docs",
+    "performance-issue",
+    "good first issue",
+    "area: api",
+    "dependencies",
+]
+
+
+class TestMatching:
+    """Suggestions map onto the closest real label, or are dropped"""
+    
+    def test_normalization(self):
+        assert normalize_label("Type: Bugs 🐛") == "type bug"
+        assert canonical_label("kind/Feature") == "enhancement"
+        assert canonical_label("priority") == "priority"
+    
+    @pytest.mark.parametrize("suggested, expected", [
+        ("type: bug", "type: bug"),
+        ("Bug", "type: bug"),
+        ("feature_request", "kind/enhancement"),
+        ("enhancements", "kind/enhancement"),
+        ("documentation", "📝 Docs"),
+        ("api", "area: api"),
+        ("dependency", "dependencies"),
+        ("performance", "performance-issue"),
+        ("good-first-issues", "good first issue"),
+        ("crash", None),
+        ("question", None),
+    ])
+    def test_match(self, suggested, expected):
+        assert LabelIndex(REPO_LABELS).match(suggested) == expected
+    
+    def test_threshold(self):
+        assert LabelIndex(["performance-issue"], threshold=0.9).match("performance") is None
+    
+    def test_catalog_match_dedups_and_counts(self):
+        catalogs = LabelCatalogs()
+        
+        matched = catalogs.match(REPO_LABELS, ["bug", "type: bug", "wontfix", "api"])
+        
+        assert matched == ["type: bug", "area: api"]
+        assert catalogs.stats() == {"repositories": 0, "kept": 1, "mapped": 2, "dropped": 1}
+    
+    def test_catalog_freshness(self):
+        catalogs = LabelCatalogs(ttl=0)
+        catalogs.store("Owner", "Repo", ["bug"])
+        
+        assert catalogs.fresh("owner", "repo") is None
+        assert catalogs.known("owner", "repo") == ("bug",)
+
+
+class TestAnalyzerLabels:
+    """The analyzer fetches each catalog once and matches suggestions locally"""
+    
+    @pytest.fixture
+    def labeled_analyzer(self, analyzer, stub_upstream, monkeypatch):
+        monkeypatch.setenv("LABEL_MATCHING", "true")
+        stub_upstream.repo_labels = [{"name": name} for name in REPO_LABELS]
+        stub_upstream.llm_content = json.dumps({**VALID_ANALYSIS, "suggested_labels": ["bug", "Performance", "crash"]})
+        return IssueAnalyzer()
+    
+    def test_suggestions_are_mapped_onto_repo_labels(self, labeled_analyzer, stub_upstream):
+        try:
+            first = labeled_analyzer.analyze(REPO, 1)
+            second = labeled_analyzer.analyze(REPO, 2)
+        finally:
+            labeled_analyzer.close()
+        
+        assert first["suggested_labels"] == ["type: bug", "performance-issue"]
+        assert second["suggested_labels"] == ["type: bug", "performance-issue"]
+        assert "REPOSITORY LABELS (choose suggested_labels from these): type: bug, kind/enhancement" in (
+            stub_upstream.llm_prompts[0][-1]["content"]
+        )
+        # One catalog fetch serves every analysis within the TTL
+        assert stub_upstream.calls["labels"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_catalog_is_revalidated_with_its_etag(self, labeled_analyzer, stub_upstream, monkeypatch):
+        labeled_analyzer.labels.ttl = 0
+        stub_upstream.repo_labels = [{"name": f"label-{n}"} for n in range(150)] + [{"name": "type: bug"}]
+        try:
+            await labeled_analyzer.analyze_async(REPO, 1)
+            result = await labeled_analyzer.analyze_async(REPO, 2)
+        finally:
+            await labeled_analyzer.aclose()
+        
+        assert result["suggested_labels"] == ["type: bug"]
+        # Two pages, fetched then revalidated
+        assert stub_upstream.calls["labels"] == 4
+        assert stub_upstream.not_modified["labels"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_last_known_catalog_outlives_a_github_failure(self, labeled_analyzer, stub_upstream):
+        labeled_analyzer.labels.ttl = 0
+        try:
+            await labeled_analyzer.analyze_async(REPO, 1)
+            stub_upstream.failures["labels"] = 500
+            result = await labeled_analyzer.analyze_async(REPO, 2)
+        finally:
+            await labeled_analyzer.aclose()
+        
+        assert result["suggested_labels"] == ["type: bug", "performance-issue"]
+    
+    def test_without_a_catalog_suggestions_pass_through(self, labeled_analyzer, stub_upstream):
+        stub_upstream.failures["labels"] = 500
+        try:
+            result = labeled_analyzer.analyze(REPO, 1)
+        finally:
+            labeled_analyzer.close()
+        
+        assert result["suggested_labels"] == ["bug", "Performance", "crash"]
+        assert "REPOSITORY LABELS" not in stub_upstream.llm_prompts[0][-1]["content"]
+    
+    def test_stats(self, stub_upstream, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "test_key")
+        monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+        monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+        monkeypatch.setenv("LABEL_MATCHING", "true")
+        stub_upstream.repo_labels = [{"name": "bug"}]
+        stub_upstream.llm_content = json.dumps({**VALID_ANALYSIS, "suggested_labels": ["bug", "Bugs", "ui"]})
+        with TestClient(main.app) as client:
+            analysis = client.post("/analyze", json={"repo_url": REPO, "issue_number": 1}).json()
+            stats = client.get("/stats").json()
+        
+        assert analysis["suggested_labels"] == ["bug"]
+        assert stats["labels"] == {"repositories": 1, "kept": 1, "mapped": 1, "dropped": 1}
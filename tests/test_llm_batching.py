@@ -0,0 +1,142 @@
+"""
+Tests and benchmarks for multi-issue batched LLM prompts
+"""
+
+import json
+import time
+
+import pytest
+
+from backend.cache import get_cache
+from backend.prompt_builder import estimate_tokens
+from conftest import VALID_ANALYSIS
+
+
+def small_issue(n):
+    return {
+        "title": f"Issue {n}",
+        "body": f"Clicking save on page {n} does nothing.",
+        "comments": [f"Same on page {n}"],
+        "labels": ["bug"],
+        "state": "open",
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-02T00:00:00Z",
+        "revision": "",
+    }
+
+
+async def analyze_all(analyzer, issues, concurrency):
+    results = {}
+    async for index, result in analyzer.iter_issue_data_async("owner", "repo", issues, concurrency):
+        results[index] = result
+    return results
+
+
+class TestBatchResponse:
+    """Batched responses are validated item by item"""
+    
+    def test_invalid_items_are_dropped(self, analyzer):
+        response = json.dumps([
+            {"issue_number": 1, **VALID_ANALYSIS},
+            {"issue_number": 2, "summary": "missing fields"},
+            {"issue_number": 9, **VALID_ANALYSIS},
+            "not an object",
+        ])
+        
+        analyses = analyzer.parse_batch_response(f"Here you go:\n{response}", [1, 2, 3])
+        
+        assert list(analyses) == [1]
+        assert analyses[1]["type"] == "bug"
+    
+    def test_non_array_response_raises(self, analyzer):
+        with pytest.raises(ValueError):
+            analyzer.parse_batch_response(json.dumps(VALID_ANALYSIS), [1])
+
+
+class TestGroupAnalysis:
+    """Several compact issues share a single LLM call"""
+    
+    @pytest.mark.asyncio
+    async def test_group_is_one_call_and_cached_per_issue(self, analyzer, stub_upstream):
+        issues = {n: small_issue(n) for n in range(1, 6)}
+        
+        results = await analyzer.analyze_issue_data_group_async(issues)
+        
+        assert sorted(results) == [1, 2, 3, 4, 5]
+        assert stub_upstream.calls["llm"] == 1
+        # A later single analysis of the same content reuses the batched one
+        analysis, _ = await analyzer.analyze_issue_data_async(issues[3])
+        assert analysis == results[3][0]
+        assert stub_upstream.calls["llm"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_large_issue_is_left_out(self, analyzer, stub_upstream):
+        issues = {n: small_issue(n) for n in range(1, 4)}
+        issues[2]["body"] = "A long stack trace line\n" * 2000
+        
+        results = await analyzer.analyze_issue_data_group_async(issues)
+        
+        assert sorted(results) == [1, 3]
+        assert "=== ISSUE #2 ===" not in stub_upstream.llm_prompts[0][-1]["content"]
+    
+    @pytest.mark.asyncio
+    async def test_omitted_issue_is_retried_individually(self, analyzer, stub_upstream):
+        analyzer.llm_batch_size = 5
+        stub_upstream.batch_omit = {3}
+        issues = {n: small_issue(n) for n in range(1, 6)}
+        
+        results = await analyze_all(analyzer, issues, concurrency=2)
+        
+        assert all(result["analysis"] == VALID_ANALYSIS for result in results.values())
+        assert [results[i]["issue_number"] for i in range(5)] == [1, 2, 3, 4, 5]
+        assert stub_upstream.calls["llm"] == 2
+        assert "=== ISSUE #" not in stub_upstream.llm_prompts[1][-1]["content"]
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_call_falls_back_to_single_calls(self, analyzer, stub_upstream):
+        analyzer.llm_batch_size = 4
+        stub_upstream.llm_content = "not json at all"
+        stub_upstream.batch_omit = {1, 2, 3, 4}
+        issues = {n: small_issue(n) for n in range(1, 5)}
+        
+        results = await analyze_all(analyzer, issues, concurrency=1)
+        
+        assert all(result["error"] for result in results.values())
+        assert stub_upstream.calls["llm"] == 5
+
+
+class TestBatchingBenchmark:
+    """Tokens per issue and issues per second, batched vs one call per issue"""
+    
+    ISSUES = 40
+    LLM_LATENCY = 0.1
+    
+    async def run(self, analyzer, stub, batch_size):
+        get_cache().clear()
+        stub.reset_counters()
+        analyzer.llm_batch_size = batch_size
+        issues = {n: small_issue(n) for n in range(1, self.ISSUES + 1)}
+        
+        start = time.perf_counter()
+        results = await analyze_all(analyzer, issues, concurrency=2)
+        elapsed = time.perf_counter() - start
+        
+        assert all(result["analysis"] for result in results.values())
+        prompt_tokens = sum(
+            estimate_tokens(message["content"]) for messages in stub.llm_prompts for message in messages
+        )
+        return prompt_tokens / self.ISSUES, self.ISSUES / elapsed
+    
+    @pytest.mark.asyncio
+    async def test_batching_amortizes_per_call_overhead(self, analyzer, stub_upstream):
+        stub_upstream.llm_latency = self.LLM_LATENCY
+        
+        single_tokens, single_rate = await self.run(analyzer, stub_upstream, batch_size=1)
+        batched_tokens, batched_rate = await self.run(analyzer, stub_upstream, batch_size=8)
+        
+        print(
+            f"\none per call: {single_tokens:.0f} prompt tokens/issue, {single_rate:.1f} issues/s"
+            f"\nbatched by 8: {batched_tokens:.0f} prompt tokens/issue, {batched_rate:.1f} issues/s"
+        )
+        assert batched_tokens < single_tokens / 3
+        assert batched_rate > single_rate * 3
@@ -0,0 +1,157 @@
+"""
+Tests for streamed LLM completions and incremental JSON parsing
+"""
+
+import json
+import time
+
+import httpx
+import pytest
+
+from backend.response_parser import IncrementalObjectParser
+from conftest import VALID_ANALYSIS
+
+
+REPO = "https://github.com/owner/repo"
+CHATTER = "\n\nI hope this analysis helps! Let me know if you need anything else. " * 20
+
+
+def feed_all(parser, text, size):
+    members = []
+    for start in range(0, len(text), size):
+        members.extend(parser.feed(text[start:start + size]))
+    return members
+
+
+class TestIncrementalObjectParser:
+    """Members are reported as they complete and parsing stops at the closing brace"""
+    
+    def test_members_arrive_in_order(self):
+        parser = IncrementalObjectParser()
+        
+        members = feed_all(parser, json.dumps(VALID_ANALYSIS), 7)
+        
+        assert [name for name, _ in members] == list(VALID_ANALYSIS)
+        assert dict(members) == VALID_ANALYSIS
+        assert parser.done
+    
+    def test_summary_is_reported_before_object_completes(self):
+        parser = IncrementalObjectParser()
+        text = json.dumps(VALID_ANALYSIS)
+        
+        members = parser.feed(text[:text.index('"type"')])
+        
+        assert members == [("summary", "Stubbed summary")]
+        assert not parser.done
+    
+    def test_prefix_and_trailing_text_are_ignored(self):
+        parser = IncrementalObjectParser()
+        text = "```json\n" + json.dumps(VALID_ANALYSIS) + "\n```" + CHATTER
+        
+        feed_all(parser, text, 1)
+        
+        assert json.loads(parser.result()) == VALID_ANALYSIS
+    
+    def test_braces_and_quotes_inside_strings(self):
+        parser = IncrementalObjectParser()
+        data = {"summary": 'Crash in "render() {", see }', "nested": {"a": [1, {"b": "]"}]}, "type": "bug"}
+        
+        members = feed_all(parser, json.dumps(data) + "{ignored}", 3)
+        
+        assert dict(members) == data
+        assert json.loads(parser.result()) == data
+    
+    def test_unclosed_object_returns_everything(self):
+        parser = IncrementalObjectParser()
+        
+        parser.feed('Sorry, {"summary": "cut off')
+        
+        assert not parser.done
+        assert parser.result() == 'Sorry, {"summary": "cut off'
+
+
+class TestStreamedCompletion:
+    """Analyses stop reading the completion at the end of the JSON object"""
+    
+    @pytest.mark.asyncio
+    async def test_trailing_chatter_is_not_read(self, analyzer, stub_upstream):
+        # JSON mode is not streamed
+        analyzer.llm_response_format = "text"
+        stub_upstream.llm_content = json.dumps(VALID_ANALYSIS) + CHATTER
+        stub_upstream.llm_chunk_delay = 0.01
+        total_chunks = -(-len(stub_upstream.llm_content) // stub_upstream.llm_chunk_size)
+        
+        start = time.perf_counter()
+        analysis = await analyzer.analyze_async(REPO, 1)
+        elapsed = time.perf_counter() - start
+        
+        assert analysis == VALID_ANALYSIS
+        # Reading the whole completion would take total_chunks * 10 ms
+        assert elapsed < total_chunks * 0.01 / 2
+        assert stub_upstream.llm_chunks_sent < total_chunks
+    
+    def test_sync_analysis_streams_too(self, analyzer, stub_upstream):
+        analyzer.llm_response_format = "text"
+        stub_upstream.llm_content = "Here is the analysis:\n" + json.dumps(VALID_ANALYSIS) + CHATTER
+        
+        assert analyzer.analyze(REPO, 2) == VALID_ANALYSIS
+
+
+class TestAnalyzeStreamEndpoint:
+    """POST /analyze/stream sends fields before the full analysis"""
+    
+    def test_fields_then_analysis(self, live_app, stub_upstream):
+        stub_upstream.llm_chunk_delay = 0.02
+        
+        arrivals = []
+        with httpx.stream(
+            "POST", f"{live_app.url}/analyze/stream", json={"repo_url": REPO, "issue_number": 3}, timeout=30
+        ) as response:
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            for line in response.iter_lines():
+                arrivals.append((time.perf_counter(), json.loads(line)))
+        
+        records = [record for _, record in arrivals]
+        fields = [record["name"] for record in records if record["event"] == "field"]
+        assert fields[:2] == ["summary", "type"]
+        assert records[-1] == {"event": "analysis", "analysis": VALID_ANALYSIS}
+        # The summary is sent well before the analysis is complete
+        assert arrivals[-1][0] - arrivals[0][0] > 0.1
+    
+    def test_cached_analysis_is_single_record(self, live_app, stub_upstream):
+        payload = {"repo_url": REPO, "issue_number": 4}
+        httpx.post(f"{live_app.url}/analyze/stream", json=payload, timeout=30)
+        
+        response = httpx.post(f"{live_app.url}/analyze/stream?format=sse", json=payload, timeout=30)
+        
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.startswith("event: analysis\n")
+        assert stub_upstream.calls["llm"] == 1
+    
+    def test_stream_after_analyze_reuses_its_completion(self, live_app, stub_upstream):
+        payload = {"repo_url": REPO, "issue_number": 6}
+        analysis = httpx.post(f"{live_app.url}/analyze", json=payload, timeout=30).json()
+        
+        response = httpx.post(f"{live_app.url}/analyze/stream", json=payload, timeout=30)
+        
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records == [{"event": "analysis", "analysis": analysis}]
+        assert stub_upstream.calls["llm"] == 1
+        assert "response_format" in stub_upstream.llm_params[0]
+    
+    def test_llm_failure_is_error_record(self, live_app, stub_upstream):
+        stub_upstream.failures["llm"] = 500
+        
+        response = httpx.post(
+            f"{live_app.url}/analyze/stream", json={"repo_url": REPO, "issue_number": 5}, timeout=30
+        )
+        
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records[-1]["event"] == "error"
+    
+    def test_invalid_url_is_rejected_up_front(self, live_app, stub_upstream):
+        response = httpx.post(
+            f"{live_app.url}/analyze/stream", json={"repo_url": "not a url", "issue_number": 1}, timeout=30
+        )
+        
+        assert response.status_code == 400
@@ -0,0 +1,157 @@
+"""
+Tests and timing benchmarks for the token-budgeted prompt builder
+"""
+
+import time
+
+import pytest
+
+from backend.duplicates import DuplicateDetector
+from backend.prompt_builder import (
+    BLOCK_KEEP_LINES,
+    TokenCounter,
+    compact_text,
+    estimate_tokens,
+    fit_sections,
+    fit_text,
+)
+
+
+def python_traceback(depth):
+    """A RecursionError-style traceback repeating the same frame"""
+    frames = '  File "app.py", line 10, in recurse\n    return recurse(n - 1)\n' * depth
+    return "Traceback (most recent call last):\n" + frames + "RecursionError: maximum recursion depth exceeded"
+
+
+def issue_data(body, comments=()):
+    return {
+        "title": "Crash on startup",
+        "body": body,
+        "comments": list(comments),
+        "labels": ["bug"],
+        "state": "open",
+        "created_at": "",
+        "updated_at": "",
+        "revision": "",
+    }
+
+
+class TestTokenEstimate:
+    """Token estimates are cheap, monotonic and cached"""
+    
+    def test_estimate_tracks_text_size(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("Hello, world!") == 4
+        assert estimate_tokens("word " * 1000) == 1000
+    
+    def test_counts_are_cached(self):
+        counter = TokenCounter(max_entries=2)
+        text = "some text " * 100
+        
+        first = counter.count(text)
+        second = counter.count(text)
+        
+        assert first == second
+        assert (counter.hits, counter.misses) == (1, 1)
+    
+    def test_cache_is_bounded(self):
+        counter = TokenCounter(max_entries=2)
+        for text in ("a", "b", "c"):
+            counter.count(text)
+        
+        counter.count("a")
+        
+        assert counter.misses == 4
+
+
+class TestCompaction:
+    """Logs and traces are shrunk, prose is left alone"""
+    
+    def test_prose_is_untouched(self):
+        text = "First paragraph.\n\nSecond paragraph\nwith two lines."
+        assert compact_text(text) == text
+    
+    def test_long_code_block_keeps_head_and_tail(self):
+        log = "\n".join(f"log line {i}" for i in range(1000))
+        
+        compacted = compact_text(f"Output:\n\n```\n{log}\n```\nThanks")
+        lines = compacted.splitlines()
+        
+        assert "log line 0" in lines and "log line 999" in lines
+        assert "log line 500" not in lines
+        assert f"... [{1000 - 2 * BLOCK_KEEP_LINES} lines trimmed] ..." in lines
+        assert lines[-1] == "Thanks"
+    
+    def test_repeated_stack_frames_are_dropped(self):
+        compacted = compact_text(python_traceback(500))
+        
+        assert compacted.count('File "app.py"') == 1
+        assert compacted.count("return recurse") == 1
+        assert "[499 repeated stack frames omitted]" in compacted
+        assert compacted.endswith("RecursionError: maximum recursion depth exceeded")
+    
+    def test_javascript_frames_are_deduplicated(self):
+        frames = "    at render (app.js:1:1)\n    at loop (app.js:2:2)\n" * 3
+        compacted = compact_text("TypeError: x is undefined\n" + frames)
+        
+        assert compacted.count("at render") == 1
+        assert compacted.count("at loop") == 1
+
+
+class TestBudget:
+    """Prompts stay within the token budget whatever the input size"""
+    
+    def test_fit_text_keeps_head_and_tail(self):
+        text = "start " + "filler " * 10000 + "end"
+        
+        fitted = fit_text(text, 200)
+        
+        assert estimate_tokens(fitted) <= 200
+        assert fitted.startswith("start") and fitted.endswith("end")
+    
+    def test_comments_fill_remaining_space_in_order(self):
+        comments = ["first " * 50, "second " * 500, "third " * 50]
+        
+        body, kept = fit_sections("short body", comments, 150, comment_max_tokens=100)
+        
+        assert body == "short body"
+        # The second comment is capped at 100 tokens and no longer fits
+        assert kept == [comments[0], comments[2]]
+    
+    def test_huge_issue_prompt_is_bounded(self, analyzer):
+        analyzer.prompt_token_budget = 3000
+        body = "It crashes.\n\n" + "\n".join(f"ERROR worker {i}: timeout" for i in range(200000))
+        data = issue_data(body, ["comment " * 1000] * 5)
+        
+        start = time.perf_counter()
+        prompt = analyzer.generate_analysis_prompt(data)
+        elapsed = time.perf_counter() - start
+        
+        assert len(body) > 5_000_000
+        assert estimate_tokens(prompt) <= 3000
+        assert "It crashes." in prompt
+        assert "ERROR worker 199999: timeout" in prompt
+        assert "- comment comment" in prompt
+        assert elapsed < 5.0
+    
+    @pytest.mark.asyncio
+    async def test_each_analysis_builds_its_prompt_once(self, analyzer, stub_upstream, monkeypatch):
+        analyzer.duplicates = DuplicateDetector()
+        prompts = []
+        generate = analyzer.generate_analysis_prompt
+        monkeypatch.setattr(analyzer, "generate_analysis_prompt", lambda data: prompts.append(data) or generate(data))
+        
+        analyzer.analyze("https://github.com/owner/repo", 1)
+        await analyzer.analyze_async("https://github.com/owner/repo", 2)
+        
+        assert stub_upstream.calls["llm"] == 2
+        assert len(prompts) == 2
+    
+    def test_small_issue_prompt_is_complete(self, analyzer):
+        data = issue_data("Steps to reproduce", ["Same here", "Fixed in main"])
+        
+        prompt = analyzer.generate_analysis_prompt(data)
+        
+        assert "Steps to reproduce" in prompt
+        assert "- Same here\n- Fixed in main" in prompt
+        assert "EXISTING LABELS: bug" in prompt
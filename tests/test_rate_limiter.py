@@ -0,0 +1,255 @@
+"""
+Tests for the rate-limit scheduler, against unit doubles and the stub upstream
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.cache import get_cache
+from backend.rate_limiter import (
+    RateLimitScheduler,
+    RateLimitedError,
+    TokenBucket,
+    parse_duration,
+    quota,
+    retry_after,
+)
+from conftest import VALID_ANALYSIS
+
+
+REPO = "https://github.com/owner/repo"
+
+
+def responses(*statuses, headers=None):
+    """A call returning the given statuses in turn"""
+    queue = [httpx.Response(status, headers=headers if status != 200 else None) for status in statuses]
+    calls = []
+    
+    def call():
+        calls.append(time.monotonic())
+        return queue.pop(0)
+    return call, calls
+
+
+class TestHeaders:
+    """Rate-limit headers from GitHub and Groq"""
+    
+    def test_parse_duration(self):
+        assert parse_duration("7") == 7
+        assert parse_duration("250ms") == 0.25
+        assert parse_duration("1m30.5s") == 90.5
+        assert parse_duration("1h2m") == 3720
+        with pytest.raises(ValueError):
+            parse_duration("soon")
+    
+    def test_github_quota(self):
+        reset = time.time() + 30
+        remaining, reset_after = quota({"x-ratelimit-remaining": "12", "x-ratelimit-reset": str(reset)})
+        
+        assert remaining == 12
+        assert 29 < reset_after <= 30
+    
+    def test_groq_quota(self):
+        headers = {"x-ratelimit-remaining-requests": "99", "x-ratelimit-reset-requests": "2m59.56s"}
+        assert quota(headers) == (99, 179.56)
+    
+    def test_retry_after_prefers_explicit_headers(self):
+        assert retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+        assert retry_after({"retry-after": "9"}) == 9
+        assert retry_after({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "4s"}) == 4
+        assert retry_after({"x-ratelimit-remaining-requests": "3", "x-ratelimit-reset-requests": "4s"}) is None
+
+
+class TestTokenBucket:
+    """Callers queue for tokens instead of failing"""
+    
+    def test_reservations_queue_at_the_rate(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        
+        delays = [bucket.reserve() for _ in range(3)]
+        
+        assert delays[0] == 0
+        assert delays[1] == pytest.approx(0.1, abs=0.01)
+        assert delays[2] == pytest.approx(0.2, abs=0.01)
+    
+    def test_wait_beyond_max_takes_no_token(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        bucket.reserve()
+        
+        assert bucket.reserve(max_wait=0.5) is None
+        assert bucket.reserve() == pytest.approx(1, abs=0.01)
+    
+    def test_exhausted_quota_waits_for_reset(self):
+        bucket = TokenBucket()
+        assert bucket.reserve() == 0
+        
+        bucket.observe(remaining=0, reset_after=0.3)
+        
+        assert bucket.reserve() == pytest.approx(0.3, abs=0.01)
+    
+    def test_callers_beyond_the_next_quota_wait_another_window(self):
+        bucket = TokenBucket()
+        bucket.observe(remaining=1, reset_after=0.5)
+        
+        delays = [bucket.reserve() for _ in range(6)]
+        
+        # One left now, two per window after that
+        assert delays[0] == 0
+        assert delays[1:3] == [pytest.approx(0.5, abs=0.01)] * 2
+        assert delays[3:5] == [pytest.approx(1.0, abs=0.01)] * 2
+        assert delays[5] == pytest.approx(1.5, abs=0.01)
+
+
+class TestScheduler:
+    """Rate-limited calls are retried after the delay the upstream asks for"""
+    
+    def test_retries_after_retry_after(self):
+        scheduler = RateLimitScheduler(max_wait=5)
+        call, calls = responses(429, 429, 200, headers={"retry-after-ms": "100"})
+        
+        response = scheduler.run("llm", "key", call)
+        
+        assert response.status_code == 200
+        assert scheduler.retries == 2
+        assert calls[2] - calls[0] >= 0.2
+    
+    def test_github_403_with_exhausted_quota_is_a_rate_limit(self):
+        scheduler = RateLimitScheduler(max_wait=5)
+        headers = {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(time.time() + 0.1)}
+        call, _ = responses(403, 200, headers=headers)
+        
+        assert scheduler.run("github", None, call).status_code == 200
+    
+    def test_other_errors_are_not_retried(self):
+        scheduler = RateLimitScheduler()
+        call, calls = responses(404)
+        
+        assert scheduler.run("github", None, call).status_code == 404
+        assert len(calls) == 1
+    
+    def test_gives_up_when_told_to_wait_too_long(self):
+        scheduler = RateLimitScheduler(max_wait=1)
+        call, calls = responses(429, headers={"retry-after": "30"})
+        
+        assert scheduler.run("llm", "key", call).status_code == 429
+        assert len(calls) == 1
+    
+    def test_gives_up_after_max_retries(self):
+        scheduler = RateLimitScheduler(max_retries=2, backoff=0.01)
+        call, calls = responses(503, 503, 503, 200)
+        
+        assert scheduler.run("llm", "key", call).status_code == 503
+        assert len(calls) == 3
+    
+    def test_blocked_bucket_fails_fast(self):
+        scheduler = RateLimitScheduler(max_wait=1)
+        scheduler.bucket("llm", "key").block(30)
+        
+        with pytest.raises(RateLimitedError) as error:
+            scheduler.run("llm", "key", lambda: pytest.fail("called while blocked"))
+        assert error.value.retry_after > 29
+    
+    def test_credentials_have_separate_buckets(self):
+        scheduler = RateLimitScheduler(max_wait=1)
+        scheduler.bucket("llm", "first").block(30)
+        call, _ = responses(200)
+        
+        assert scheduler.run("llm", "second", call).status_code == 200
+        assert set(scheduler.stats()) == {"llm:a7937b64", "llm:16367aac"}
+    
+    @pytest.mark.asyncio
+    async def test_exceptions_carrying_a_response_are_retried(self):
+        scheduler = RateLimitScheduler(max_wait=5)
+        limited = httpx.Response(429, headers={"retry-after-ms": "10"}, request=httpx.Request("GET", "http://x"))
+        outcomes = [httpx.HTTPStatusError("limited", request=limited.request, response=limited), "done"]
+        
+        async def call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        assert await scheduler.run_async("llm", "key", call) == "done"
+
+
+class TestUpstreamRateLimits:
+    """The analyzer waits out 429s from the stub and returns real analyses"""
+    
+    @pytest.mark.asyncio
+    async def test_llm_429s_are_retried_to_a_real_result(self, analyzer, stub_upstream):
+        stub_upstream.throttle["llm"] = [(429, {"retry-after-ms": "50"})] * 2
+        
+        result = await analyzer.analyze_async(REPO, 1)
+        
+        assert result == VALID_ANALYSIS
+        assert stub_upstream.throttled["llm"] == 2
+        assert stub_upstream.calls["llm"] == 3
+    
+    def test_github_quota_exhaustion_is_waited_out(self, analyzer, stub_upstream):
+        reset = str(time.time() + 0.2)
+        stub_upstream.throttle["issue"] = [(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})]
+        
+        start = time.monotonic()
+        result = analyzer.analyze(REPO, 2)
+        
+        assert result == VALID_ANALYSIS
+        assert time.monotonic() - start >= 0.15
+        assert stub_upstream.calls["issue"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_bursts_are_paced_by_the_reported_quota(self, analyzer, stub_upstream):
+        stub_upstream.quotas = {"llm": (5, 0.5)}
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(analyzer.analyze_async(REPO, n) for n in range(1, 21)))
+        elapsed = time.perf_counter() - start
+        
+        print(
+            f"\n20 analyses under a 5 per 0.5s quota: {elapsed:.2f}s, "
+            f"{stub_upstream.over_quota['llm']} rejected, {analyzer.rate_limits.retries} retries"
+        )
+        assert all(result == VALID_ANALYSIS for result in results)
+        # Only the opening burst, sent before any quota was known, can overrun it
+        assert stub_upstream.over_quota["llm"] <= 10
+        assert elapsed < 4.0
+        assert stub_upstream.calls["llm"] == 20
+    
+    def test_exhausted_rate_limit_maps_to_429(self, stub_upstream, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "test_key")
+        monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+        monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+        monkeypatch.setenv("RATE_LIMIT_MAX_WAIT", "1")
+        stub_upstream.failures["llm"] = 429
+        stub_upstream.throttle["llm"] = [(429, {"retry-after": "30"})]
+        
+        with TestClient(main.app) as client:
+            response = client.post("/analyze", json={"repo_url": REPO, "issue_number": 3})
+            stats = client.get("/stats").json()
+        
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "30"
+        assert not any(key.startswith("analysis:") for key in get_cache().cache)
+        assert list(stats["rate_limits"]) == ["github:anonymous", "llm:92488e1e"]
+    
+    def test_exhausted_github_quota_maps_to_429(self, stub_upstream, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "test_key")
+        monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+        monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+        monkeypatch.setenv("RATE_LIMIT_MAX_WAIT", "1")
+        exhausted = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 30)}
+        stub_upstream.throttle["issue"] = [(403, exhausted)]
+        stub_upstream.throttle["list_issues"] = [(403, exhausted)]
+        
+        with TestClient(main.app) as client:
+            response = client.post("/analyze", json={"repo_url": REPO, "issue_number": 4})
+            repo_response = client.post("/analyze/repo/stream", json={"repo_url": REPO})
+        
+        # Not a placeholder analysis served as if GitHub were down
+        assert response.status_code == repo_response.status_code == 429
+        assert 25 <= int(response.headers["retry-after"]) <= 30
+        assert stub_upstream.calls["llm"] == 0
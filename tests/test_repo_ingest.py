@@ -0,0 +1,307 @@
+"""
+Tests for repository-wide bulk ingestion
+"""
+
+import asyncio
+import json
+import multiprocessing
+
+import httpx
+import pytest
+
+from backend import main
+from backend.cache import get_cache
+from backend.issue_analyzer import IssueAnalyzer
+from backend.sync_cursors import SyncCursorStore
+
+
+def _save_cursors(path, owner, count, start):
+    """Save the cursors of an owner's repositories from another worker process"""
+    store = SyncCursorStore(path)
+    start.wait()
+    for n in range(count):
+        store.set(f"{owner}/repo{n}:open", {"since": "2024-01-01T00:00:00Z", "seen": [n]})
+
+
+def make_repo(stub, issue_count, comments_per_issue=2, url="http://stub"):
+    """Populate the stub listings with issues, a pull request and comments"""
+    stub.repo_issues = [
+        {
+            "number": n,
+            "title": f"Issue {n}",
+            "body": f"Body {n}",
+            "labels": [{"name": "bug"}],
+            "state": "closed" if n % 10 == 0 else "open",
+            "comments": comments_per_issue,
+            "created_at": f"2024-01-01T{n // 60:02d}:{n % 60:02d}:00Z",
+            "updated_at": "2024-02-01T00:00:00Z",
+        }
+        for n in range(1, issue_count + 1)
+    ]
+    stub.repo_issues.append({
+        "number": issue_count + 1, "title": "A PR", "state": "open", "pull_request": {},
+        "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-02-01T00:00:00Z",
+    })
+    # Threads are answered soon after their issue is opened
+    stub.repo_comments = [
+        {
+            "issue_url": f"{url}/repos/owner/repo/issues/{issue['number']}",
+            "body": f"Comment {c} on {issue['number']}",
+            "updated_at": issue["created_at"],
+        }
+        for issue in stub.repo_issues[:issue_count]
+        for c in range(comments_per_issue)
+    ]
+
+
+class TestRepoIngestion:
+    """Paginated listing of issues and comments"""
+    
+    @pytest.mark.asyncio
+    async def test_issues_grouped_with_comments(self, analyzer, stub_upstream):
+        make_repo(stub_upstream, 250)
+        
+        issues = await analyzer.fetch_repo_issues_async("owner", "repo")
+        
+        open_numbers = [n for n in range(1, 251) if n % 10]
+        assert sorted(issues) == open_numbers
+        assert issues[7]["comments"] == ["Comment 0 on 7", "Comment 1 on 7"]
+        assert issues[7]["labels"] == ["bug"]
+        assert set(issues[7]) >= {"title", "body", "comments", "labels", "state", "updated_at"}
+    
+    @pytest.mark.asyncio
+    async def test_request_count_scales_with_pages(self, analyzer, stub_upstream):
+        make_repo(stub_upstream, 250)
+        
+        await analyzer.fetch_repo_issues_async("owner", "repo")
+        
+        # 251 listed items in 3 pages, and one pass over 500 comments in 5
+        # pages shared by them, instead of 225 calls
+        assert stub_upstream.calls["list_issues"] == 3
+        assert stub_upstream.calls["list_comments"] == 5
+        assert stub_upstream.calls["issue"] == stub_upstream.calls["comments"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_late_replies_do_not_restart_the_comment_walk(self, analyzer, stub_upstream):
+        make_repo(stub_upstream, 1000)
+        # A reply long after the rest of the thread, on one issue of every page
+        for number in range(1, 1000, 100):
+            stub_upstream.repo_issues[number - 1]["comments"] = 3
+            late_reply = {
+                "issue_url": f"http://stub/repos/owner/repo/issues/{number}",
+                "body": f"Late reply on {number}",
+                "updated_at": "2024-01-31T00:00:00Z",
+            }
+            stub_upstream.repo_comments.append(late_reply)
+            stub_upstream.comments[number] = [
+                *(comment for comment in stub_upstream.repo_comments if comment["issue_url"] == late_reply["issue_url"])
+            ]
+        
+        issues = await analyzer.fetch_repo_issues_async("owner", "repo")
+        
+        assert issues[501]["comments"] == ["Comment 0 on 501", "Comment 1 on 501", "Late reply on 501"]
+        assert issues[502]["comments"] == ["Comment 0 on 502", "Comment 1 on 502"]
+        # 901 listed items in 10 pages; the 2010 comments are listed once, in
+        # at most 21 pages, and each late reply costs one thread request,
+        # except on the last page, whose walk reaches the replies
+        assert stub_upstream.calls["list_issues"] == 10
+        assert stub_upstream.calls["list_comments"] <= 21
+        assert stub_upstream.calls["comments"] == 9
+    
+    @pytest.mark.asyncio
+    async def test_issues_without_comments_cost_no_comment_requests(self, analyzer, stub_upstream):
+        make_repo(stub_upstream, 50, comments_per_issue=0)
+        
+        issues = await analyzer.fetch_repo_issues_async("owner", "repo")
+        incremental = await analyzer.fetch_repo_issues_async("owner", "repo", since="2024-01-01T00:00:00Z")
+        
+        assert issues[7]["comments"] == incremental[7]["comments"] == []
+        assert stub_upstream.calls["list_comments"] == stub_upstream.calls["comments"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_thread_far_back_in_the_listing_is_fetched_on_its_own(self, analyzer, stub_upstream):
+        make_repo(stub_upstream, 5, comments_per_issue=0)
+        stub_upstream.repo_issues[0]["comments"] = 1
+        stub_upstream.comments[1] = [{"body": "Late reply"}]
+        # Busy issues elsewhere bury the reply under pages of other comments
+        stub_upstream.repo_comments = [
+            {"issue_url": "http://stub/repos/owner/repo/issues/999", "body": "Elsewhere", "updated_at": "2024-01-02T00:00:00Z"}
+            for _ in range(500)
+        ]
+        
+        issues = await analyzer.fetch_repo_issues_async("owner", "repo")
+        
+        assert issues[1]["comments"] == ["Late reply"]
+        assert stub_upstream.calls["list_comments"] == 1
+        assert stub_upstream.calls["comments"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_analysis_starts_before_the_listing_ends(self, analyzer, stub_upstream):
+        make_repo(stub_upstream, 250)
+        
+        results = analyzer.iter_issue_pages_async(
+            "owner", "repo", analyzer.iter_repo_issues_async("owner", "repo")
+        )
+        _, result = await anext(results)
+        await results.aclose()
+        
+        assert result["error"] is None
+        assert stub_upstream.calls["list_issues"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_listing_failure_raises(self, analyzer, stub_upstream):
+        stub_upstream.failures["list_issues"] = 500
+        
+        with pytest.raises(ValueError):
+            await analyzer.fetch_repo_issues_async("owner", "repo")
+    
+    @pytest.mark.asyncio
+    async def test_failing_thread_fetch_raises(self, analyzer, stub_upstream, monkeypatch):
+        make_repo(stub_upstream, 30)
+        
+        async def fetch_comments(url, headers, issue_number):
+            if issue_number == 3:
+                raise RuntimeError("thread fetch failed")
+            return [], ""
+        
+        monkeypatch.setattr(analyzer, "_fetch_comments_async", fetch_comments)
+        
+        # Surfaces instead of leaving the caller waiting on the dead worker's result
+        with pytest.raises(RuntimeError, match="thread fetch failed"):
+            await asyncio.wait_for(
+                analyzer.fetch_repo_issues_async("owner", "repo", since="2024-01-01T00:00:00Z"), timeout=5
+            )
+    
+    @pytest.mark.asyncio
+    async def test_repo_stream_endpoint(self, analyzer, stub_upstream):
+        make_repo(stub_upstream, 12)
+        main.app.state.analyzer = analyzer
+        try:
+            async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+                response = await client.post(
+                    "/analyze/repo/stream", json={"repo_url": "https://github.com/owner/repo"}
+                )
+        finally:
+            main.app.state.analyzer = None
+        
+        records = [json.loads(line) for line in response.text.splitlines()]
+        results = [r for r in records if r["event"] == "result"]
+        assert sorted(r["issue_number"] for r in results) == [n for n in range(1, 13) if n != 10]
+        assert records[-1]["succeeded"] == 11
+        assert stub_upstream.calls["llm"] == 11
+    
+    @pytest.mark.asyncio
+    async def test_later_listing_failure_ends_the_stream_with_an_error(self, analyzer, stub_upstream, monkeypatch):
+        make_repo(stub_upstream, 3)
+        listed = analyzer.iter_repo_issues_async
+        
+        async def fail_after_first_page(*args, **kwargs):
+            async for page in listed(*args, **kwargs):
+                yield page
+            raise ValueError("GitHub API error: 502")
+        
+        monkeypatch.setattr(analyzer, "iter_repo_issues_async", fail_after_first_page)
+        main.app.state.analyzer = analyzer
+        try:
+            async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+                response = await client.post(
+                    "/analyze/repo/stream", json={"repo_url": "https://github.com/owner/repo", "incremental": True}
+                )
+        finally:
+            main.app.state.analyzer = None
+        
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["event"] for r in records][-2:] == ["error", "summary"]
+        assert records[-1]["succeeded"] == 3
+        assert analyzer.get_sync_cursor("owner", "repo", "open") is None
+
+
+class TestIncrementalSync:
+    """Cursor-based incremental repository sync"""
+    
+    @pytest.fixture
+    def repo(self, stub_upstream):
+        make_repo(stub_upstream, 30)
+        for issue in stub_upstream.repo_issues:
+            issue["updated_at"] = f"2024-02-01T00:00:{issue['number']:02d}Z"
+        return stub_upstream
+    
+    async def sync(self, client):
+        response = await client.post(
+            "/analyze/repo/stream",
+            json={"repo_url": "https://github.com/owner/repo", "incremental": True},
+        )
+        return [json.loads(line) for line in response.text.splitlines()]
+    
+    @pytest.mark.asyncio
+    async def test_second_run_only_touches_changed_issues(self, analyzer, repo):
+        main.app.state.analyzer = analyzer
+        try:
+            async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+                first = await self.sync(client)
+                assert first[-1]["total"] == 27
+                assert analyzer.get_sync_cursor("owner", "repo", "open")["since"] == "2024-02-01T00:00:29Z"
+                llm_calls = repo.calls["llm"]
+                list_comment_calls = repo.calls["list_comments"]
+                
+                for issue in repo.repo_issues[:2]:
+                    issue["updated_at"] = "2024-03-01T00:00:00Z"
+                repo.comments[1] = [{"body": "New comment"}]
+                second = await self.sync(client)
+                
+                third = await self.sync(client)
+        finally:
+            main.app.state.analyzer = None
+        
+        changed = sorted(r["issue_number"] for r in second if r["event"] == "result")
+        assert changed == [1, 2]
+        assert repo.calls["llm"] - llm_calls == 2
+        assert repo.calls["comments"] == 2
+        assert repo.calls["list_comments"] == list_comment_calls
+        assert third[-1]["total"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_cursor_not_advanced_on_failures(self, analyzer, repo):
+        repo.failures["llm"] = 400
+        main.app.state.analyzer = analyzer
+        try:
+            async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+                records = await self.sync(client)
+        finally:
+            main.app.state.analyzer = None
+        
+        assert records[-1]["failed"] == 27
+        assert analyzer.get_sync_cursor("owner", "repo", "open") is None
+    
+    @pytest.mark.asyncio
+    async def test_cursor_survives_restarts_and_cache_eviction(self, analyzer, repo):
+        main.app.state.analyzer = analyzer
+        try:
+            async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+                await self.sync(client)
+        finally:
+            main.app.state.analyzer = None
+        get_cache().clear()
+        restarted = IssueAnalyzer()
+        restarted.close()
+        
+        assert restarted.get_sync_cursor("owner", "repo", "open") == {"since": "2024-02-01T00:00:29Z", "seen": [29]}
+    
+    def test_workers_saving_at_once_keep_each_others_cursors(self, tmp_path):
+        path = str(tmp_path / "sync_cursors.json")
+        context = multiprocessing.get_context("spawn")
+        start = context.Barrier(2)
+        processes = [
+            context.Process(target=_save_cursors, args=(path, owner, 200, start)) for owner in ("alice", "bob")
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+        
+        assert [process.exitcode for process in processes] == [0, 0]
+        store = SyncCursorStore(path)
+        assert all(
+            store.get(f"{owner}/repo{n}:open") == {"since": "2024-01-01T00:00:00Z", "seen": [n]}
+            for owner in ("alice", "bob") for n in range(200)
+        )
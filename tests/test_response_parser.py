@@ -0,0 +1,264 @@
+"""
+Tests for LLM response extraction, repair and validation
+"""
+
+import json
+import random
+import re
+import time
+
+import pytest
+
+from backend import response_parser
+from backend.response_parser import extract_json, parse_analysis, repair_json, validate_analysis
+from conftest import VALID_ANALYSIS
+
+
+ANALYSIS = {
+    "summary": "App crashes when opening settings on Android 14",
+    "type": "bug",
+    "priority_score": "4/5: Crash affecting many users",
+    "suggested_labels": ["bug", "android", "crash"],
+    "potential_impact": "Users on Android 14 cannot change any settings.",
+    "reasoning": "The stack trace points at the settings screen {SettingsActivity}, and it started with the latest release.",
+}
+
+# Characters that stress the repairs: quotes, braces and backslashes inside strings
+TRICKY = 'ab cd "quoted" {braces} [brackets] \\ back\\slash, colon: é ü 漢 \u2019'
+
+
+def legacy_parse(text):
+    """The parser this module replaced: a greedy regex, then json.loads"""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("Could not extract JSON from LLM response")
+    try:
+        data = json.loads(match.group())
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in LLM response: {e}")
+    return validate_analysis(data)
+
+
+def smart_quoted(data):
+    """JSON whose string delimiters are typographic quotes"""
+    text = json.dumps(data, ensure_ascii=False)
+    out, opening, escape = [], True, False
+    for char in text:
+        if escape:
+            escape = False
+        elif char == "\\":
+            escape = True
+        elif char == '"':
+            char = "\u201c" if opening else "\u201d"
+            opening = not opening
+        out.append(char)
+    return "".join(out)
+
+
+def corpus(count, seed=0):
+    """LLM responses as (kind, expected analysis, text), mostly clean, with the usual defects mixed in"""
+    rng = random.Random(seed)
+    kinds = [
+        ("clean", 50), ("fenced", 15), ("prose", 10), ("extra_brace", 5), ("second_object", 5),
+        ("trailing_comma", 5), ("smart_quotes", 3), ("raw_newlines", 5), ("truncated_brace", 2),
+    ]
+    responses = []
+    for _ in range(count):
+        kind = rng.choices([k for k, _ in kinds], [w for _, w in kinds])[0]
+        data = {**ANALYSIS, "summary": f"{ANALYSIS['summary']} #{rng.randrange(10 ** 6)}"}
+        if kind == "raw_newlines":
+            data["reasoning"] = data["reasoning"].replace(", and", ",\n\tand")
+        pretty = json.dumps(data, indent=2)
+        text = {
+            "clean": pretty,
+            "fenced": f"```json\n{pretty}\n```",
+            "prose": f"Here is the analysis:\n\n{pretty}\n\nLet me know if you need anything else.",
+            "extra_brace": pretty + "\n}",
+            "second_object": pretty + "\n" + json.dumps({"note": "alternative reading"}),
+            "trailing_comma": pretty.replace('"crash"\n', '"crash",\n').replace("release.\"\n", "release.\",\n"),
+            "smart_quotes": smart_quoted(data),
+            "raw_newlines": pretty.replace("\\n", "\n").replace("\\t", "\t"),
+            "truncated_brace": pretty[:-1],
+        }[kind]
+        responses.append((kind, data, text))
+    return responses
+
+
+class TestExtraction:
+    """The first JSON value is decoded on its own"""
+    
+    @pytest.mark.parametrize("text", [
+        json.dumps(VALID_ANALYSIS),
+        f"```json\n{json.dumps(VALID_ANALYSIS, indent=2)}\n```",
+        f"Sure! {json.dumps(VALID_ANALYSIS)}\n}}",
+        f"{json.dumps(VALID_ANALYSIS)} {json.dumps({'summary': 'second'})}",
+    ])
+    def test_surroundings_are_ignored(self, text):
+        assert parse_analysis(text) == VALID_ANALYSIS
+    
+    def test_array_of_objects_skips_list_fields(self):
+        text = f'Labels ["x"] first, then [{json.dumps(VALID_ANALYSIS)}] and [1]'
+        
+        assert extract_json(text, array=True) == [VALID_ANALYSIS]
+    
+    @pytest.mark.parametrize("text, message", [
+        ("no json here", "Could not extract JSON"),
+        ("{invalid json}", "Invalid JSON in LLM response"),
+        ('{"summary": "x", "type": "bug"}', "Missing required fields: priority_score, potential_impact, suggested_labels"),
+        ("[1, 2]", "Could not extract JSON"),
+    ])
+    def test_failures(self, text, message):
+        with pytest.raises(ValueError, match=message):
+            parse_analysis(text)
+
+
+class TestRepair:
+    """Common defects are repaired in one scan instead of failing the analysis"""
+    
+    @pytest.mark.parametrize("text, expected, repairs", [
+        ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}, ["trailing commas"]),
+        ("{\u201ca\u201d: \u201cit\u2019s \"x\"\u201d}", {"a": 'it\u2019s "x"'}, ["smart quotes", "unescaped quotes"]),
+        ('{"a": "one\ntwo\tthree"}', {"a": "one\ntwo\tthree"}, ["control characters in strings"]),
+        ('{"a": "C:\\Users\\x"}', {"a": "C:\\Users\\x"}, ["invalid escapes"]),
+        ('{"a": "the "save" button", "b": 1}', {"a": 'the "save" button', "b": 1}, ["unescaped quotes"]),
+        ('{"a": [1, 2}', {"a": [1, 2]}, ["unclosed brackets"]),
+        ('{"a": "cut off', {"a": "cut off"}, ["unterminated string", "unclosed brackets"]),
+        ('{"a": 1]}', {"a": 1}, ["stray brackets"]),
+    ])
+    def test_repairs(self, text, expected, repairs):
+        repaired, made = repair_json(text)
+        
+        assert json.loads(repaired) == expected
+        assert made == repairs
+        assert extract_json(text) == expected
+    
+    def test_valid_json_is_untouched(self):
+        text = json.dumps({**VALID_ANALYSIS, "summary": TRICKY})
+        
+        assert repair_json(text) == (text, [])
+
+
+class TestValidation:
+    """The schema is checked and normalized in a single pass"""
+    
+    def test_normalization(self):
+        analysis = validate_analysis({
+            **VALID_ANALYSIS,
+            "type": ["bug"],
+            "priority_score": 4,
+            "potential_impact": None,
+            "reasoning": None,
+            "suggested_labels": "bug",
+        })
+        
+        assert analysis["type"] == "other"
+        assert analysis["priority_score"] == "4"
+        assert analysis["potential_impact"] == ""
+        assert analysis["reasoning"].startswith("Reasoning not returned")
+        assert analysis["suggested_labels"] == ["bug"]
+    
+    def test_labels_are_capped(self):
+        analysis = validate_analysis({**VALID_ANALYSIS, "suggested_labels": ["a", "b", "c", "d", 5]})
+        
+        assert analysis["suggested_labels"] == ["a", "b", "c"]
+
+
+class TestFuzz:
+    """Mutated responses are recovered, or rejected with ValueError"""
+    
+    def random_analysis(self, rng):
+        text = lambda: "".join(rng.choice(TRICKY) for _ in range(rng.randrange(1, 40)))
+        return {
+            "summary": text(),
+            "type": rng.choice(["bug", "question", "other"]),
+            "priority_score": f"{rng.randrange(1, 6)}/5: {text()}",
+            "suggested_labels": [text() for _ in range(rng.randrange(0, 4))],
+            "potential_impact": text(),
+            "reasoning": text(),
+        }
+    
+    def test_repairable_mutations_round_trip(self):
+        rng = random.Random(7)
+        for _ in range(1000):
+            data = self.random_analysis(rng)
+            mutation = rng.choice(["prose", "trailing_commas", "smart_quotes", "raw_newlines", "truncated"])
+            if mutation == "raw_newlines":
+                # \x01 is escaped by json.dumps; swap its escape for a raw newline
+                data["summary"] += "\x01end"
+                text = json.dumps(data, ensure_ascii=False).replace("\\u0001", "\n")
+                data["summary"] = data["summary"].replace("\x01", "\n")
+            elif mutation == "smart_quotes":
+                text = smart_quoted(data)
+            else:
+                text = json.dumps(data, indent=rng.choice([None, 2]), ensure_ascii=False)
+            if mutation == "prose":
+                text = f"Analysis:\n{text}\n}} done"
+            elif mutation == "trailing_commas":
+                text = text[:-1].rstrip() + ', "extra": [1, 2,],\n}'
+                data["extra"] = [1, 2]
+            elif mutation == "truncated":
+                text = text[:-1]
+            
+            assert extract_json(text) == data, (mutation, text)
+    
+    def test_random_corruption_never_crashes(self):
+        rng = random.Random(11)
+        alphabet = '{}[]",:\\\n \u201c\u201dabc123'
+        for _ in range(3000):
+            text = list(json.dumps(self.random_analysis(rng), ensure_ascii=False))
+            for _ in range(rng.randrange(1, 6)):
+                position = rng.randrange(len(text))
+                action = rng.randrange(3)
+                if action == 0:
+                    del text[position]
+                elif action == 1:
+                    text.insert(position, rng.choice(alphabet))
+                else:
+                    text[position] = rng.choice(alphabet)
+            try:
+                parse_analysis("".join(text))
+            except ValueError:
+                pass
+
+
+class TestCorpusBenchmark:
+    """Fewer failed parses than the regex parser, at no extra CPU"""
+    
+    def test_corpus(self, monkeypatch):
+        responses = corpus(2000)
+        
+        def run(parse):
+            failures = {}
+            start = time.perf_counter()
+            for kind, _, text in responses:
+                try:
+                    parse(text)
+                except ValueError:
+                    failures[kind] = failures.get(kind, 0) + 1
+            return failures, (time.perf_counter() - start) / len(responses)
+        
+        legacy_failures, legacy_time = run(legacy_parse)
+        failures, per_response = run(parse_analysis)
+        clean = [text for kind, _, text in responses if kind == "clean"]
+        start = time.perf_counter()
+        for text in clean:
+            parse_analysis(text)
+        clean_time = (time.perf_counter() - start) / len(clean)
+        print(
+            f"\nCorpus of {len(responses)}: regex parser failed {sum(legacy_failures.values())} "
+            f"{legacy_failures} at {legacy_time * 1e6:.1f}us each; new parser failed "
+            f"{sum(failures.values())} at {per_response * 1e6:.1f}us each ({clean_time * 1e6:.1f}us when clean)"
+        )
+        assert failures == {}
+        assert set(legacy_failures) >= {"extra_brace", "second_object", "trailing_comma", "smart_quotes"}
+        
+        rescans = []
+        monkeypatch.setattr(
+            response_parser, "repair_json", lambda text, start=0: rescans.append(kind) or repair_json(text, start)
+        )
+        for kind, data, text in responses:
+            assert parse_analysis(text) == data
+        # Only malformed JSON is rescanned in Python, and only once
+        repaired_kinds = {"trailing_comma", "smart_quotes", "raw_newlines", "truncated_brace"}
+        assert set(rescans) == repaired_kinds
+        assert len(rescans) == sum(kind in repaired_kinds for kind, _, _ in responses)
@@ -0,0 +1,156 @@
+"""
+Tests for single-flight coalescing of concurrent analyses
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from backend.singleflight import SingleFlight, get_singleflight
+
+
+REPO = "https://github.com/owner/repo"
+
+
+class TestSingleFlight:
+    """Unit tests for SingleFlight"""
+    
+    @pytest.mark.asyncio
+    async def test_async_followers_share_leader_result(self):
+        group = SingleFlight()
+        calls = 0
+        
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"value": calls}
+        
+        results = await asyncio.gather(*[group.do_async("k", work) for _ in range(10)])
+        
+        assert calls == 1
+        assert all(r == {"value": 1} for r in results)
+        assert group.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 9}
+    
+    @pytest.mark.asyncio
+    async def test_async_followers_receive_leader_error(self):
+        group = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+        
+        results = await asyncio.gather(
+            *[group.do_async("k", work) for _ in range(5)], return_exceptions=True
+        )
+        
+        assert all(isinstance(r, ValueError) for r in results)
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        group = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+        
+        leader = asyncio.create_task(group.do_async("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(group.do_async("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        
+        assert await follower == "done"
+    
+    def test_sync_followers_share_leader_result(self):
+        group = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return "result"
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(group.do("k", work))) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for t in threads[1:]:
+            t.start()
+        while group.stats()["coalesced"] < 4:
+            pass
+        release.set()
+        for t in threads:
+            t.join()
+        
+        assert len(calls) == 1
+        assert results == ["result"] * 5
+
+
+class TestAnalyzerCoalescing:
+    """Concurrent analyses of one issue hit GitHub and the LLM once"""
+    
+    @pytest.mark.asyncio
+    async def test_async_analyses_coalesced(self, analyzer, stub_upstream):
+        stub_upstream.llm_latency = 0.2
+        before = get_singleflight().stats()["coalesced"]
+        
+        results = await asyncio.gather(*[analyzer.analyze_async(REPO, 42) for _ in range(20)])
+        
+        assert all(r["summary"] == "Stubbed summary" for r in results)
+        assert (stub_upstream.calls["issue"], stub_upstream.calls["comments"], stub_upstream.calls["llm"]) == (1, 1, 1)
+        assert get_singleflight().stats()["coalesced"] - before == 19
+    
+    @pytest.mark.asyncio
+    async def test_async_error_propagates_to_followers(self, analyzer, stub_upstream):
+        stub_upstream.llm_latency = 0.2
+        stub_upstream.failures["llm"] = 400
+        
+        results = await asyncio.gather(
+            *[analyzer.analyze_async(REPO, 43) for _ in range(5)], return_exceptions=True
+        )
+        
+        assert all(isinstance(r, ValueError) for r in results)
+        assert stub_upstream.calls["llm"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_streamed_analyses_coalesced(self, analyzer, stub_upstream):
+        stub_upstream.llm_chunk_delay = 0.01
+        
+        async def stream():
+            return [record async for record in analyzer.analyze_stream_async(REPO, 45)]
+        
+        leader, follower = await asyncio.gather(stream(), stream())
+        
+        assert stub_upstream.calls["llm"] == 1
+        assert [r["name"] for r in leader if r["event"] == "field"][:2] == ["summary", "type"]
+        assert follower == [leader[-1]]
+    
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_leaves_followers_their_analysis(self, analyzer, stub_upstream):
+        stub_upstream.llm_chunk_delay = 0.01
+        records = analyzer.analyze_stream_async(REPO, 46)
+        first = await anext(records)
+        follower = asyncio.ensure_future(analyzer.analyze_async(REPO, 46))
+        await asyncio.sleep(0)
+        
+        await records.aclose()
+        
+        assert first["event"] == "field"
+        assert (await follower)["summary"] == "Stubbed summary"
+        assert stub_upstream.calls["llm"] == 1
+    
+    def test_sync_analyses_coalesced(self, analyzer, stub_upstream):
+        stub_upstream.llm_latency = 0.3
+        
+        threads = [threading.Thread(target=analyzer.analyze, args=(REPO, 44)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert stub_upstream.calls["llm"] == 1
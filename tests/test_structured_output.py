@@ -0,0 +1,140 @@
+"""
+Tests for deterministic, schema-constrained LLM calls
+"""
+
+import json
+
+import pytest
+
+from backend.issue_analyzer import IssueAnalyzer
+from backend.prompt_builder import estimate_tokens
+from backend.response_parser import IssueAnalysis, analysis_json_schema, analysis_max_tokens
+from conftest import VALID_ANALYSIS
+from test_llm_batching import small_issue
+
+
+REPO = "https://github.com/owner/repo"
+
+# An analysis as long as the prompt asks any analysis to be
+LONG_ANALYSIS = {
+    "summary": "The desktop app crashes on startup with a segmentation fault in the renderer after upgrading to 2.0",
+    "type": "feature_request",
+    "priority_score": "5/5: Every user on the new release is affected and there is no workaround besides downgrading",
+    "suggested_labels": ["bug", "regression", "crash"],
+    "potential_impact": "All desktop users who upgraded to 2.0 cannot start the app at all, so they lose access to their "
+                        "data until a fix ships or they find the downgrade instructions in the issue thread.",
+    "reasoning": "The report includes a native stack trace pointing at the GPU renderer, several users confirm the "
+                 "crash on different machines, and downgrading to 1.9 makes it go away, which marks it as a "
+                 "regression in 2.0. A crash at startup blocks every feature, so it warrants the highest priority. "
+                 "The labels follow the repository's conventions for crashes and regressions.",
+}
+
+
+class TestSchema:
+    """The schema and token budget follow the IssueAnalysis model"""
+    
+    def test_schema_has_the_llm_written_fields(self):
+        schema = analysis_json_schema()
+        
+        assert schema["required"] == list(VALID_ANALYSIS)
+        assert set(schema["properties"]) == set(VALID_ANALYSIS)
+        assert "duplicate_of" in IssueAnalysis.model_fields
+        assert schema["additionalProperties"] is False
+        assert schema["properties"]["type"]["enum"] == ["bug", "documentation", "feature_request", "other", "question"]
+        assert schema["properties"]["suggested_labels"] == {"type": "array", "items": {"type": "string"}, "maxItems": 3}
+    
+    def test_budget_fits_a_full_analysis(self):
+        budget = analysis_max_tokens(analysis_json_schema())
+        
+        assert estimate_tokens(json.dumps(LONG_ANALYSIS, indent=2)) < budget < 1000
+
+
+class TestCompletionParams:
+    """Every call is deterministic and capped; unstreamed single analyses use JSON mode"""
+    
+    def test_single_analysis_uses_json_mode(self, analyzer, stub_upstream):
+        analyzer.analyze(REPO, 1)
+        
+        params = stub_upstream.llm_params[0]
+        assert params["temperature"] == 0
+        assert params["seed"] == 0
+        assert params["max_tokens"] == analyzer.analysis_max_tokens
+        assert params["response_format"] == {"type": "json_object"}
+        assert not params.get("stream")
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("response_format", ["json_object", "json_schema", "text"])
+    async def test_streamed_requests_never_carry_a_response_format(
+        self, analyzer, stub_upstream, response_format
+    ):
+        analyzer.llm_response_format = response_format
+        
+        records = [record async for record in analyzer.analyze_stream_async(REPO, 2)]
+        analyzer.analyze(REPO, 3)
+        
+        assert records[-1] == {"event": "analysis", "analysis": VALID_ANALYSIS}
+        streamed = [params for params in stub_upstream.llm_params if params.get("stream")]
+        # Text mode streams every analysis; JSON modes only those that send fields
+        assert len(streamed) == (2 if response_format == "text" else 1)
+        assert all("response_format" not in params for params in streamed)
+        assert all(params["temperature"] == 0 and params["seed"] == 0 for params in streamed)
+    
+    @pytest.mark.asyncio
+    async def test_streamed_analysis_is_cached_under_its_own_request(self, analyzer, stub_upstream):
+        issue_data = small_issue(1)
+        json_key = analyzer.content_cache_key(issue_data)
+        stream_key = analyzer.content_cache_key(issue_data, streamed=True)
+        
+        streamed, key = await analyzer.analyze_issue_data_async(issue_data, on_field=lambda name, value: None)
+        whole, _ = await analyzer.analyze_issue_data_async(issue_data)
+        
+        assert key == stream_key != json_key
+        assert streamed == whole
+        # The JSON-mode request was never sent, so it was not served from the stream's
+        assert stub_upstream.calls["llm"] == 2
+        analyzer.llm_response_format = "text"
+        assert analyzer.content_cache_key(issue_data) == analyzer.content_cache_key(issue_data, streamed=True)
+    
+    @pytest.mark.asyncio
+    async def test_json_schema_mode(self, analyzer, stub_upstream, monkeypatch):
+        monkeypatch.setenv("LLM_RESPONSE_FORMAT", "json_schema")
+        monkeypatch.setenv("LLM_MAX_TOKENS", "700")
+        schema_analyzer = IssueAnalyzer()
+        try:
+            await schema_analyzer.analyze_async(REPO, 1)
+        finally:
+            await schema_analyzer.aclose()
+        
+        params = stub_upstream.llm_params[0]
+        assert params["max_tokens"] == 700
+        assert params["response_format"] == {
+            "type": "json_schema",
+            "json_schema": {"name": "issue_analysis", "strict": True, "schema": analysis_json_schema()},
+        }
+    
+    def test_text_mode_and_unknown_formats(self, analyzer, monkeypatch):
+        monkeypatch.setenv("LLM_RESPONSE_FORMAT", "text")
+        text_analyzer = IssueAnalyzer()
+        text_analyzer.close()
+        monkeypatch.setenv("LLM_RESPONSE_FORMAT", "xml")
+        
+        assert "response_format" not in text_analyzer._completion_params("prompt")
+        with pytest.raises(ValueError, match="Unknown LLM_RESPONSE_FORMAT"):
+            IssueAnalyzer()
+    
+    @pytest.mark.asyncio
+    async def test_batched_call_asks_for_an_array(self, analyzer, stub_upstream):
+        await analyzer.analyze_issue_data_group_async({n: small_issue(n) for n in (1, 2, 3)})
+        
+        params = stub_upstream.llm_params[0]
+        assert "response_format" not in params
+        assert params["temperature"] == 0
+        assert params["max_tokens"] == 3 * (analyzer.analysis_max_tokens + 16)
+    
+    def test_sampling_settings_are_part_of_the_content_key(self, analyzer, monkeypatch):
+        monkeypatch.setenv("LLM_SEED", "1")
+        reseeded = IssueAnalyzer()
+        reseeded.close()
+        
+        assert analyzer.content_cache_key(small_issue(1)) == analyzer.content_cache_key(small_issue(1))
+        assert analyzer.content_cache_key(small_issue(1)) != reseeded.content_cache_key(small_issue(1))
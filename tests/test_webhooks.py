@@ -0,0 +1,238 @@
+"""
+Tests for the GitHub webhook receiver and its precompute queue
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.webhooks import PrecomputeQueue, QueueFullError, issue_from_event, verify_signature
+from conftest import VALID_ANALYSIS
+
+
+REPO = "https://github.com/owner/repo"
+SECRET = "webhook-secret"
+
+
+def issue_event(number, action="edited", comments=0, title=None):
+    """An issues event for owner/repo, shaped like GitHub's"""
+    return {
+        "action": action,
+        "issue": {
+            "number": number,
+            "title": title or f"Issue {number}",
+            "body": f"Body of issue {number}",
+            "labels": [{"name": "bug"}],
+            "state": "open",
+            "comments": comments,
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-02T00:00:00Z",
+        },
+        "repository": {"full_name": "owner/repo"},
+    }
+
+
+def deliver(client, payload, event="issues", secret=SECRET):
+    body = json.dumps(payload).encode()
+    signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(
+        "/webhooks/github",
+        content=body,
+        headers={"X-GitHub-Event": event, "X-Hub-Signature-256": signature, "Content-Type": "application/json"},
+    )
+
+
+def wait_until_idle(client, jobs, timeout=10):
+    """Poll /stats until the queue has finished the given number of jobs"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = client.get("/stats").json()["webhooks"]
+        if stats["depth"] == stats["running"] == 0 and stats["completed"] + stats["failed"] >= jobs:
+            return stats
+        time.sleep(0.02)
+    pytest.fail("webhook queue did not drain")
+
+
+@pytest.fixture
+def webhook_env(stub_upstream, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test_key")
+    monkeypatch.setenv("GROQ_BASE_URL", stub_upstream.url)
+    monkeypatch.setenv("GITHUB_API_URL", stub_upstream.url)
+    monkeypatch.setenv("GITHUB_WEBHOOK_SECRET", SECRET)
+    monkeypatch.delenv("GITHUB_FETCH_BACKEND", raising=False)
+    return stub_upstream
+
+
+class TestEvents:
+    """Signatures and event filtering"""
+    
+    def test_signature(self):
+        body = b'{"action": "opened"}'
+        signature = "sha256=" + hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+        
+        assert verify_signature("s3cret", body, signature)
+        assert not verify_signature("other", body, signature)
+        assert not verify_signature("s3cret", body + b" ", signature)
+        assert not verify_signature("s3cret", body, signature[len("sha256="):])
+        assert not verify_signature("s3cret", body, None)
+    
+    def test_only_issue_changes_are_analyzed(self):
+        assert issue_from_event("issues", issue_event(3))[:2] == ("owner", "repo")
+        assert issue_from_event("issue_comment", issue_event(3, action="created"))
+        assert issue_from_event("issues", issue_event(3, action="assigned")) is None
+        assert issue_from_event("push", issue_event(3)) is None
+        pull_comment = issue_event(3, action="created")
+        pull_comment["issue"]["pull_request"] = {"url": "https://api.github.com/repos/owner/repo/pulls/3"}
+        assert issue_from_event("issue_comment", pull_comment) is None
+
+
+class TestPrecomputeQueue:
+    """One job per key, bounded depth"""
+    
+    @pytest.mark.asyncio
+    async def test_repeated_jobs_for_a_key_are_coalesced(self):
+        release = asyncio.Event()
+        handled = []
+        
+        async def handler(job):
+            await release.wait()
+            handled.append(job)
+        
+        queue = PrecomputeQueue(handler, workers=2)
+        assert queue.submit("a", "a1")
+        await asyncio.sleep(0)
+        # a1 is running: a2 waits for it and a3 replaces a2
+        assert queue.submit("a", "a2")
+        assert not queue.submit("a", "a3")
+        assert queue.submit("b", "b1")
+        release.set()
+        await queue.join()
+        await queue.close()
+        
+        assert sorted(handled) == ["a1", "a3", "b1"]
+        assert handled.index("a1") < handled.index("a3")
+        assert queue.stats()["coalesced"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_new_keys(self):
+        release = asyncio.Event()
+        
+        async def handler(job):
+            await release.wait()
+        
+        queue = PrecomputeQueue(handler, max_depth=2, workers=1)
+        queue.submit("a", 1)
+        await asyncio.sleep(0)
+        queue.submit("b", 1)
+        queue.submit("c", 1)
+        
+        with pytest.raises(QueueFullError):
+            queue.submit("d", 1)
+        # Replacing a waiting job needs no room
+        assert not queue.submit("b", 2)
+        release.set()
+        await queue.join()
+        await queue.close()
+        assert queue.stats()["completed"] == 3
+        assert queue.stats()["dropped"] == 1
+
+
+class TestWebhookEndpoint:
+    """Deliveries are verified and warm the cache for /analyze"""
+    
+    def test_unsigned_delivery_is_rejected(self, webhook_env):
+        with TestClient(main.app) as client:
+            response = deliver(client, issue_event(1), secret="wrong")
+        
+        assert response.status_code == 401
+        assert webhook_env.calls["llm"] == 0
+    
+    def test_missing_secret_refuses_deliveries(self, webhook_env, monkeypatch):
+        monkeypatch.delenv("GITHUB_WEBHOOK_SECRET")
+        with TestClient(main.app) as client:
+            assert deliver(client, issue_event(1)).status_code == 503
+    
+    def test_ping_and_other_events(self, webhook_env):
+        with TestClient(main.app) as client:
+            assert deliver(client, {"zen": "Keep it simple."}, event="ping").json() == {"status": "pong"}
+            assert deliver(client, {"ref": "main"}, event="push").json() == {"status": "ignored"}
+    
+    def test_event_without_comments_is_analyzed_from_the_payload(self, webhook_env, monkeypatch):
+        monkeypatch.setenv("ISSUE_FRESHNESS_TTL", "60")
+        webhook_env.comments[5] = []
+        with TestClient(main.app) as client:
+            response = deliver(client, issue_event(5, action="opened"))
+            wait_until_idle(client, 1)
+            precomputed = dict(webhook_env.calls)
+            analysis = client.post("/analyze", json={"repo_url": REPO, "issue_number": 5})
+        
+        assert response.status_code == 202
+        assert response.json() == {"status": "queued"}
+        assert precomputed["issue"] == precomputed["comments"] == 0
+        assert precomputed["llm"] == 1
+        assert analysis.json() == VALID_ANALYSIS
+        # Served from the cache: no GitHub or LLM call for /analyze
+        assert webhook_env.calls == precomputed
+    
+    def test_comment_event_analysis_matches_on_demand_content(self, webhook_env):
+        with TestClient(main.app) as client:
+            deliver(client, issue_event(6, action="created", comments=1), event="issue_comment")
+            wait_until_idle(client, 1)
+            analysis = client.post("/analyze", json={"repo_url": REPO, "issue_number": 6})
+        
+        assert analysis.json() == VALID_ANALYSIS
+        # The issue is refetched to check it is unchanged, but not reanalyzed
+        assert webhook_env.calls["issue"] == 1
+        assert webhook_env.calls["llm"] == 1
+    
+    def test_delivery_expires_the_fresh_analysis(self, webhook_env, monkeypatch):
+        monkeypatch.setenv("ISSUE_FRESHNESS_TTL", "60")
+        webhook_env.comments[8] = []
+        with TestClient(main.app) as client:
+            client.post("/analyze", json={"repo_url": REPO, "issue_number": 8})
+            webhook_env.llm_latency = 0.3
+            deliver(client, issue_event(8, title="Edited"))
+            client.post("/analyze", json={"repo_url": REPO, "issue_number": 8})
+            wait_until_idle(client, 1)
+        
+        # Within ISSUE_FRESHNESS_TTL, but the delivery made /analyze skip the
+        # fresh analysis and join the delivery's reanalysis instead
+        assert webhook_env.calls["issue"] == 1
+        assert webhook_env.calls["llm"] == 2
+        assert "Edited" in webhook_env.llm_prompts[-1][-1]["content"]
+    
+    def test_burst_of_events_for_one_issue_is_analyzed_once_more(self, webhook_env, monkeypatch):
+        monkeypatch.setenv("WEBHOOK_WORKERS", "1")
+        webhook_env.comments[7] = []
+        webhook_env.llm_latency = 0.2
+        with TestClient(main.app) as client:
+            statuses = [
+                deliver(client, issue_event(7, title=f"Edit {i}")).json()["status"]
+                for i in range(5)
+            ]
+            stats = wait_until_idle(client, 2)
+        
+        # The first edit starts running; the next is queued behind it and
+        # the rest replace the queued one
+        assert statuses == ["queued", "queued", "coalesced", "coalesced", "coalesced"]
+        assert stats["completed"] == 2
+        assert webhook_env.calls["llm"] == 2
+        assert "Edit 4" in webhook_env.llm_prompts[-1][-1]["content"]
+    
+    def test_request_during_a_precompute_joins_it(self, webhook_env):
+        webhook_env.comments[9] = []
+        webhook_env.llm_latency = 0.3
+        with TestClient(main.app) as client:
+            deliver(client, issue_event(9, action="opened"))
+            analysis = client.post("/analyze", json={"repo_url": REPO, "issue_number": 9})
+            wait_until_idle(client, 1)
+        
+        # /analyze arrived while the delivery's analysis was running
+        assert analysis.json() == VALID_ANALYSIS
+        assert webhook_env.calls["llm"] == 1